@@ -7,10 +7,39 @@ from rdflib import (
     Graph, ConjunctiveGraph, URIRef, BNode, Literal, Namespace
 )
 from rdflib.namespace import RDF, RDFS, OWL, XSD
+from rdflib.store import Store
+from rdflib.collection import Collection
+from rdflib.plugins.stores.memory import Memory
 from rdflib.plugins.stores.sparqlstore import SPARQLUpdateStore
-from datetime import datetime
+from rdflib.query import Result
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timedelta, timezone
 from uuid import uuid4
+from io import BytesIO
+from urllib.parse import urlsplit, urlencode
+import http.client
+import threading
+from array import array
+import bisect
+import functools
+import tracemalloc
+import json
+import time
+import os
 import re
+import sys
+import mmap
+import struct
+import zlib
+import hashlib
+import tempfile
+import multiprocessing
+from collections import OrderedDict
+
+try:
+    import numpy as np
+except ImportError:  # optional, see ContentFilter
+    np = None
 
 
 # ==========================
@@ -77,6 +106,23 @@ def make_state_iri(base_uri: str, ontology_name: str, state_name: str) -> URIRef
 def make_ocg_iri(base_uri: str, ontology_name: str) -> URIRef:
     return URIRef(f"{base_uri}/ocg/{ontology_name}")
 
+# ==========================
+# CREATE IRI ONTOLOGY META GRAPH
+# ==========================
+
+def make_meta_iri(base_uri: str, ontology_name: str) -> URIRef:
+    return URIRef(f"{base_uri}/meta/{ontology_name}")
+
+# ==========================
+# CREATE IRI CHANGE LOG GRAPH
+# ==========================
+
+def make_log_iri(base_uri: str, ontology_name: str) -> URIRef:
+    return URIRef(f"{base_uri}/log/{ontology_name}")
+
+def make_log_entry_iri(base_uri: str, ontology_name: str, state_name: str, seq: int) -> URIRef:
+    return URIRef(f"{base_uri}/log/{ontology_name}/{state_name}-{seq:04d}")
+
 # ==========================
 # CREATE IRI STATE GRAPH
 # ==========================
@@ -91,6 +137,13 @@ def make_state_graph_iri(base_uri: str, ontology_name: str, state_name: str) ->
 def make_axiom_iri(base_uri: str, ontology_name: str) -> URIRef:
     return URIRef(f"{base_uri}/axiom/{ontology_name}/{uuid4().hex}")
 
+def make_disjoint_group_iri(base_uri: str, ontology_name: str, members) -> URIRef:
+    # named by its members, so that the same group gets the same IRI
+    # in every store and every load of the ontology
+    key = "\n".join(sorted(str(c) for c in members if isinstance(c, URIRef)))
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+    return URIRef(f"{base_uri}/disjoint/{ontology_name}/{digest}")
+
 # ==========================
 # CREATE FACTORY X CHANGE IRI
 # ==========================
@@ -122,17 +175,53 @@ def declare_imports_in_state_graph(state_graph: Graph, ontology_iri: URIRef):
     state_graph.add((MEMENTO.hasOntologyStateChange, RDF.type, OWL.AnnotationProperty))
     state_graph.add((MEMENTO.hasPreviousState, RDF.type, OWL.ObjectProperty))
 
+VERSION_DATAPROPS = (
+    MEMENTO.hasOntologyStateVersionLabel,
+    MEMENTO.hasOntologyStateVersionMajorRevision,
+    MEMENTO.hasOntologyStateVersionMinorRevision,
+    MEMENTO.hasOntologyStateVersionPatchRevision,
+    MEMENTO.hasOntologyStateVersionMetadata,
+)
+
 def declare_version_dataprops(g: Graph):
-    for dp in [
-        MEMENTO.hasOntologyStateVersionLabel,
-        MEMENTO.hasOntologyStateVersionMajorRevision,
-        MEMENTO.hasOntologyStateVersionMinorRevision,
-        MEMENTO.hasOntologyStateVersionPatchRevision,
-        MEMENTO.hasOntologyStateVersionMetadata,
-    ]:
+    for dp in VERSION_DATAPROPS:
         g.add((dp, RDF.type, OWL.DatatypeProperty))
 
+def state_header_subjects(ontology_iri: URIRef):
+    """
+    Subjects written by declare_imports_in_state_graph() and
+    declare_version_dataprops() in every new state.
+    """
+    return (
+        ontology_iri,
+        MEMENTO.hasOntologyState,
+        MEMENTO.hasOntologyStateChange,
+        MEMENTO.hasPreviousState,
+    ) + VERSION_DATAPROPS
+
+# predicates a delC change leaves on its subject
+DELC_KEPT_PREDICATES = (
+    MEMENTO.hasOntologyStateChange,
+    RDF.type,
+    RDFS.label,
+    RDFS.comment,
+    RDFS.isDefinedBy,
+    RDFS.subClassOf,
+    OWL.equivalentClass,
+    OWL.versionInfo
+)
+
+# change types that alter their subject whatever the triple: addC
+# declares it a class, delC strips it
+SUBJECT_CHANGE_TYPES = (DYNDIFF.addC, DYNDIFF.delC)
+
+# change types applied as given: the triple is added or removed,
+# whatever its predicate (labels included), and nothing else changes
+EXACT_CHANGE_TYPES = (MEMENTO.AddChangeAction, MEMENTO.DelChangeAction)
+
 def change_action_class(ch_type: URIRef) -> URIRef:
+    if ch_type in EXACT_CHANGE_TYPES:
+        return ch_type
     if str(ch_type).split("/")[-1].startswith("add"):
         return MEMENTO.AddChangeAction
     if str(ch_type).split("/")[-1].startswith("del"):
@@ -182,12 +271,21 @@ def is_system_triple(s, p, o, base_uri):
 
     return False
 
-def get_or_create_axiom(g: Graph, base_uri: str, ontology_name: str, s, p, o):
-    for ax in g.subjects(RDF.type, OWL.Axiom):
-        if (ax, OWL.annotatedSource, s) in g and \
-           (ax, OWL.annotatedProperty, p) in g and \
-           (ax, OWL.annotatedTarget, o) in g:
+def find_axiom(g: Graph, s, p, o):
+    """
+    The owl:Axiom of `g` reifying (s, p, o), or None.
+    """
+    for ax in g.subjects(OWL.annotatedSource, s):
+        if (ax, OWL.annotatedProperty, p) in g and \
+           (ax, OWL.annotatedTarget, o) in g and \
+           (ax, RDF.type, OWL.Axiom) in g:
             return ax
+    return None
+
+def get_or_create_axiom(g: Graph, base_uri: str, ontology_name: str, s, p, o):
+    ax = find_axiom(g, s, p, o)
+    if ax is not None:
+        return ax
 
     axiom_iri = make_axiom_iri(base_uri, ontology_name)
     g.add((axiom_iri, RDF.type, OWL.Axiom))
@@ -216,6 +314,50 @@ def copy_bnode_closure(src_g: Graph, dst_g: Graph, node):
             if isinstance(o, BNode) and o not in seen:
                 stack.append(o)
 
+def incomplete_axioms(g: Graph):
+    """
+    owl:Axiom reifications of `g` missing their source, property or
+    target; they are not carried over to the next state.
+    """
+    return {
+        ax for ax in g.subjects(RDF.type, OWL.Axiom)
+        if not (
+            (ax, OWL.annotatedSource, None) in g and
+            (ax, OWL.annotatedProperty, None) in g and
+            (ax, OWL.annotatedTarget, None) in g
+        )
+    }
+
+_AXIOM_PARTS = (OWL.annotatedSource, OWL.annotatedProperty, OWL.annotatedTarget)
+
+def copy_state_graph(src: Graph, dst: Graph) -> int:
+    """
+    Copies the previous state `src` into the new state `dst` with one
+    addN, leaving out incomplete axioms (hasOntologyStateChange links
+    of named entities are always kept). `src` is read once, incomplete
+    axioms are found in that same pass. Returns the triples copied.
+    """
+    triples = list(src)
+    axioms = {s for (s, p, o) in triples if p == RDF.type and o == OWL.Axiom}
+
+    skip = ()
+    if axioms:
+        parts = {}
+        for (s, p, o) in triples:
+            if p in _AXIOM_PARTS and s in axioms:
+                parts.setdefault(s, set()).add(p)
+        skip = {ax for ax in axioms if len(parts.get(ax, ())) < len(_AXIOM_PARTS)}
+
+    if skip:
+        quads = [
+            (s, p, o, dst) for (s, p, o) in triples
+            if s not in skip or (p == MEMENTO.hasOntologyStateChange and isinstance(s, URIRef))
+        ]
+    else:
+        quads = [(s, p, o, dst) for (s, p, o) in triples]
+    dst.store.addN(quads)
+    return len(quads)
+
 def rdf_list_items(g: Graph, head):
     items = []
     while head and head != RDF.nil:
@@ -251,47 +393,344 @@ def expand_all_disjoint_classes(g: Graph):
 
     return pairs
 
+def name_disjoint_groups(g: Graph, base_uri: str, ontology_name: str):
+    """
+    Gives every blank owl:AllDisjointClasses node an IRI, so that the
+    group is versioned as one unit and later changes can edit its
+    members with ((group, owl:members, cls), addI/delI). The IRI is a
+    hash of the named members (see make_disjoint_group_iri); a group
+    repeating the members of another one is dropped.
+    """
+    for adc in list(g.subjects(RDF.type, OWL.AllDisjointClasses)):
+        if not isinstance(adc, BNode):
+            continue
+        head = next(g.objects(adc, OWL.members), None)
+        members = rdf_list_items(g, head) if head is not None else []
+        group = make_disjoint_group_iri(base_uri, ontology_name, members)
+
+        if (group, RDF.type, OWL.AllDisjointClasses) in g:
+            node = head
+            while isinstance(node, BNode):
+                rest = next(g.objects(node, RDF.rest), None)
+                g.remove((node, None, None))
+                node = rest
+            g.remove((adc, None, None))
+        for (_, p, o) in list(g.triples((adc, None, None))):
+            g.remove((adc, p, o))
+            g.add((group, p, o))
+        for (s, p, _) in list(g.triples((None, None, adc))):
+            g.remove((s, p, adc))
+            g.add((s, p, group))
+
+def edit_disjoint_group(g: Graph, group, cls, add: bool):
+    """
+    Adds `cls` to (or removes it from) the owl:members list of a named
+    owl:AllDisjointClasses group, rewriting the rdf:List.
+    """
+    head = next(g.objects(group, OWL.members), None)
+    items = rdf_list_items(g, head) if head is not None else []
+    if add == (cls in items):
+        return False
+
+    node = head
+    while isinstance(node, BNode):
+        rest = next(g.objects(node, RDF.rest), None)
+        g.remove((node, None, None))
+        node = rest
+    if head is not None:
+        g.remove((group, OWL.members, head))
+
+    items = items + [cls] if add else [c for c in items if c != cls]
+    if items:
+        head = BNode()
+        Collection(g, head, items)
+    else:
+        head = RDF.nil
+    g.add((group, OWL.members, head))
+    return True
+
+def disjoint_member_triples(g: Graph):
+    """
+    (group, owl:members, cls) for every member of the named
+    owl:AllDisjointClasses groups of `g`.
+    """
+    for group in g.subjects(RDF.type, OWL.AllDisjointClasses):
+        if isinstance(group, URIRef):
+            for head in g.objects(group, OWL.members):
+                for c in rdf_list_items(g, head):
+                    yield (group, OWL.members, c)
+
 # ================================================================
 # MEMENTO-SM — MODULE 2
 # Store Wrapper + MementoSM Skeleton
 # ================================================================
 
+class SPARQLConnectionPool:
+    """
+    Bounded pool of keep-alive HTTP connections to SPARQL endpoints.
+
+    At most `maxsize` requests are in flight at the same time; idle
+    connections are kept open and reused by the following requests,
+    so that every query/update does not pay a new TCP handshake.
+    """
+    def __init__(self, maxsize=4, timeout=None):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(maxsize)
+        self._lock = threading.Lock()
+        self._idle = {}
+
+    def _connect(self, scheme, netloc):
+        cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+        return cls(netloc, timeout=self.timeout)
+
+    def request(self, method, url, body=None, headers=None):
+        """
+        Sends one request and returns (status, content_type, body bytes).
+        A reused connection closed by the server is retried once on a
+        fresh connection.
+        """
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+
+        with self._slots:
+            for attempt in (0, 1):
+                with self._lock:
+                    idle = self._idle.get(key)
+                    conn = idle.pop() if idle else None
+                reused = conn is not None
+                if conn is None:
+                    conn = self._connect(*key)
+
+                try:
+                    conn.request(method, path, body=body, headers=headers or {})
+                    resp = conn.getresponse()
+                    data = resp.read()
+                except (http.client.HTTPException, ConnectionError):
+                    conn.close()
+                    if reused and attempt == 0:
+                        continue
+                    raise
+
+                if resp.will_close:
+                    conn.close()
+                else:
+                    with self._lock:
+                        self._idle.setdefault(key, []).append(conn)
+
+                return resp.status, resp.getheader("Content-Type", ""), data
+
+    def close(self):
+        with self._lock:
+            for conns in self._idle.values():
+                for conn in conns:
+                    conn.close()
+            self._idle.clear()
+
+
+class PooledSPARQLUpdateStore(SPARQLUpdateStore):
+    """
+    SPARQLUpdateStore whose queries and updates go through a shared
+    SPARQLConnectionPool instead of opening a connection per call.
+    """
+    def __init__(self, *args, pool_size=4, pool=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = pool if pool is not None else SPARQLConnectionPool(pool_size)
+
+    def _headers(self, extra):
+        headers = dict(self.kwargs.get("headers", {}))
+        headers.update(extra)
+        return headers
+
+    def _query(self, query, default_graph=None, named_graph=None):
+        self._queries += 1
+        params = dict(self.kwargs.get("params", {}))
+        if default_graph is not None and type(default_graph) is not BNode:
+            params["default-graph-uri"] = default_graph
+
+        accept = {"Accept": self.response_mime_types()}
+
+        if self.method == "GET":
+            params["query"] = query
+            status, ctype, data = self.pool.request(
+                "GET", f"{self.query_endpoint}?{urlencode(params)}",
+                headers=self._headers(accept)
+            )
+        elif self.method == "POST":
+            accept["Content-Type"] = "application/sparql-query"
+            status, ctype, data = self.pool.request(
+                "POST", f"{self.query_endpoint}?{urlencode(params)}",
+                body=query.encode(), headers=self._headers(accept)
+            )
+        else:
+            params["query"] = query
+            accept["Content-Type"] = "application/x-www-form-urlencoded"
+            status, ctype, data = self.pool.request(
+                "POST", self.query_endpoint,
+                body=urlencode(params).encode(), headers=self._headers(accept)
+            )
+
+        if status >= 400:
+            raise ValueError(f"SPARQL query failed ({status}): {data[:200]!r}")
+        return Result.parse(BytesIO(data), content_type=ctype.split(";")[0])
+
+    def _update(self, update):
+        self._updates += 1
+        params = dict(self.kwargs.get("params", {}))
+
+        status, _, data = self.pool.request(
+            "POST", f"{self.update_endpoint}?{urlencode(params)}",
+            body=update.encode(),
+            headers=self._headers({
+                "Accept": self.response_mime_types(),
+                "Content-Type": "application/sparql-update; charset=UTF-8",
+            })
+        )
+        if status >= 400:
+            raise ValueError(f"SPARQL update failed ({status}): {data[:200]!r}")
+
+    def close(self, commit_pending_transaction=False):
+        super().close(commit_pending_transaction)
+        self.pool.close()
+
+
+# copy_state_graph() run by the SPARQL endpoint
+COPY_STATE_UPDATE = """
+PREFIX owl: <http://www.w3.org/2002/07/owl#>
+INSERT { GRAPH <%(dst)s> { ?s ?p ?o } }
+WHERE {
+  GRAPH <%(src)s> {
+    ?s ?p ?o .
+    FILTER (
+      (isIRI(?s) && ?p = <%(link)s>)
+      || NOT EXISTS {
+        ?s a owl:Axiom .
+        FILTER NOT EXISTS {
+          ?s owl:annotatedSource ?source ; owl:annotatedProperty ?property ; owl:annotatedTarget ?target .
+        }
+      }
+    )
+  }
+}
+"""
+
+
 class VirtuosoStoreWrapper:
     """
     Wrapper compatible with:
     - In-memory RDFLib (ConjunctiveGraph)
     - Virtuoso via SPARQLUpdateStore
+
+    With `pool_size`, the SPARQL backend runs on a keep-alive
+    connection pool allowing up to `pool_size` concurrent requests.
+    With `compact_axioms`, the in-memory backend keeps axiom
+    reifications in a shared AxiomTable (see CompactAxiomStore).
+    With a `tier` (see StateTier), cold state graphs of the in-memory
+    backend are spilled to disk.
     """
-    def __init__(self, store=None, query_endpoint=None, update_endpoint=None):
+    tier = None
+
+    def __init__(self, store=None, query_endpoint=None, update_endpoint=None, pool_size=None,
+                 compact_axioms=False):
 
         if store is not None and hasattr(store, "get_context"):
             self.store = store
             return
 
         if query_endpoint and update_endpoint:
-            s = SPARQLUpdateStore(
-                queryEndpoint=query_endpoint,
-                updateEndpoint=update_endpoint,
-                auth=("dba", "dba")   
-            )
+            if pool_size:
+                s = PooledSPARQLUpdateStore(
+                    queryEndpoint=query_endpoint,
+                    updateEndpoint=update_endpoint,
+                    auth=("dba", "dba"),
+                    pool_size=pool_size
+                )
+            else:
+                s = SPARQLUpdateStore(
+                    queryEndpoint=query_endpoint,
+                    updateEndpoint=update_endpoint,
+                    auth=("dba", "dba")
+                )
             s.open((query_endpoint, update_endpoint))
             self.store = s
+        elif compact_axioms:
+            self.store = CompactAxiomStore(ConjunctiveGraph().store)
         else:
             cg = ConjunctiveGraph()
             self.store = cg.store
 
+    # ==========================
+    # LAZY CONTEXTS
+    # ==========================
+
+    def register_lazy(self, iri, loader):
+        """
+        Registers a context whose triples are produced by `loader()`
+        the first time it is accessed.
+        """
+        if not hasattr(self, "_lazy"):
+            self._lazy = {}
+        giri = URIRef(str(iri))
+        previous = self._lazy.get(giri)
+        self._lazy[giri] = loader
+        if previous is not None and previous is not loader:
+            release_loader(previous)
+
+    def lazy_iris(self):
+        return list(getattr(self, "_lazy", ()))
+
+    def ensure_loaded(self, iri):
+        lazy = getattr(self, "_lazy", None)
+        if not lazy:
+            return
+        loader = lazy.pop(URIRef(str(iri)), None)
+        if loader is not None:
+            ctx = Graph(store=self.store, identifier=URIRef(str(iri)))
+            try:
+                self.store.addN((s, p, o, ctx) for (s, p, o) in loader())
+            finally:
+                release_loader(loader)
+
     def get_context(self, iri):
+        self.ensure_loaded(iri)
+        if self.tier is not None:
+            self.tier.touch(self, URIRef(str(iri)))
         return Graph(store=self.store, identifier=URIRef(str(iri)))
 
     def remove_context(self, iri):
         giri = URIRef(str(iri))
+        release_loader(getattr(self, "_lazy", {}).pop(giri, None))
+        if self.tier is not None:
+            self.tier.forget(giri)
         if isinstance(self.store, SPARQLUpdateStore):
-            Graph(store=self.store).update(f"CLEAR GRAPH <{giri}>")
+            self.store.update(f"CLEAR GRAPH <{giri}>")
         else:
             ctx = Graph(store=self.store, identifier=giri)
             ctx.remove((None, None, None))
 
+    def copy_context(self, src_iri, dst_iri):
+        """
+        Copies state graph `src_iri` into `dst_iri` (see
+        copy_state_graph): a single INSERT ... WHERE run by the SPARQL
+        endpoint, or one addN in memory. Returns the triples copied
+        (None on SPARQL).
+        """
+        if isinstance(self.store, SPARQLUpdateStore):
+            self.store.update(COPY_STATE_UPDATE % {
+                "src": URIRef(str(src_iri)),
+                "dst": URIRef(str(dst_iri)),
+                "link": MEMENTO.hasOntologyStateChange,
+            })
+            return None
+        return copy_state_graph(self.get_context(src_iri), self.get_context(dst_iri))
+
     def contexts(self):
+        for iri in self.lazy_iris():
+            self.ensure_loaded(iri)
+
         if isinstance(self.store, SPARQLUpdateStore):
             g = Graph(store=self.store)
             q = "SELECT DISTINCT ?g WHERE { GRAPH ?g { ?s ?p ?o } }"
@@ -301,154 +740,2948 @@ class VirtuosoStoreWrapper:
             cg = ConjunctiveGraph(store=self.store)
             return list(cg.contexts())
 
+    def context_iris(self):
+        """
+        Names of all contexts, lazy ones included, without loading them.
+        """
+        if isinstance(self.store, SPARQLUpdateStore):
+            q = "SELECT DISTINCT ?g WHERE { GRAPH ?g { ?s ?p ?o } }"
+            iris = [row.g for row in Graph(store=self.store).query(q)]
+        else:
+            # removed contexts stay registered in memory, but empty
+            iris = [c.identifier for c in ConjunctiveGraph(store=self.store).contexts() if len(c)]
+        return iris + [i for i in self.lazy_iris() if i not in set(iris)]
+
     def persist(self):
-        return
+        if self.tier is not None:
+            self.tier.evict(self)
 
 # ================================================================
-# MAIN CLASS: MEMENTO-SM
+# MEMENTO-SM — MODULE 2.1
+# Transactions + Write-Ahead Log
 # ================================================================
 
-class MementoSM:
-    def __init__(
-        self,
-        store=None,
-        base_graph_uri="http://example.org/memento",
-        virtuoso_query_endpoint=None,
-        virtuoso_update_endpoint=None
-    ):
+# ==========================
+# TERM CODEC (WAL, checkpoints)
+# ==========================
 
-        if store is not None and hasattr(store, "get_context"):
-            self.store = store
+def encode_term(t) -> str:
+    if isinstance(t, URIRef):
+        return "U" + str(t)
+    if isinstance(t, BNode):
+        return "B" + str(t)
+    if isinstance(t, Literal):
+        dt = str(t.datatype) if t.datatype else ""
+        return f"L{t.language or ''}\x1f{dt}\x1f{t}"
+    raise ValueError(f"Unsupported RDF term: {t!r}")
+
+def decode_term(v: str):
+    kind, body = v[0], v[1:]
+    if kind == "U":
+        return URIRef(body)
+    if kind == "B":
+        return BNode(body)
+    lang, dt, lex = body.split("\x1f", 2)
+    return Literal(lex, lang=lang or None, datatype=URIRef(dt) if dt else None)
+
+
+class TransactionStore(Store):
+    """
+    RDFLib store overlaying buffered mutations on a base store.
+
+    Additions are kept in an in-memory store, removals and cleared
+    contexts in sets; reads see base + pending changes, so the code
+    running inside a transaction behaves exactly as without it. Nothing
+    reaches the base store until `apply()`.
+
+    On a SPARQL base, adding a triple does not check whether the base
+    already holds it (that would be one request per triple): a pending
+    addition may then duplicate a base triple. Reads skip such
+    duplicates, and applying them is a no-op. Local bases are cheap to
+    probe and keep pending additions and base triples disjoint.
+    """
+    context_aware = True
+    graph_aware = True
+
+    def __init__(self, base):
+        super().__init__()
+        self.base = base
+        self._pending = Memory()
+        self._removed = {}
+        self._cleared = set()
+        self._ctx_cache = {}
+        self._probe_base = not isinstance(base, SPARQLUpdateStore)
+
+    def _pending_ctx(self, iri):
+        key = ("pending", iri)
+        if key not in self._ctx_cache:
+            self._ctx_cache[key] = Graph(store=self._pending, identifier=iri)
+        return self._ctx_cache[key]
+
+    def _base_ctx(self, iri):
+        key = ("base", iri)
+        if key not in self._ctx_cache:
+            self._ctx_cache[key] = Graph(store=self.base, identifier=iri)
+        return self._ctx_cache[key]
+
+    def _base_triples(self, triple, iri):
+        # a SPARQL base cannot be queried for blank nodes: they are
+        # matched here on the results of the rest of the pattern
+        if self._probe_base or not any(isinstance(n, BNode) for n in triple):
+            for t, _ in self.base.triples(triple, self._base_ctx(iri)):
+                yield t
+            return
+        pattern = tuple(None if isinstance(n, BNode) else n for n in triple)
+        for t, _ in self.base.triples(pattern, self._base_ctx(iri)):
+            if all(n is None or n == m for n, m in zip(triple, t)):
+                yield t
+
+    def add(self, triple, context, quoted=False):
+        iri = context.identifier
+        removed = self._removed.get(iri)
+        if removed and triple in removed:
+            removed.discard(triple)
+            return
+        if self._probe_base and iri not in self._cleared and \
+           next(self.base.triples(triple, self._base_ctx(iri)), None) is not None:
+            return
+        self._pending.add(triple, self._pending_ctx(iri), quoted)
+
+    def addN(self, quads):
+        # contexts the base holds nothing of (new or cleared in this
+        # transaction, or not probed): buffered without any base lookup
+        direct = {}
+        for s, p, o, c in quads:
+            iri = c.identifier
+            fresh = direct.get(iri)
+            if fresh is None:
+                fresh = direct[iri] = not self._removed.get(iri) and (
+                    not self._probe_base or iri in self._cleared or len(self._base_ctx(iri)) == 0
+                )
+            if fresh:
+                self._pending.add((s, p, o), self._pending_ctx(iri))
+            else:
+                self.add((s, p, o), c)
+
+    def remove(self, triple, context=None):
+        if context is None:
+            iris = [c.identifier for c in self.contexts()]
         else:
-            self.store = VirtuosoStoreWrapper(
-                query_endpoint=virtuoso_query_endpoint,
-                update_endpoint=virtuoso_update_endpoint
+            iris = [context.identifier]
+
+        for iri in iris:
+            if iri not in self._cleared:
+                removed = self._removed.setdefault(iri, set())
+                removed.update(self._base_triples(triple, iri))
+            self._pending.remove(triple, self._pending_ctx(iri))
+
+    def clear(self, iri):
+        self._pending.remove((None, None, None), self._pending_ctx(iri))
+        self._removed.pop(iri, None)
+        self._cleared.add(iri)
+
+    def triples(self, triple, context=None):
+        if context is None:
+            for c in self.contexts():
+                yield from self.triples(triple, c)
+            return
+
+        iri = context.identifier
+        pctx = self._pending_ctx(iri)
+        dedupe = not self._probe_base and len(pctx) > 0
+        both = set()
+
+        if iri not in self._cleared:
+            removed = self._removed.get(iri, ())
+            for t in self._base_triples(triple, iri):
+                if t not in removed:
+                    if dedupe and t in pctx:
+                        both.add(t)
+                    yield t, iter((context,))
+
+        for t, _ in self._pending.triples(triple, pctx):
+            if t not in both:
+                yield t, iter((context,))
+
+    def __len__(self, context=None):
+        if context is None:
+            return sum(self.__len__(c) for c in self.contexts())
+        iri = context.identifier
+        pctx = self._pending_ctx(iri)
+        n = len(pctx)
+        if iri not in self._cleared:
+            removed = self._removed.get(iri, ())
+            base_n = len(self._base_ctx(iri))
+            n += base_n - len(removed)
+            if not self._probe_base and len(pctx) and base_n:
+                # additions already in the base are counted once
+                n -= sum(
+                    1 for t, _ in self.base.triples((None, None, None), self._base_ctx(iri))
+                    if t not in removed and t in pctx
+                )
+        return n
+
+    def contexts(self, triple=None):
+        seen = set()
+        for store in (self.base, self._pending):
+            for c in store.contexts(triple):
+                iri = c.identifier if isinstance(c, Graph) else c
+                if iri in seen:
+                    continue
+                seen.add(iri)
+                yield Graph(store=self, identifier=iri)
+
+    def bind(self, prefix, namespace, override=True):
+        self.base.bind(prefix, namespace, override)
+
+    def prefix(self, namespace):
+        return self.base.prefix(namespace)
+
+    def namespace(self, prefix):
+        return self.base.namespace(prefix)
+
+    def namespaces(self):
+        return self.base.namespaces()
+
+    def changes(self):
+        """
+        Returns the net effect as (cleared contexts, removals, additions),
+        removals/additions being lists of (context iri, triple). Additions
+        may include triples the base already holds: INSERT DATA and addN
+        ignore them, so duplicates are resolved once, when applied.
+        """
+        removals = [(iri, t) for iri, ts in self._removed.items() for t in ts]
+        additions = [
+            (c.identifier, t)
+            for c in self._pending.contexts()
+            for t, _ in self._pending.triples((None, None, None), c)
+        ]
+        return sorted(self._cleared), removals, additions
+
+
+def _bnode_groups(triples):
+    """
+    Splits triples into groups linked by shared blank nodes, so that
+    each group can be matched as one SPARQL pattern.
+    """
+    parent = {}
+
+    def find(x):
+        while parent.setdefault(x, x) != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for t in triples:
+        nodes = [n for n in t if isinstance(n, BNode)]
+        for n in nodes[1:]:
+            parent[find(n)] = find(nodes[0])
+
+    groups = {}
+    for t in triples:
+        head = next(n for n in t if isinstance(n, BNode))
+        groups.setdefault(find(head), []).append(t)
+    return list(groups.values())
+
+
+def apply_changes(base, cleared, removals, additions):
+    """
+    Applies a transaction batch to a base store: one SPARQL update on
+    Virtuoso, one addN on the in-memory store.
+
+    Blank nodes cannot be named across SPARQL requests, and DELETE DATA
+    does not accept them: removals involving blank nodes are sent as
+    DELETE WHERE patterns, one per group of triples sharing them.
+    """
+    if isinstance(base, SPARQLUpdateStore):
+        def block(items):
+            by_graph = {}
+            for iri, (s, p, o) in items:
+                by_graph.setdefault(iri, []).append(f"{s.n3()} {p.n3()} {o.n3()} .")
+            return " ".join(
+                f"GRAPH <{iri}> {{ {' '.join(ts)} }}" for iri, ts in by_graph.items()
             )
 
-        self.base = base_graph_uri
-        self.meta_graph_iri = URIRef(f"{self.base}/meta")
+        def pattern(group):
+            names = {}
+            return " ".join(
+                " ".join(
+                    f"?b{names.setdefault(n, len(names))}" if isinstance(n, BNode) else n.n3()
+                    for n in t
+                ) + " ."
+                for t in group
+            )
 
-        meta = self.store.get_context(self.meta_graph_iri)
+        ground, blank = [], {}
+        for iri, t in removals:
+            if any(isinstance(n, BNode) for n in t):
+                blank.setdefault(iri, []).append(t)
+            else:
+                ground.append((iri, t))
+
+        ops = [f"CLEAR GRAPH <{iri}>" for iri in cleared]
+        if ground:
+            ops.append(f"DELETE DATA {{ {block(ground)} }}")
+        for iri, ts in blank.items():
+            for group in _bnode_groups(ts):
+                ops.append(f"DELETE WHERE {{ GRAPH <{iri}> {{ {pattern(group)} }} }}")
+        if additions:
+            ops.append(f"INSERT DATA {{ {block(additions)} }}")
+        if ops:
+            base.update(" ;\n".join(ops))
+        return
 
-        meta.add((MEMENTO.hasOntologyStateChange, RDF.type, OWL.AnnotationProperty))
-        meta.add((MEMENTO.hasOntologyState, RDF.type, OWL.AnnotationProperty))
+    for iri in cleared:
+        base.remove((None, None, None), Graph(store=base, identifier=iri))
+    for iri, t in removals:
+        base.remove(t, Graph(store=base, identifier=iri))
+    ctxs = {}
+    base.addN(
+        (s, p, o, ctxs.setdefault(iri, Graph(store=base, identifier=iri)))
+        for iri, (s, p, o) in additions
+    )
 
 
-        GITHUB_BASE = "https://raw.githubusercontent.com/dfsantamaria/Memento/main/ontologies"
+class WriteAheadLog:
+    """
+    Append-only JSON-lines log of transaction batches.
 
-        self._memento_url = f"{GITHUB_BASE}/memento-o.owl"
-        self._dyndiff_url = f"{GITHUB_BASE}/DynDiffOnto.owl"
-        self._prov_url     = f"{GITHUB_BASE}/prov-o.ttl"
+    A batch is written and fsync'ed, closed by a "commit" record, before
+    being applied; the log is truncated once the batch is applied. On
+    recovery, committed batches still in the log are applied again (a
+    batch is idempotent), uncommitted ones are discarded.
+    """
+    def __init__(self, path):
+        self.path = str(path)
+
+    def _append(self, records):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for r in records:
+                f.write(json.dumps(r) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def log(self, tx_id, cleared, removals, additions):
+        records = [{"tx": tx_id, "op": "clear", "g": str(iri)} for iri in cleared]
+        records += [
+            {"tx": tx_id, "op": "del", "g": str(iri), "t": [encode_term(x) for x in t]}
+            for iri, t in removals
+        ]
+        records += [
+            {"tx": tx_id, "op": "add", "g": str(iri), "t": [encode_term(x) for x in t]}
+            for iri, t in additions
+        ]
+        records.append({"tx": tx_id, "op": "commit"})
+        self._append(records)
 
-        meta = self.store.get_context(self.meta_graph_iri)
-        meta.remove((None, None, None))
+    def mark_applied(self, tx_id):
+        # batches are applied in order by a single writer: once this one
+        # is applied, nothing in the log needs replaying any more
+        open(self.path, "w").close()
 
-        try:
-            meta.parse(self._memento_url, format="xml")       
-            meta.parse(self._prov_url, format="turtle")       
-            meta.parse(self._dyndiff_url, format="turtle")      
+    def pending(self):
+        """
+        Yields (tx_id, cleared, removals, additions) for each committed
+        batch left in the log.
+        """
+        if not os.path.exists(self.path):
+            return
 
-            print("✓ Base ontologies uploaded successfully from GitHub")
-        except Exception as e:
-            print("Error loading ontologies from GitHub:", e)
+        batches, committed = {}, []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    r = json.loads(line)
+                except ValueError:
+                    break  # torn tail write
+                tx, op = r["tx"], r["op"]
+                b = batches.setdefault(tx, ([], [], []))
+                if op == "clear":
+                    b[0].append(URIRef(r["g"]))
+                elif op == "del":
+                    b[1].append((URIRef(r["g"]), tuple(decode_term(x) for x in r["t"])))
+                elif op == "add":
+                    b[2].append((URIRef(r["g"]), tuple(decode_term(x) for x in r["t"])))
+                elif op == "commit":
+                    committed.append(tx)
+
+        for tx in committed:
+            yield (tx,) + batches[tx]
+
+    def recover(self, base):
+        n = 0
+        for tx, cleared, removals, additions in self.pending():
+            apply_changes(base, cleared, removals, additions)
+            n += 1
+        if os.path.exists(self.path):
+            open(self.path, "w").close()
+        return n
+
+
+class MementoTransaction:
+    """
+    Store wrapper used by MementoSM while a transaction is open.
 
-        meta.add((MEMENTO.hasPreviousState, RDF.type, OWL.ObjectProperty))
+    It exposes the VirtuosoStoreWrapper interface over a TransactionStore;
+    on commit the buffered batch is logged to the WAL (if any) and then
+    applied to the wrapped store in one go.
+    """
+    def __init__(self, wrapper, wal=None):
+        self.wrapper = wrapper
+        self.store = TransactionStore(wrapper.store)
+        self.wal = wal
+        self.tx_id = uuid4().hex
+        self._after_commit = []
 
-    # ================================================================
-    # UTILITY
-    # ================================================================
+    def get_context(self, iri):
+        self.wrapper.ensure_loaded(iri)
+        return Graph(store=self.store, identifier=URIRef(str(iri)))
 
-    def _state_iri(self, ontology_name, state_name):
-        return make_state_iri(self.base, ontology_name, state_name)
+    def remove_context(self, iri):
+        self.wrapper.ensure_loaded(iri)
+        self.store.clear(URIRef(str(iri)))
 
-    def _ocg_iri(self, ontology_name):
-        return make_ocg_iri(self.base, ontology_name)
+    def copy_context(self, src_iri, dst_iri):
+        # buffered like any other write of the transaction: one read of
+        # the source, no base lookups for the new graph
+        return copy_state_graph(self.get_context(src_iri), self.get_context(dst_iri))
 
-    def _state_graph_iri(self, ontology_name, state_name):
-        return make_state_graph_iri(self.base, ontology_name, state_name)
+    def contexts(self):
+        for iri in self.wrapper.lazy_iris():
+            self.wrapper.ensure_loaded(iri)
+        return list(self.store.contexts())
 
-    def get_ontology_state(self, ontology_name, state_name):
-        return self.store.get_context(self._state_graph_iri(ontology_name, state_name))
+    def context_iris(self):
+        remote = isinstance(self.wrapper.store, SPARQLUpdateStore)
+        iris = [c.identifier for c in self.store.contexts() if remote or len(c)]
+        return iris + [i for i in self.wrapper.lazy_iris() if i not in set(iris)]
 
-    def get_ontology_states(self, ontology_name):
+    def persist(self):
+        return
+
+    def after_commit(self, callback):
         """
-        Sort states by the PROV:startedAtTime timestamp in the meta graph.
+        Runs `callback()` once the batch has been applied (not at all
+        if the transaction is rolled back).
         """
-        prefix = f"{self.base}/graphs/{ontology_name}/state/"
-        found = []
-        meta = self.store.get_context(self.meta_graph_iri)
+        self._after_commit.append(callback)
+
+    def commit(self):
+        cleared, removals, additions = self.store.changes()
+        if self.wal is not None:
+            self.wal.log(self.tx_id, cleared, removals, additions)
+        apply_changes(self.wrapper.store, cleared, removals, additions)
+        if self.wal is not None:
+            self.wal.mark_applied(self.tx_id)
+        if self.wrapper.tier is not None:
+            self.wrapper.tier.wrote(
+                dict.fromkeys(cleared + [iri for iri, _ in removals] + [iri for iri, _ in additions])
+            )
+        self.wrapper.persist()
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            callback()
 
-        for ctx in self.store.contexts():
-            uri = str(ctx.identifier)
-            if uri.startswith(prefix):
-                sname = uri.split("/")[-1]
-                state_iri = self._state_iri(ontology_name, sname)
-                tvals = list(meta.objects(state_iri, PROV.startedAtTime))
-                ts = str(tvals[0]) if tvals else ""
-                found.append((sname, ts))
+    def rollback(self):
+        self.store = TransactionStore(self.wrapper.store)
+        self._after_commit = []
 
-        found.sort(key=lambda x: x[1])
-        return [s for s, _ in found]
 
-    def last_state_iri(self, ontology_name):
-        states = self.get_ontology_states(ontology_name)
-        if not states:
-            return None
-        return self._state_iri(ontology_name, states[-1])
+def atomic(method):
+    """
+    Runs a MementoSM write operation in its own transaction when a WAL
+    is configured (joining the open transaction, if any). Tiered state
+    graphs are not spilled while the operation runs.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._holding_states():
+            if self._tx is not None or self.wal is None:
+                return method(self, *args, **kwargs)
+            with self.transaction():
+                return method(self, *args, **kwargs)
+    return wrapper
 
 # ================================================================
-# MEMENTO-SM — MODULE 3
-# create_ontology() 
+# MEMENTO-SM — MODULE 2.2
+# Instrumentation
 # ================================================================
 
-    def create_ontology(
-        self,
-        ontology_name: str,
-        graph_or_path,
-        state_name: str,
-        author_name: str,
-        version="1.0",
-        fmt=None
-    ):
-        """ 
-        Creates the initial ontology snapshot (state s0).
+class Instrumentation:
+    """
+    Per-phase timers, counters and peak-memory samples of MementoSM
+    operations.
+
+    Operations are split into sequential phases (load, expand_disjoint,
+    copy, reify, metadata, persist, ...) by `mark()`. Every finished
+    phase and operation is also pushed as an event dict to the
+    subscribed callbacks. Peak memory is sampled with tracemalloc only
+    when `trace_memory` is set, since tracing slows everything down.
+    """
+    def __init__(self, callback=None, trace_memory=False):
+        self.callbacks = [callback] if callback else []
+        self.trace_memory = trace_memory
+        self.reset()
+
+    def reset(self):
+        self.timers = {}
+        self.operations = {}
+        self.counters = {}
+        self.peak_memory = {}
+        self._stack = []
+
+    def subscribe(self, callback):
+        self.callbacks.append(callback)
+
+    def _emit(self, event):
+        for cb in self.callbacks:
+            cb(event)
+
+    def _round_trips(self, store):
+        return getattr(store, "_queries", 0) + getattr(store, "_updates", 0)
+
+    @contextmanager
+    def operation(self, name, store=None):
+        started_tracing = False
+        if self.trace_memory and not self._stack:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+
+        frame = [name, None, 0.0, {}]
+        self._stack.append(frame)
+        trips = self._round_trips(store)
+        t0 = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.mark(None)
+            seconds = time.perf_counter() - t0
+            self._stack.pop()
+
+            counts = frame[3]
+            trips = self._round_trips(store) - trips
+            if trips:
+                counts["store_round_trips"] = counts.get("store_round_trips", 0) + trips
+            for key, n in counts.items():
+                self.counters[(name, key)] = self.counters.get((name, key), 0) + n
+
+            calls, total = self.operations.get(name, (0, 0.0))
+            self.operations[name] = (calls + 1, total + seconds)
+
+            event = {"event": "operation", "operation": name, "seconds": seconds, "counters": counts}
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                self.peak_memory[name] = max(self.peak_memory.get(name, 0), peak)
+                event["peak_memory"] = peak
+                if started_tracing:
+                    tracemalloc.stop()
+            self._emit(event)
+
+    def mark(self, phase):
+        """
+        Closes the running phase of the current operation (if any) and
+        starts `phase`.
+        """
+        if not self._stack:
+            return
+        frame = self._stack[-1]
+        now = time.perf_counter()
+
+        if frame[1] is not None:
+            seconds = now - frame[2]
+            key = (frame[0], frame[1])
+            calls, total = self.timers.get(key, (0, 0.0))
+            self.timers[key] = (calls + 1, total + seconds)
+            self._emit({"event": "phase", "operation": frame[0], "phase": frame[1], "seconds": seconds})
+
+        frame[1], frame[2] = phase, now
+
+    def count(self, name, n=1):
+        if self._stack:
+            counts = self._stack[-1][3]
+            counts[name] = counts.get(name, 0) + n
+
+    # ==========================
+    # EXPORT
+    # ==========================
+
+    def to_dict(self):
+        return {
+            "operations": {
+                op: {"calls": c, "seconds": t} for op, (c, t) in self.operations.items()
+            },
+            "phases": {
+                f"{op}.{ph}": {"calls": c, "seconds": t} for (op, ph), (c, t) in self.timers.items()
+            },
+            "counters": {f"{op}.{k}": n for (op, k), n in self.counters.items()},
+            "peak_memory": dict(self.peak_memory),
+        }
 
-        The input ontology is imported and normalized into a state graph,
-        while all changes are materialized as OntologyStateChange entities
-        according to the MEMENTO model.
+    def to_json(self, indent=2):
+        return json.dumps(self.to_dict(), indent=indent)
 
-        This method corresponds to the initialization phase described in
-        Section X of the paper. 
-        """
-        
-        # LOAD
-        g_in = graph_or_path if isinstance(graph_or_path, Graph) else Graph()
-        if not isinstance(graph_or_path, Graph):
-            if fmt:
-                g_in.parse(graph_or_path, format=fmt)
-            else:
-                g_in.parse(graph_or_path)
+    def to_prometheus(self, prefix="memento"):
+        lines = [f"# TYPE {prefix}_operations_total counter"]
+        for op, (c, _) in sorted(self.operations.items()):
+            lines.append(f'{prefix}_operations_total{{operation="{op}"}} {c}')
 
-        # ------------------------------------
-        # EXPAND owl:AllDisjointClasses
-        # ------------------------------------
+        lines.append(f"# TYPE {prefix}_operation_seconds_total counter")
+        for op, (_, t) in sorted(self.operations.items()):
+            lines.append(f'{prefix}_operation_seconds_total{{operation="{op}"}} {t:.6f}')
 
-        for (s,p,o) in expand_all_disjoint_classes(g_in):
-            g_in.add((s,p,o))
+        lines.append(f"# TYPE {prefix}_phase_seconds_total counter")
+        for (op, ph), (c, t) in sorted(self.timers.items()):
+            lines.append(f'{prefix}_phase_seconds_total{{operation="{op}",phase="{ph}"}} {t:.6f}')
 
-        # GRAPHS
-        state_iri = self._state_iri(ontology_name, state_name)
-        ocg = self.store.get_context(self._ocg_iri(ontology_name))
-        meta = self.store.get_context(self.meta_graph_iri)
-        state_graph = self.store.get_context(self._state_graph_iri(ontology_name, state_name))
+        lines.append(f"# TYPE {prefix}_events_total counter")
+        for (op, k), n in sorted(self.counters.items()):
+            lines.append(f'{prefix}_events_total{{operation="{op}",name="{k}"}} {n}')
 
-        agent_iri = URIRef(f"{self.base}/agent/{author_name.replace(' ', '_')}")
+        if self.peak_memory:
+            lines.append(f"# TYPE {prefix}_peak_memory_bytes gauge")
+            for op, b in sorted(self.peak_memory.items()):
+                lines.append(f'{prefix}_peak_memory_bytes{{operation="{op}"}} {b}')
 
-        # ONTOLOGY IRI
-        ontology_iri = None
-        for s in g_in.subjects(RDF.type, OWL.Ontology):
-            ontology_iri = s
-            break
+        return "\n".join(lines) + "\n"
+
+
+def instrumented(method):
+    """
+    Times a MementoSM operation (including its transaction commit) when
+    instrumentation is enabled; a plain call otherwise.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.instrumentation is None:
+            return method(self, *args, **kwargs)
+        with self.instrumentation.operation(method.__name__, self.store.store):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+# ================================================================
+# MEMENTO-SM — MODULE 2.3
+# Compact axiom table
+# ================================================================
+
+class TermDictionary:
+    """
+    Interns RDF terms as consecutive integer ids.
+    """
+    def __init__(self):
+        self.ids = {}
+        self.terms = []
+
+    def intern(self, term):
+        i = self.ids.get(term)
+        if i is None:
+            i = self.ids[term] = len(self.terms)
+            self.terms.append(term)
+        return i
+
+    def get(self, term, default=None):
+        return self.ids.get(term, default)
+
+    def __getitem__(self, i):
+        return self.terms[i]
+
+    def __len__(self):
+        return len(self.terms)
+
+
+class AxiomRecord:
+    __slots__ = ("node", "source", "prop", "target", "state", "change")
+
+    def __init__(self, node, source, prop, target, state, change):
+        self.node = node
+        self.source = source
+        self.prop = prop
+        self.target = target
+        self.state = state
+        self.change = change
+
+
+_RDF_TYPE = RDF.type
+_OWL_AXIOM = OWL.Axiom
+
+# predicates stored in the table columns, in column order
+AXIOM_COLUMNS = (
+    OWL.annotatedSource,
+    OWL.annotatedProperty,
+    OWL.annotatedTarget,
+    MEMENTO.hasOntologyState,
+    MEMENTO.hasOntologyStateChange,
+)
+
+class AxiomTable:
+    """
+    Reified axioms stored once, as interned term ids in array columns.
+
+    Row i is one version of the owl:Axiom node `nodes[i]`: whether it is
+    typed owl:Axiom, and its annotated source/property/target and
+    hasOntologyState / hasOntologyStateChange annotations (-1 when
+    missing). A state graph only keeps the sorted array of the rows it
+    contains, so copying a state shares its axioms instead of
+    duplicating them. Rows are copied on write: a context changing an
+    axiom it shares with others gets a row of its own.
+    """
+    def __init__(self):
+        self.terms = TermDictionary()
+        self.nodes = []
+        self.rows_of = {}
+        self.typed = array("b")
+        self.columns = [array("q") for _ in AXIOM_COLUMNS]
+        self.refs = array("q")
+        self.by_source = {}
+        self.members = {}
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def new_row(self, node, vector):
+        row = len(self.nodes)
+        self.nodes.append(node)
+        self.rows_of.setdefault(node, []).append(row)
+        self.typed.append(vector[0])
+        self.refs.append(0)
+        for c, col in enumerate(self.columns):
+            col.append(vector[c + 1])
+        if vector[1] >= 0:
+            self.by_source.setdefault(vector[1], array("q")).append(row)
+        return row
+
+    def vector(self, row):
+        """(typed, column ids...) of a row."""
+        return (self.typed[row],) + tuple(col[row] for col in self.columns)
+
+    def _write(self, row, vector):
+        self.typed[row] = vector[0]
+        for c, col in enumerate(self.columns):
+            if col[row] != vector[c + 1]:
+                col[row] = vector[c + 1]
+                if c == 0 and vector[1] >= 0:
+                    self.by_source.setdefault(vector[1], array("q")).append(row)
+
+    def value(self, row, col):
+        tid = self.columns[col][row]
+        return None if tid < 0 else self.terms[tid]
+
+    def record(self, row):
+        return AxiomRecord(self.nodes[row], *(self.value(row, c) for c in range(len(AXIOM_COLUMNS))))
+
+    def contains(self, ctx, row):
+        rows = self.members.get(ctx)
+        if not rows:
+            return False
+        i = bisect.bisect_left(rows, row)
+        return i < len(rows) and rows[i] == row
+
+    def include(self, ctx, row):
+        rows = self.members.setdefault(ctx, array("q"))
+        if not rows or rows[-1] < row:
+            rows.append(row)
+        elif not self.contains(ctx, row):
+            bisect.insort(rows, row)
+        else:
+            return
+        self.refs[row] += 1
+
+    def exclude(self, ctx, row):
+        rows = self.members.get(ctx)
+        if rows and self.contains(ctx, row):
+            del rows[bisect.bisect_left(rows, row)]
+            self.refs[row] -= 1
+
+    def row_in(self, ctx, node):
+        """The row of `node` in `ctx`, or None."""
+        for row in self.rows_of.get(node, ()):
+            if self.contains(ctx, row):
+                return row
+        return None
+
+    def assign(self, ctx, node, vector):
+        """
+        Makes `vector` the row of `node` in `ctx`: an equal row is
+        shared, a row no other context uses is changed in place, and
+        otherwise a new row is made.
+        """
+        current = self.row_in(ctx, node)
+        if current is not None and self.vector(current) == vector:
+            return
+        if not vector[0] and max(vector[1:]) < 0:
+            if current is not None:
+                self.exclude(ctx, current)
+            return
+
+        row = next((r for r in self.rows_of.get(node, ()) if self.vector(r) == vector), None)
+        if row is None and current is not None and self.refs[current] == 1:
+            self._write(current, vector)
+            return
+        if row is None:
+            row = self.new_row(node, vector)
+        if current is not None:
+            self.exclude(ctx, current)
+        self.include(ctx, row)
+
+    def records(self, ctx):
+        for row in self.members.get(ctx, ()):
+            yield self.record(row)
+
+    def virtual_triples(self, row):
+        node = self.nodes[row]
+        if self.typed[row]:
+            yield node, _RDF_TYPE, _OWL_AXIOM
+        for c, pred in enumerate(AXIOM_COLUMNS):
+            tid = self.columns[c][row]
+            if tid >= 0:
+                yield node, pred, self.terms[tid]
+
+
+_EMPTY_AXIOM = (0,) + (-1,) * len(AXIOM_COLUMNS)
+
+
+class CompactAxiomStore(Store):
+    """
+    In-memory store keeping the owl:Axiom reifications of state graphs
+    in an AxiomTable instead of as plain triples.
+
+    Adding (b, rdf:type, owl:Axiom) for a blank node turns it into a
+    table row, and the annotation triples of that node fill its
+    columns; everything else is stored in the base store. Reads and
+    serialization see the rows of a context as ordinary triples, and
+    adding or removing one of them only changes that context: rows
+    shared with other contexts are copied first. A second value for a
+    column of a row is kept in the base store.
+    """
+    context_aware = True
+    graph_aware = True
+
+    def __init__(self, base=None):
+        super().__init__()
+        self.base = base if base is not None else Memory()
+        self.axioms = AxiomTable()
+
+    def _ctx(self, context):
+        return context.identifier if context is not None else None
+
+    @staticmethod
+    def _is_axiom_triple(s, p, o):
+        return isinstance(s, BNode) and (p in AXIOM_COLUMNS or (p == _RDF_TYPE and o == _OWL_AXIOM))
+
+    def add(self, triple, context, quoted=False):
+        if self._is_axiom_triple(*triple):
+            self._add_axiom(context, triple[0], [triple[1:]])
+        else:
+            self.base.add(triple, context, quoted)
+
+    def addN(self, quads):
+        # the triples of each axiom node are applied together, so that a
+        # copied axiom finds the row it shares in one step
+        batch = {}
+        for s, p, o, c in quads:
+            if self._is_axiom_triple(s, p, o):
+                batch.setdefault((self._ctx(c), s), (c, []))[1].append((p, o))
+            else:
+                self.base.add((s, p, o), c)
+        for (_, node), (context, pos) in batch.items():
+            self._add_axiom(context, node, pos)
+
+    def _add_axiom(self, context, node, pos):
+        table = self.axioms
+        ctx = self._ctx(context)
+        current = table.row_in(ctx, node)
+
+        if current is None:
+            if node not in table.rows_of and (_RDF_TYPE, _OWL_AXIOM) not in pos:
+                for p, o in pos:
+                    self.base.add((node, p, o), context)
+                return
+            # annotations added before the type move into the row
+            for pred in AXIOM_COLUMNS:
+                for t, _ in list(self.base.triples((node, pred, None), context)):
+                    pos.append(t[1:])
+                    self.base.remove(t, context)
+
+        vector = list(table.vector(current) if current is not None else _EMPTY_AXIOM)
+        extra = []
+        for p, o in pos:
+            if p == _RDF_TYPE:
+                vector[0] = 1
+                continue
+            c = AXIOM_COLUMNS.index(p) + 1
+            tid = table.terms.intern(o)
+            if vector[c] < 0:
+                vector[c] = tid
+            elif vector[c] != tid:
+                extra.append((node, p, o))
+
+        table.assign(ctx, node, tuple(vector))
+        for t in extra:
+            self.base.add(t, context)
+
+    def _virtual(self, pattern, ctx):
+        s, p, o = pattern
+        if s is not None and not isinstance(s, BNode):
+            return
+        if p is not None and p != _RDF_TYPE and p not in AXIOM_COLUMNS:
+            return
+        if p == _RDF_TYPE and o is not None and o != _OWL_AXIOM:
+            return
+
+        table = self.axioms
+        rows = table.members.get(ctx)
+        if not rows:
+            return
+
+        if s is not None:
+            row = table.row_in(ctx, s)
+            candidates = (row,) if row is not None else ()
+        elif p == OWL.annotatedSource and o is not None:
+            tid = table.terms.get(o)
+            found = table.by_source.get(tid, ()) if tid is not None else ()
+            candidates = [r for r in dict.fromkeys(found) if table.contains(ctx, r)]
+        else:
+            candidates = rows
+
+        for row in candidates:
+            for t in table.virtual_triples(row):
+                if (p is None or t[1] == p) and (o is None or t[2] == o):
+                    yield t
+
+    def triples(self, triple, context=None):
+        if context is None:
+            for c in self.contexts():
+                yield from self.triples(triple, c)
+            return
+
+        yield from self.base.triples(triple, context)
+        for t in self._virtual(triple, self._ctx(context)):
+            yield t, iter((context,))
+
+    def remove(self, triple, context=None):
+        table = self.axioms
+        contexts = [context] if context is not None else list(self.contexts())
+        self.base.remove(triple, context)
+
+        for c in contexts:
+            ctx = self._ctx(c)
+            dropped = {}
+            for s, p, _ in self._virtual(triple, ctx):
+                dropped.setdefault(s, []).append(p)
+
+            # the other triples of a partly removed axiom stay, and a
+            # second value kept in the base takes the freed column
+            for node, preds in dropped.items():
+                vector = list(table.vector(table.row_in(ctx, node)))
+                promoted = []
+                for p in preds:
+                    if p == _RDF_TYPE:
+                        vector[0] = 0
+                        continue
+                    col = AXIOM_COLUMNS.index(p) + 1
+                    vector[col] = -1
+                    for t, _ in self.base.triples((node, p, None), c):
+                        vector[col] = table.terms.intern(t[2])
+                        promoted.append(t)
+                        break
+                for t in promoted:
+                    self.base.remove(t, c)
+                table.assign(ctx, node, tuple(vector))
+
+    def __len__(self, context=None):
+        if context is None:
+            return sum(len(Graph(store=self, identifier=c.identifier)) for c in self.contexts())
+        n = self.base.__len__(context=context)
+        table = self.axioms
+        for row in table.members.get(self._ctx(context), ()):
+            n += table.typed[row] + sum(1 for col in table.columns if col[row] >= 0)
+        return n
+
+    def vacuum(self):
+        """
+        Drops the table rows no context refers to anymore. Returns the
+        number of rows dropped.
+        """
+        old = self.axioms
+        table = AxiomTable()
+        remap = {}
+
+        for row in sorted({r for rows in old.members.values() for r in rows}):
+            vector = old.vector(row)
+            remap[row] = table.new_row(old.nodes[row], vector[:1] + tuple(
+                -1 if tid < 0 else table.terms.intern(old.terms[tid]) for tid in vector[1:]
+            ))
+
+        for ctx, rows in old.members.items():
+            if rows:
+                table.members[ctx] = array("q", (remap[r] for r in rows))
+                for r in table.members[ctx]:
+                    table.refs[r] += 1
+
+        self.axioms = table
+        return len(old) - len(table)
+
+    def contexts(self, triple=None):
+        seen = set()
+        for c in self.base.contexts(triple):
+            iri = c.identifier if isinstance(c, Graph) else c
+            seen.add(iri)
+            yield Graph(store=self, identifier=iri)
+        if triple is None:
+            for iri, rows in self.axioms.members.items():
+                if rows and iri not in seen:
+                    yield Graph(store=self, identifier=iri)
+
+    def bind(self, prefix, namespace, override=True):
+        self.base.bind(prefix, namespace, override)
+
+    def prefix(self, namespace):
+        return self.base.prefix(namespace)
+
+    def namespace(self, prefix):
+        return self.base.namespace(prefix)
+
+    def namespaces(self):
+        return self.base.namespaces()
+
+# ================================================================
+# MEMENTO-SM — MODULE 2.4
+# Binary checkpoints
+# ================================================================
+
+CHECKPOINT_MAGIC = b"MEMCKPT1"
+_CKPT_HEADER = struct.Struct("<8sQQ")
+# unsigned 32-bit term ids
+_CKPT_IDS = "I" if array("I").itemsize == 4 else "L"
+
+
+def _pad8(f):
+    n = -f.tell() % 8
+    if n:
+        f.write(b"\0" * n)
+
+
+def write_checkpoint(path, graphs, base=None):
+    """
+    Writes `graphs` (iterable of (iri, triples)) to a checkpoint file.
+
+    Layout: header (magic, index offset, index length), one array of
+    (s, p, o) term ids per graph, the term blob with its offsets, and a
+    JSON index at the end. Arrays are 8-byte aligned so a reader can
+    map them in place.
+    """
+    terms = TermDictionary()
+    index = {"base": base, "byteorder": sys.byteorder, "graphs": []}
+    tmp = f"{path}.tmp"
+
+    with open(tmp, "wb") as f:
+        f.write(_CKPT_HEADER.pack(CHECKPOINT_MAGIC, 0, 0))
+
+        for iri, triples in graphs:
+            ids = array(_CKPT_IDS)
+            for t in triples:
+                ids.extend(terms.intern(x) for x in t)
+            _pad8(f)
+            index["graphs"].append({"iri": str(iri), "at": f.tell(), "count": len(ids) // 3})
+            f.write(ids.tobytes())
+
+        offsets = array("Q", [0])
+        blob = bytearray()
+        for t in terms.terms:
+            blob += encode_term(t).encode("utf-8")
+            offsets.append(len(blob))
+
+        _pad8(f)
+        index["terms"] = {"count": len(terms), "offsets": f.tell()}
+        f.write(offsets.tobytes())
+        index["terms"]["blob"] = f.tell()
+        f.write(blob)
+
+        at = f.tell()
+        raw = json.dumps(index).encode("utf-8")
+        f.write(raw)
+        f.seek(0)
+        f.write(_CKPT_HEADER.pack(CHECKPOINT_MAGIC, at, len(raw)))
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp, path)
+    return index
+
+
+class CheckpointReader:
+    """
+    Memory-mapped view of a checkpoint file.
+
+    Nothing is decoded up front: the triples of a graph are read from
+    the mapped id array when requested, and terms are decoded on first
+    use and then cached.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, at, length = _CKPT_HEADER.unpack_from(self._mm, 0)
+        if magic != CHECKPOINT_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a Memento checkpoint")
+
+        self.index = json.loads(self._mm[at:at + length].decode("utf-8"))
+        self.base = self.index["base"]
+        self.swap = self.index["byteorder"] != sys.byteorder
+        self.graphs = {URIRef(g["iri"]): g for g in self.index["graphs"]}
+
+        info = self.index["terms"]
+        self._offsets = self._array("Q", info["offsets"], info["count"] + 1)
+        self._blob = info["blob"]
+        self._terms = [None] * info["count"]
+        self._pending = set()
+
+    def _array(self, typecode, at, n):
+        a = array(typecode)
+        a.frombytes(self._mm[at:at + n * a.itemsize])
+        if self.swap:
+            a.byteswap()
+        return a
+
+    def term(self, i):
+        t = self._terms[i]
+        if t is None:
+            start = self._blob + self._offsets[i]
+            end = self._blob + self._offsets[i + 1]
+            t = self._terms[i] = decode_term(self._mm[start:end].decode("utf-8"))
+        return t
+
+    def __len__(self):
+        return len(self.graphs)
+
+    def count(self, iri):
+        return self.graphs[URIRef(str(iri))]["count"]
+
+    def triples(self, iri):
+        g = self.graphs[URIRef(str(iri))]
+        ids = self._array(_CKPT_IDS, g["at"], g["count"] * 3)
+        term = self.term
+        for k in range(0, len(ids), 3):
+            yield term(ids[k]), term(ids[k + 1]), term(ids[k + 2])
+
+    def loader(self, iri):
+        """
+        A register_lazy() loader for graph `iri`. The file stays open
+        until every loader has been run or dropped (see release()).
+        """
+        iri = URIRef(str(iri))
+        self._pending.add(iri)
+        return _CheckpointLoader(self, iri)
+
+    def release(self, iri=None):
+        """
+        Marks the loader of `iri` as done and closes the file once no
+        loader is pending.
+        """
+        self._pending.discard(iri)
+        if not self._pending:
+            self.close()
+
+    def close(self):
+        if not self._mm.closed:
+            self._mm.close()
+        self._file.close()
+
+
+class _CheckpointLoader:
+    def __init__(self, reader, iri):
+        self.reader = reader
+        self.iri = iri
+
+    def __call__(self):
+        return self.reader.triples(self.iri)
+
+    def release(self):
+        self.reader.release(self.iri)
+
+
+def release_loader(loader):
+    """
+    Tells a lazy-context loader that it has been run or dropped.
+    """
+    release = getattr(loader, "release", None)
+    if release is not None:
+        release()
+
+# ================================================================
+# MEMENTO-SM — MODULE 2.5
+# Tiered state storage
+# ================================================================
+
+def pack_graph(triples, level=6):
+    """
+    Compressed binary form of a single graph: its term table and the
+    (s, p, o) id array, zlib-compressed.
+    """
+    terms = TermDictionary()
+    ids = array(_CKPT_IDS)
+    for t in triples:
+        ids.extend(terms.intern(x) for x in t)
+    head = json.dumps([encode_term(t) for t in terms.terms]).encode("utf-8")
+    return zlib.compress(struct.pack("<Q", len(head)) + head + ids.tobytes(), level)
+
+
+def unpack_graph(data):
+    raw = zlib.decompress(data)
+    (n,) = struct.unpack_from("<Q", raw, 0)
+    terms = [decode_term(v) for v in json.loads(raw[8:8 + n].decode("utf-8"))]
+    ids = array(_CKPT_IDS)
+    ids.frombytes(raw[8 + n:])
+    for k in range(0, len(ids), 3):
+        yield terms[ids[k]], terms[ids[k + 1]], terms[ids[k + 2]]
+
+
+class StateTier:
+    """
+    Keeps the in-memory state graphs within `max_resident_triples`.
+
+    State graphs (contexts under `prefix`) are tracked in LRU order;
+    when the resident ones exceed the budget the least recently used
+    are spilled to a compressed segment in `spill_dir` and registered
+    as lazy contexts of the wrapper, so the next access rehydrates them.
+    The `pinned` most recently used states are never spilled, since the
+    caller may still hold their graphs (e.g. both sides of a diff), and
+    nothing is spilled while a write operation holds the tier.
+
+    The resident triples are counted in a running total: a state graph
+    is measured when it becomes resident (created, written, rehydrated)
+    and when a write operation that touched it ends, not on every
+    access.
+    """
+    def __init__(self, prefix, max_resident_triples, spill_dir=None, pinned=2):
+        self.prefix = str(prefix)
+        self.budget = max_resident_triples
+        self.spill_dir = spill_dir or tempfile.mkdtemp(prefix="memento-spill-")
+        self.pinned = pinned
+        self.holds = 0
+        self.created = []
+        self.resident = OrderedDict()
+        self.sizes = {}
+        self.total = 0
+        self.dirty = set()
+        self.segments = {}
+        self.spilled = 0
+        self.rehydrated = 0
+        os.makedirs(self.spill_dir, exist_ok=True)
+
+    def _segment_path(self, iri):
+        name = hashlib.sha1(str(iri).encode("utf-8")).hexdigest()
+        return os.path.join(self.spill_dir, f"{name}.seg")
+
+    def tracks(self, iri):
+        return str(iri).startswith(self.prefix)
+
+    @contextmanager
+    def hold(self, wrapper):
+        self.holds += 1
+        try:
+            yield
+        finally:
+            self.holds -= 1
+            if not self.holds:
+                for iri in self.created:
+                    if iri in self.resident:
+                        self.resident.move_to_end(iri)
+                self.created = []
+                self.evict(wrapper)
+
+    def touch(self, wrapper, iri):
+        if not self.tracks(iri):
+            return
+        if self.holds:
+            if not len(Graph(store=wrapper.store, identifier=iri)):
+                # state being written by the running operation
+                self.created.append(iri)
+            self.dirty.add(iri)
+        elif iri not in self.sizes:
+            self.dirty.add(iri)
+        self.resident[iri] = True
+        self.resident.move_to_end(iri)
+        self.evict(wrapper)
+
+    def wrote(self, iris):
+        """
+        Records state graphs written without going through get_context
+        (e.g. by a transaction commit); new ones count as recently used.
+        """
+        for iri in iris:
+            if self.tracks(iri):
+                self.resident.setdefault(iri, True)
+                self.dirty.add(iri)
+
+    def forget(self, iri):
+        self.resident.pop(iri, None)
+        self.total -= self.sizes.pop(iri, 0)
+        self.dirty.discard(iri)
+        path = self.segments.pop(iri, None)
+        if path is not None and os.path.exists(path):
+            os.remove(path)
+
+    def _measure(self, wrapper):
+        for iri in self.dirty:
+            if iri in self.resident:
+                n = len(Graph(store=wrapper.store, identifier=iri))
+                self.total += n - self.sizes.get(iri, 0)
+                self.sizes[iri] = n
+        self.dirty.clear()
+
+    def evict(self, wrapper):
+        if self.holds:
+            return
+
+        self._measure(wrapper)
+        for iri in list(self.resident)[:max(0, len(self.resident) - self.pinned)]:
+            if self.total <= self.budget:
+                break
+            if self.sizes.get(iri):
+                self.spill(wrapper, iri)
+            del self.resident[iri]
+            self.total -= self.sizes.pop(iri, 0)
+
+    def spill(self, wrapper, iri):
+        ctx = Graph(store=wrapper.store, identifier=iri)
+        path = self._segment_path(iri)
+        with open(path, "wb") as f:
+            f.write(pack_graph(ctx.triples((None, None, None))))
+        ctx.remove((None, None, None))
+        self.segments[iri] = path
+        self.spilled += 1
+        wrapper.register_lazy(iri, functools.partial(self.rehydrate, iri))
+
+    def rehydrate(self, iri):
+        path = self.segments.pop(iri)
+        with open(path, "rb") as f:
+            data = f.read()
+        os.remove(path)
+        self.rehydrated += 1
+        self.resident[iri] = True
+        self.dirty.add(iri)
+        return unpack_graph(data)
+
+# ================================================================
+# MEMENTO-SM — MODULE 2.6
+# Retention policies
+# ================================================================
+
+class RetentionPolicy:
+    """
+    Which states of an ontology survive MementoSM.compact().
+
+    keep_last = int | None
+    Keeps the `keep_last` most recent states; None keeps every state
+    that still has a graph.
+
+    keep_releases = bool
+    Also keeps the tagged releases, i.e. states whose version has no
+    pre-release/metadata suffix (1.2.0, not 1.2.0-rc1).
+
+    keep = iterable of state names always kept.
+
+    The most recent state is always kept.
+    """
+    def __init__(self, keep_last=None, keep_releases=True, keep=()):
+        self.keep_last = keep_last
+        self.keep_releases = keep_releases
+        self.keep = set(keep)
+
+    def retained(self, memento, ontology_name, states):
+        keep = {s for s in self.keep if s in states}
+
+        if self.keep_last is None:
+            keep.update(states)
+        elif self.keep_last > 0:
+            keep.update(states[-self.keep_last:])
+
+        if self.keep_releases:
+            meta = memento._meta(ontology_name)
+            for s in states:
+                state_iri = memento._state_iri(ontology_name, s)
+                for v in meta.objects(state_iri, MEMENTO.hasOntologyStateVersion):
+                    if (v, MEMENTO.hasOntologyStateVersionMetadata, None) not in meta:
+                        keep.add(s)
+
+        if states:
+            keep.add(states[-1])
+        return keep
+
+# ================================================================
+# MEMENTO-SM — MODULE 2.7
+# Change-record index
+# ================================================================
+
+_ADD_ACTION = MEMENTO.AddChangeAction
+_DEL_ACTION = MEMENTO.DelChangeAction
+
+
+class ChangeIndex:
+    """
+    Classification of the changes of one state, as used by
+    get_ontology_state_diff():
+
+    - by_triple: (s, p, o) of each axiom reified by a change -> action
+    - by_entity: entity linked to a change in the state graph -> action
+    - records: the (triple, action) pairs listed when two states have
+      the same content
+    """
+    def __init__(self):
+        self.by_triple = {}
+        self.by_entity = {}
+        self.records = {}
+
+    def add_axiom(self, triple, action):
+        self.by_triple.setdefault(triple, action)
+        self.records[(triple, action)] = None
+
+    def add_entity(self, entity, action):
+        self.by_entity.setdefault(entity, action)
+
+    def action(self, triple):
+        action = self.by_triple.get(triple)
+        if action is None and isinstance(triple[0], URIRef):
+            action = self.by_entity.get(triple[0])
+        return action
+
+    def split(self):
+        added, removed = [], []
+        for triple, action in self.records:
+            (added if action == _ADD_ACTION else removed).append((triple, action))
+        return added, removed
+
+
+def build_change_index(ocg: Graph, state_graph: Graph, state_iri) -> ChangeIndex:
+    """
+    Builds the ChangeIndex of a state from its OCG changes, in one pass.
+    """
+    index = ChangeIndex()
+
+    for ch in ocg.subjects(MEMENTO.hasOntologyState, state_iri):
+
+        if (ch, RDF.type, _ADD_ACTION) in ocg:
+            action = _ADD_ACTION
+        elif (ch, RDF.type, _DEL_ACTION) in ocg:
+            action = _DEL_ACTION
+        else:
+            continue
+
+        found = False
+        for ax in ocg.subjects(MEMENTO.hasOntologyStateChange, ch):
+            s = next(ocg.objects(ax, OWL.annotatedSource), None)
+            p = next(ocg.objects(ax, OWL.annotatedProperty), None)
+            o = next(ocg.objects(ax, OWL.annotatedTarget), None)
+            if s and p and o:
+                found = True
+                index.add_axiom((s, p, o), action)
+
+        for ent in state_graph.subjects(MEMENTO.hasOntologyStateChange, ch):
+            if isinstance(ent, URIRef):
+                index.add_entity(ent, action)
+            if not found:
+                index.records[((ent, RDF.type, OWL.Class), action)] = None
+
+    return index
+
+def classify_diff(pure1, pure2, index1, index2):
+    """
+    Added and removed content triples between two states, each paired
+    with the action class of the change behind it (see ChangeIndex).
+    """
+    added = pure2 - pure1
+    removed = pure1 - pure2
+
+    # -------------------------------------------------
+    # FALLBACK: if semantic graphs are identical 
+    # use OCG change annotations to produce a diff anyway
+    # -------------------------------------------------
+
+    if not added and not removed:
+        return index2.split()
+
+    added_list   = [(t, index2.action(t)) for t in added]
+    removed_list = [(t, index1.action(t)) for t in removed]
+
+    return added_list, removed_list
+
+
+# the MementoSM and ontology inherited by forked diff_many() workers,
+# set for the lifetime of the pool (a replaced worker forks again)
+_DIFF_SHARED = {}
+
+def _diff_chunk(pairs):
+    memento, ontology_name = _DIFF_SHARED["memento"], _DIFF_SHARED["ontology"]
+    return list(memento._diff_pairs(ontology_name, pairs))
+
+# ================================================================
+# MEMENTO-SM — MODULE 2.8
+# Version index
+# ================================================================
+
+def version_key(version_str: str):
+    """
+    Sort key following semantic-version precedence: a pre-release
+    (X.Y.Z-meta) sorts before X.Y.Z, and its dot-separated identifiers
+    compare numerically or lexically.
+    """
+    major, minor, patch, metadata = parse_version(version_str)
+    if metadata is None:
+        return (major, minor, patch, 1, ())
+
+    ids = tuple(
+        (0, int(x), "") if x.isdigit() else (1, 0, x)
+        for x in metadata.split(".")
+    )
+    return (major, minor, patch, 0, ids)
+
+
+class VersionIndex:
+    """
+    States of one ontology sorted by version; states with the same
+    version keep their creation order. Each state's key is kept, so a
+    state is found by bisection on removal.
+    """
+    def __init__(self):
+        self.keys = []
+        self.entries = []
+        self._key_of = {}
+        self._seq = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, version, state_name):
+        self.remove(state_name)
+        key = (version_key(version), self._seq)
+        self._seq += 1
+        i = bisect.bisect_right(self.keys, key)
+        self.keys.insert(i, key)
+        self.entries.insert(i, (version, state_name))
+        self._key_of[state_name] = key
+
+    def remove(self, state_name):
+        key = self._key_of.pop(state_name, None)
+        if key is not None:
+            i = bisect.bisect_left(self.keys, key)
+            del self.keys[i]
+            del self.entries[i]
+
+    def range(self, low=None, high=None):
+        lo = 0 if low is None else bisect.bisect_left(self.keys, (version_key(low),))
+        hi = len(self.keys) if high is None else bisect.bisect_left(self.keys, (version_key(high),))
+        return self.entries[lo:hi]
+
+    def latest(self, major=None, minor=None):
+        if major is None:
+            return self.entries[-1] if self.entries else None
+
+        prefix = (major,) if minor is None else (major, minor)
+        bound = (major + 1,) if minor is None else (major, minor + 1)
+        i = bisect.bisect_left(self.keys, (bound,))
+        if i and self.keys[i - 1][0][:len(prefix)] == prefix:
+            return self.entries[i - 1]
+        return None
+
+# ================================================================
+# MEMENTO-SM — MODULE 2.9
+# Label index
+# ================================================================
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(text: str):
+    return [t.casefold() for t in _TOKEN_RE.findall(text)]
+
+
+class LabelIndex:
+    """
+    Inverted index token -> entity over the rdfs:label / rdfs:comment
+    literals of one state.
+
+    postings[token] = {(entity, property, language): occurrences}
+    literals        = the indexed (entity, property, literal) triples
+
+    Both are spread over `n_buckets` buckets (by token and by entity).
+    As with StateFingerprint, copy() shares the buckets with the
+    original until they are modified, so the index of a new state costs
+    memory in proportion to the labels its changes added. The sorted
+    token list for prefix queries is rebuilt when first needed.
+    """
+    PROPERTIES = (RDFS.label, RDFS.comment)
+
+    def __init__(self, n_buckets=256):
+        self.n_buckets = n_buckets
+        self.postings = [{} for _ in range(n_buckets)]
+        self.literals = [set() for _ in range(n_buckets)]
+        self._owned_postings = set(range(n_buckets))
+        self._owned_literals = set(range(n_buckets))
+        self._owned_keys = None
+        self._tokens = []
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _bucket(self, term):
+        return hash(term) % self.n_buckets
+
+    def copy(self):
+        other = LabelIndex.__new__(LabelIndex)
+        other.n_buckets = self.n_buckets
+        other.postings = list(self.postings)
+        other.literals = list(self.literals)
+        other._owned_postings = set()
+        other._owned_literals = set()
+        other._owned_keys = set()
+        other._tokens = self._tokens
+        other._size = self._size
+        # the buckets are shared now: neither side may write to them
+        self._owned_postings = set()
+        self._owned_literals = set()
+        self._owned_keys = set()
+        return other
+
+    def _posting(self, tok):
+        """
+        The (writable) posting of `tok`, created if missing.
+        """
+        b = self._bucket(tok)
+        if b not in self._owned_postings:
+            self.postings[b] = dict(self.postings[b])
+            self._owned_postings.add(b)
+        bucket = self.postings[b]
+        keys = bucket.get(tok)
+        if keys is None:
+            keys = bucket[tok] = {}
+            self._tokens = None
+        elif self._owned_keys is not None and tok not in self._owned_keys:
+            keys = bucket[tok] = dict(keys)
+        if self._owned_keys is not None:
+            self._owned_keys.add(tok)
+        return keys
+
+    def add(self, s, p, o):
+        if p not in self.PROPERTIES or not isinstance(s, URIRef) or not isinstance(o, Literal):
+            return
+        b = self._bucket(s)
+        if (s, p, o) in self.literals[b]:
+            return
+        if b not in self._owned_literals:
+            self.literals[b] = set(self.literals[b])
+            self._owned_literals.add(b)
+        self.literals[b].add((s, p, o))
+        self._size += 1
+
+        key = (s, p, o.language)
+        for tok in tokenize(str(o)):
+            keys = self._posting(tok)
+            keys[key] = keys.get(key, 0) + 1
+
+    @property
+    def tokens(self):
+        """
+        The indexed tokens, sorted (prefix queries).
+        """
+        if self._tokens is None:
+            self._tokens = sorted(tok for bucket in self.postings for tok in bucket)
+        return self._tokens
+
+    def _keys(self, tok, prefix):
+        if not prefix:
+            return self.postings[self._bucket(tok)].get(tok, {})
+        found = {}
+        tokens = self.tokens
+        i = bisect.bisect_left(tokens, tok)
+        while i < len(tokens) and tokens[i].startswith(tok):
+            found.update(self.postings[self._bucket(tokens[i])][tokens[i]])
+            i += 1
+        return found
+
+    def search(self, text, prefix=False, lang=None, properties=None):
+        """
+        Entities whose label/comment contains every token of `text`
+        (with prefix=True the last token may be a word prefix),
+        optionally restricted to a language tag and to some of the
+        indexed properties.
+        """
+        tokens = tokenize(text)
+        if not tokens:
+            return set()
+        if lang is not None:
+            lang = lang.lower()
+
+        result = None
+        for i, tok in enumerate(tokens):
+            entities = {
+                s for (s, p, language) in self._keys(tok, prefix and i == len(tokens) - 1)
+                if (lang is None or (language or "").lower() == lang)
+                and (properties is None or p in properties)
+            }
+            result = entities if result is None else result & entities
+            if not result:
+                break
+        return result
+
+
+def build_label_index(state_graph):
+    index = LabelIndex()
+    for p in LabelIndex.PROPERTIES:
+        for (s, _, o) in state_graph.triples((None, p, None)):
+            index.add(s, p, o)
+    return index
+
+# ================================================================
+# MEMENTO-SM — MODULE 2.10
+# Provenance index
+# ================================================================
+
+def timestamp_key(t):
+    """
+    prov:startedAtTime lexical form (UTC, "YYYY-MM-DDTHH:MM:SSZ") of a
+    datetime; strings are taken as already in that form.
+    """
+    if t is None or isinstance(t, str):
+        return t
+    if t.tzinfo is not None:
+        t = t.astimezone(timezone.utc).replace(tzinfo=None)
+    return t.replace(microsecond=0).isoformat() + "Z"
+
+
+class ProvenanceIndex:
+    """
+    Who changed what and when, for one ontology.
+
+    times, states = (timestamp, seq) keys and (timestamp, state_name,
+                    agent) entries of every state, sorted by time
+    by_agent      = agent -> (keys, state names) sorted by time
+    changes       = state_name -> [(change_iri, change_type)]
+    counts        = (agent, change_type) -> number of changes
+    """
+    def __init__(self):
+        self.times = []
+        self.states = []
+        self.by_agent = {}
+        self.changes = {}
+        self.counts = {}
+        self.agent_of = {}
+        self._seq = 0
+
+    def add_state(self, state_name, timestamp, agent):
+        key = (str(timestamp), self._seq)
+        self._seq += 1
+        i = bisect.bisect_right(self.times, key)
+        self.times.insert(i, key)
+        self.states.insert(i, (str(timestamp), state_name, agent))
+
+        keys, names = self.by_agent.setdefault(agent, ([], []))
+        i = bisect.bisect_right(keys, key)
+        keys.insert(i, key)
+        names.insert(i, state_name)
+
+        self.agent_of[state_name] = agent
+        self.changes.setdefault(state_name, [])
+
+    def add_change(self, state_name, change_iri, change_type):
+        self.changes.setdefault(state_name, []).append((change_iri, change_type))
+        key = (self.agent_of.get(state_name), change_type)
+        self.counts[key] = self.counts.get(key, 0) + 1
+
+    @staticmethod
+    def _window(keys, start, end):
+        lo = 0 if start is None else bisect.bisect_left(keys, (start,))
+        hi = len(keys) if end is None else bisect.bisect_left(keys, (end,))
+        return lo, hi
+
+    def states_between(self, start=None, end=None):
+        lo, hi = self._window(self.times, start, end)
+        return self.states[lo:hi]
+
+    def changes_by_agent(self, agent, start=None, end=None):
+        keys, names = self.by_agent.get(agent, ([], []))
+        lo, hi = self._window(keys, start, end)
+        return [
+            (ch, ch_type, names[i], keys[i][0])
+            for i in range(lo, hi)
+            for (ch, ch_type) in self.changes[names[i]]
+        ]
+
+    def change_counts(self, start=None, end=None):
+        if start is None and end is None:
+            return dict(self.counts)
+        counts = {}
+        for (_, state_name, agent) in self.states_between(start, end):
+            for (_, ch_type) in self.changes[state_name]:
+                counts[(agent, ch_type)] = counts.get((agent, ch_type), 0) + 1
+        return counts
+
+
+def build_provenance_index(meta: Graph, ocg: Graph, state_prefix: str) -> ProvenanceIndex:
+    """
+    Builds the ProvenanceIndex of an ontology from the meta graph
+    (state times and agents) and the OCG (per-entity change records),
+    without reading any state graph. Records without a DynDiff type
+    (see MementoSM `typed_changes`) are counted by action class.
+    """
+    index = ProvenanceIndex()
+    names = {}
+
+    for st in meta.subjects(RDF.type, MEMENTO.OntologyState):
+        if not str(st).startswith(state_prefix):
+            continue
+        ts = next(meta.objects(st, PROV.startedAtTime), None)
+        agent = next(meta.objects(st, PROV.wasGeneratedBy), None)
+        names[st] = str(st)[len(state_prefix):]
+        index.add_state(names[st], "" if ts is None else str(ts), agent)
+
+    for ch in ocg.subjects(RDF.type, MEMENTO.OntologyStateChange):
+        if (ch, RDF.type, DYNDIFF.BasicChange) in ocg:
+            continue
+        st = next(ocg.objects(ch, MEMENTO.hasOntologyState), None)
+        if st not in names:
+            continue
+        ch_type = None
+        for t in ocg.objects(ch, RDF.type):
+            if str(t).startswith(str(DYNDIFF)) and t != DYNDIFF.BasicChange:
+                ch_type = t
+                break
+        if ch_type is None:
+            ch_type = next(
+                (t for t in (_ADD_ACTION, _DEL_ACTION) if (ch, RDF.type, t) in ocg),
+                MEMENTO.AnyChangeAction
+            )
+        index.add_change(names[st], ch, ch_type)
+
+    return index
+
+# ================================================================
+# MEMENTO-SM — MODULE 2.11
+# Three-way merge
+# ================================================================
+
+_DECLARATIONS = (
+    OWL.Class,
+    OWL.ObjectProperty,
+    OWL.DatatypeProperty,
+    OWL.AnnotationProperty,
+    OWL.NamedIndividual
+)
+
+
+class MergeConflict(ValueError):
+    """
+    Raised by merge_states() when the two branches edit the same
+    entity/axiom incompatibly; `conflicts` lists them (see
+    find_merge_conflicts).
+    """
+    def __init__(self, conflicts):
+        super().__init__(f"{len(conflicts)} conflicting edits")
+        self.conflicts = conflicts
+
+    def __reduce__(self):
+        # pickled with its conflicts, e.g. from a shard worker
+        return type(self), (self.conflicts,)
+
+
+def _slots(added, removed):
+    """
+    Delta grouped as subject -> property -> (added, removed).
+    """
+    slots = {}
+    for t in added:
+        slots.setdefault(t[0], {}).setdefault(t[1], (set(), set()))[0].add(t)
+    for t in removed:
+        slots.setdefault(t[0], {}).setdefault(t[1], (set(), set()))[1].add(t)
+    return slots
+
+
+def _entity_delta(slots, ent):
+    added, removed = set(), set()
+    for (a, r) in slots.get(ent, {}).values():
+        added |= a
+        removed |= r
+    return added, removed
+
+
+def _undeclared(removed):
+    return {s for (s, p, o) in removed if p == RDF.type and o in _DECLARATIONS}
+
+
+def find_merge_conflicts(left_added, left_removed, right_added, right_removed):
+    """
+    Conflicting edits between two deltas against the same base, as
+    (subject, property, left (added, removed), right (added, removed)):
+
+    - both sides replace a value of the same (subject, property) slot:
+      they remove the same triple but add different ones
+    - one side removes the declaration of an entity that the other
+      side edits (property None, edits of every property)
+
+    The deltas are grouped by subject and property first, so the cost
+    is linear in their size.
+    """
+    left = _slots(left_added, left_removed)
+    right = _slots(right_added, right_removed)
+    left_gone = _undeclared(left_removed)
+    right_gone = _undeclared(right_removed)
+    conflicts = []
+
+    for ent in left.keys() & right.keys():
+        if (ent in left_gone) != (ent in right_gone):
+            conflicts.append((ent, None, _entity_delta(left, ent), _entity_delta(right, ent)))
+            continue
+
+        for prop in left[ent].keys() & right[ent].keys():
+            (la, lr), (ra, rr) = left[ent][prop], right[ent][prop]
+            if lr & rr and la != ra:
+                conflicts.append((ent, prop, left[ent][prop], right[ent][prop]))
+
+    return conflicts
+
+
+# ================================================================
+# MEMENTO-SM — MODULE 2.12
+# Parse cache
+# ================================================================
+
+def _parse(source, fmt=None):
+    g = Graph()
+    if fmt:
+        g.parse(source, format=fmt)
+    else:
+        g.parse(source)
+    return g
+
+
+class ParseCache:
+    """
+    Memoized ontology file parsing.
+
+    A file is identified by its content hash (SHA-256); the parsed
+    triples are stored as a packed graph (see pack_graph) under
+    `cache_dir`, and the `max_entries` most recently loaded files are
+    also kept in memory. The (path, mtime, size) of a file are
+    remembered, so an unchanged file is not even re-hashed.
+
+    load() always returns a new Graph with fresh blank nodes, so the
+    caller may modify it.
+    """
+    def __init__(self, cache_dir=None, max_entries=8):
+        self.cache_dir = cache_dir or os.path.join(tempfile.gettempdir(), "memento-parse-cache")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.max_entries = max_entries
+        self.digests = {}
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _digest(self, path):
+        st = os.stat(path)
+        key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+        digest = self.digests.get(key)
+        if digest is None:
+            h = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+            digest = self.digests[key] = h.hexdigest()
+        return digest
+
+    @staticmethod
+    def _format_tag(fmt):
+        # formats may be MIME types ("application/rdf+xml"): keep plain
+        # plugin names readable, hash anything else into a file name
+        if not fmt:
+            return "auto"
+        if re.fullmatch(r"[A-Za-z0-9_.-]+", fmt):
+            return fmt
+        return hashlib.blake2b(fmt.encode("utf-8"), digest_size=8).hexdigest()
+
+    def _triples(self, path, fmt):
+        digest = self._digest(path)
+        key = (digest, fmt)
+
+        triples = self.entries.get(key)
+        if triples is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return triples
+
+        seg = os.path.join(self.cache_dir, f"{digest}-{self._format_tag(fmt)}.seg")
+        if os.path.exists(seg):
+            with open(seg, "rb") as f:
+                triples = list(unpack_graph(f.read()))
+            self.hits += 1
+        else:
+            triples = list(_parse(path, fmt))
+            tmp = seg + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(pack_graph(triples, level=1))
+            os.replace(tmp, seg)
+            self.misses += 1
+
+        self.entries[key] = triples
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return triples
+
+    def load(self, path, fmt=None):
+        if not os.path.isfile(str(path)):
+            return _parse(path, fmt)
+
+        bnodes = {}
+
+        def fresh(t):
+            if isinstance(t, BNode):
+                b = bnodes.get(t)
+                if b is None:
+                    b = bnodes[t] = BNode()
+                return b
+            return t
+
+        g = Graph()
+        g.addN(
+            (fresh(s), p, fresh(o), g)
+            for (s, p, o) in self._triples(str(path), fmt)
+        )
+        return g
+
+    def clear(self):
+        self.entries.clear()
+        self.digests.clear()
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".seg"):
+                os.remove(os.path.join(self.cache_dir, name))
+
+# ================================================================
+# MEMENTO-SM — MODULE 2.13
+# State fingerprints
+# ================================================================
+
+_HASH_MOD = 1 << 128
+
+
+def triple_hash(t) -> int:
+    data = "\x00".join(term.n3() for term in t).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(data, digest_size=16).digest(), "big")
+
+
+def subject_hash(triples) -> int:
+    """
+    Order-independent hash of the content triples of one subject (0
+    for none), so that it can be recomputed from the subject alone.
+    """
+    return sum(triple_hash(t) for t in triples) % _HASH_MOD
+
+
+class StateFingerprint:
+    """
+    Merkle tree over the content of a state.
+
+    Subjects are spread over `n_buckets` buckets by the hash of their
+    IRI; a bucket keeps the hash of each of its subjects and the leaf
+    of the tree is their sum, so changing a subject updates one leaf
+    and its path to the root. copy() shares the buckets with the
+    original until they are modified, so the fingerprint of a new state
+    costs memory in proportion to the subjects its changes touched.
+
+    Two fingerprints with the same number of buckets compare top-down
+    (diff_buckets / diff_subjects), opening only the subtrees whose
+    hashes differ; `root` identifies the content as a whole.
+    """
+    def __init__(self, n_buckets=256):
+        if n_buckets < 1 or n_buckets & (n_buckets - 1):
+            raise ValueError("n_buckets must be a power of two")
+        self.n_buckets = n_buckets
+        self.buckets = [{} for _ in range(n_buckets)]
+        self.levels = []
+        level = [bytes(16)] * n_buckets
+        while True:
+            self.levels.append(level)
+            if len(level) == 1:
+                break
+            level = [self._node(level[i], level[i + 1]) for i in range(0, len(level), 2)]
+        self._owned = set(range(n_buckets))
+        self._dirty = set()
+
+    @staticmethod
+    def _node(left, right):
+        return hashlib.blake2b(left + right, digest_size=16).digest()
+
+    def bucket_of(self, subject):
+        digest = hashlib.blake2b(str(subject).encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big") % self.n_buckets
+
+    def copy(self):
+        fp = StateFingerprint.__new__(StateFingerprint)
+        fp.n_buckets = self.n_buckets
+        self._refresh()
+        fp.buckets = list(self.buckets)
+        fp.levels = [list(level) for level in self.levels]
+        fp._owned = set()
+        fp._dirty = set()
+        # the buckets are shared now: neither side may write to them
+        self._owned = set()
+        return fp
+
+    def set(self, subject, h):
+        """
+        Records the hash of the content of `subject` (0 removes it).
+        """
+        b = self.bucket_of(subject)
+        if b not in self._owned:
+            self.buckets[b] = dict(self.buckets[b])
+            self._owned.add(b)
+        bucket = self.buckets[b]
+        if h:
+            bucket[subject] = h
+        else:
+            bucket.pop(subject, None)
+        self._dirty.add(b)
+
+    def _refresh(self):
+        dirty = self._dirty
+        if not dirty:
+            return
+        leaves = self.levels[0]
+        for b in dirty:
+            leaves[b] = (sum(self.buckets[b].values()) % _HASH_MOD).to_bytes(16, "big")
+        for depth in range(1, len(self.levels)):
+            below, level = self.levels[depth - 1], self.levels[depth]
+            dirty = {i // 2 for i in dirty}
+            for i in dirty:
+                level[i] = self._node(below[2 * i], below[2 * i + 1])
+        self._dirty = set()
+
+    @property
+    def root(self):
+        self._refresh()
+        return self.levels[-1][0].hex()
+
+    def diff_buckets(self, other):
+        """
+        Buckets whose hashes differ from those of `other`.
+        """
+        if other.n_buckets != self.n_buckets:
+            raise ValueError("fingerprints with different bucket counts")
+        self._refresh()
+        other._refresh()
+
+        frontier = [0]
+        for depth in range(len(self.levels) - 1, -1, -1):
+            mine, theirs = self.levels[depth], other.levels[depth]
+            frontier = [i for i in frontier if mine[i] != theirs[i]]
+            if depth:
+                frontier = [c for i in frontier for c in (2 * i, 2 * i + 1)]
+        return frontier
+
+    def diff_subjects(self, other):
+        """
+        Subjects whose content differs from their content in `other`.
+        """
+        subjects = set()
+        for b in self.diff_buckets(other):
+            mine, theirs = self.buckets[b], other.buckets[b]
+            if mine is theirs:
+                continue
+            for s in mine.keys() | theirs.keys():
+                if mine.get(s) != theirs.get(s):
+                    subjects.add(s)
+        return subjects
+
+
+def build_state_fingerprint(content, n_buckets=256) -> StateFingerprint:
+    """
+    Fingerprint of a set of content triples, in one pass.
+    """
+    by_subject = {}
+    for t in content:
+        by_subject[t[0]] = (by_subject.get(t[0], 0) + triple_hash(t)) % _HASH_MOD
+
+    fp = StateFingerprint(n_buckets)
+    for s, h in by_subject.items():
+        fp.set(s, h)
+    return fp
+
+# ================================================================
+# MEMENTO-SM — MODULE 2.14
+# Vectorized content filter
+# ================================================================
+
+# the rules of MementoSM.is_content_triple()
+SYSTEM_PREDICATES = (
+    OWL.annotatedSource,
+    OWL.annotatedProperty,
+    OWL.annotatedTarget
+)
+
+SYSTEM_NAMESPACES = (str(MEMENTO), str(PROV))
+
+SYSTEM_TYPES = (
+    OWL.Axiom,
+    MEMENTO.OntologyState,
+    MEMENTO.OntologyStateVersion,
+    MEMENTO.OntologyStateChange,
+    PROV.Agent,
+    PROV.Person
+)
+
+# IRIs minted for system nodes. The {base}/disjoint/ IRIs of named
+# owl:AllDisjointClasses groups are minted too, but are content: the
+# group is the n-ary axiom itself and its members are diffed.
+SYSTEM_IRI_PARTS = ("/state/", "/version/", "/change/", "/axiom/")
+
+# term classes
+_BLANK = 1
+_SYSTEM_IRI = 2
+_SYSTEM_PREDICATE = 4
+_SYSTEM_TYPE = 8
+_TYPE_PREDICATE = 16
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def term_class(t) -> int:
+    """
+    Bit flags of a term for ContentFilter; each rule of
+    is_content_triple() tests one flag of one position. Memoized in a
+    bounded cache, since filters are short-lived.
+    """
+    if isinstance(t, BNode):
+        return _BLANK
+    if not isinstance(t, URIRef):
+        return 0
+
+    flags = 0
+    iri = str(t)
+    if any(part in iri for part in SYSTEM_IRI_PARTS):
+        flags |= _SYSTEM_IRI
+    if t in SYSTEM_PREDICATES or iri.startswith(SYSTEM_NAMESPACES):
+        flags |= _SYSTEM_PREDICATE
+    if t in SYSTEM_TYPES:
+        flags |= _SYSTEM_TYPE
+    if t == RDF.type:
+        flags |= _TYPE_PREDICATE
+    return flags
+
+
+class ContentFilter:
+    """
+    Batch version of MementoSM.is_content_triple().
+
+    Triples are encoded as rows of term ids (one TermDictionary per
+    filter, so rows encoded by the same filter compare), and the class
+    of each term is computed once, when it is first interned. MementoSM
+    uses a filter per call: its dictionary is freed with it and
+    concurrent calls share nothing.
+    Selecting the content of a graph is then a few mask operations on
+    the id columns, and diffs are row set differences; only the rows
+    of a delta are decoded back to RDF terms.
+
+    Rows are an (n, 3) NumPy integer array, or a frozenset of id
+    triples when NumPy is not installed (or use_numpy=False).
+    """
+    def __init__(self, use_numpy=None):
+        if use_numpy and np is None:
+            raise ValueError("use_numpy requires NumPy")
+        self.use_numpy = np is not None if use_numpy is None else use_numpy
+        self.terms = TermDictionary()
+        self.classes = bytearray()
+
+    def _intern(self, term):
+        i = self.terms.ids.get(term)
+        if i is None:
+            i = self.terms.intern(term)
+            self.classes.append(term_class(term))
+        return i
+
+    def encode(self, triples):
+        intern = self._intern
+        flat = array("q")
+        for s, p, o in triples:
+            flat.append(intern(s))
+            flat.append(intern(p))
+            flat.append(intern(o))
+        if self.use_numpy:
+            if not flat:
+                return np.empty((0, 3), dtype=np.int64)
+            return np.frombuffer(flat, dtype=np.int64).reshape(-1, 3)
+        it = iter(flat)
+        return frozenset(zip(it, it, it))
+
+    def select(self, triples):
+        """
+        Rows of the content triples among `triples`.
+        """
+        rows = self.encode(triples)
+        if self.use_numpy:
+            if not len(rows):
+                return rows
+            classes = np.frombuffer(bytes(self.classes), dtype=np.uint8)
+            cs, cp, co = classes[rows[:, 0]], classes[rows[:, 1]], classes[rows[:, 2]]
+            keep = (
+                ((cs & (_BLANK | _SYSTEM_IRI)) == 0)
+                & ((cp & _SYSTEM_PREDICATE) == 0)
+                & ~(((cp & _TYPE_PREDICATE) != 0) & ((co & _SYSTEM_TYPE) != 0))
+            )
+            return rows[keep]
+
+        classes = self.classes
+        return frozenset(
+            (s, p, o) for (s, p, o) in rows
+            if not classes[s] & (_BLANK | _SYSTEM_IRI)
+            and not classes[p] & _SYSTEM_PREDICATE
+            and not (classes[p] & _TYPE_PREDICATE and classes[o] & _SYSTEM_TYPE)
+        )
+
+    def difference(self, a, b):
+        """
+        Rows of `a` not in `b` (both without repeated rows).
+        """
+        if not self.use_numpy:
+            return a - b
+        if not len(a) or not len(b):
+            return a
+
+        rows = np.concatenate([a, b])
+        in_b = np.concatenate([np.zeros(len(a), dtype=bool), np.ones(len(b), dtype=bool)])
+        order = np.lexsort((in_b, rows[:, 2], rows[:, 1], rows[:, 0]))
+        rows, in_b = rows[order], in_b[order]
+
+        # a row of `a` sorts right before its copy in `b`, if any
+        matched = np.zeros(len(rows), dtype=bool)
+        matched[:-1] = np.all(rows[:-1] == rows[1:], axis=1) & in_b[1:]
+        return rows[~in_b & ~matched]
+
+    def union(self, a, b):
+        if not self.use_numpy:
+            return a | b
+        return np.unique(np.concatenate([a, b]), axis=0)
+
+    def decode(self, rows):
+        terms = self.terms.terms
+        if self.use_numpy:
+            rows = rows.tolist()
+        return [(terms[s], terms[p], terms[o]) for s, p, o in rows]
+
+# ================================================================
+# MAIN CLASS: MEMENTO-SM
+# ================================================================
+
+class MementoSM:
+    def __init__(
+        self,
+        store=None,
+        base_graph_uri="http://example.org/memento",
+        virtuoso_query_endpoint=None,
+        virtuoso_update_endpoint=None,
+        wal_path=None,
+        instrumentation=None,
+        compact_axioms=False,
+        max_resident_triples=None,
+        spill_dir=None,
+        label_index=False,
+        meta_per_ontology=False,
+        parse_cache=None,
+        fingerprints=False,
+        change_log=False,
+        typed_changes=False
+    ):
+
+        """
+        wal_path = str | None
+        If set, every write operation runs in a transaction logged to
+        this write-ahead log, and batches left committed but not applied
+        by a crash are replayed here.
+
+        instrumentation = Instrumentation | None
+        Collects per-phase timers and counters of the main operations;
+        disabled (None) by default.
+
+        compact_axioms = bool
+        In-memory store only: keeps the owl:Axiom reifications of the
+        state graphs in a shared table, so that a state copy does not
+        duplicate them.
+
+        max_resident_triples = int | None
+        In-memory store only: bounds the triples of the state graphs
+        kept in RAM. Least recently used states are spilled to
+        compressed segments in `spill_dir` (a temporary directory by
+        default) and reloaded when accessed again.
+
+        label_index = bool
+        Keeps a token index of the labels and comments of every new
+        state, updated from the label/comment changes of each state
+        (see search_labels). Without it, the index of a state is built
+        on its first search.
+
+        meta_per_ontology = bool
+        Keeps the version and provenance metadata of each ontology in
+        its own graph {base}/meta/{ontology}, registered in the global
+        meta graph with rdfs:seeAlso. Metadata found in the global graph
+        is moved there the first time the ontology is accessed.
+
+        parse_cache = ParseCache | None
+        Loads ontology files given by path through this cache, so that
+        an unchanged file is parsed only once.
+
+        fingerprints = bool
+        Keeps a Merkle fingerprint of the content of every new state
+        (see StateFingerprint), updated from the subjects touched by its
+        changes; get_ontology_state_diff() then reads only the subjects
+        whose hashes differ.
+
+        change_log = bool
+        Records the changes of every new state, as applied, in the graph
+        {base}/log/{ontology}; export_change_log() replays states from
+        it. Without it, a store can only be replicated by checkpoint.
+
+        typed_changes = bool
+        Gives every per-entity change record its DynDiff type in the
+        OCG and numbers it after the bulk changes of its state. Without
+        it (the original layout) entity records carry only their action
+        class and the first ones share their IRIs with the bulk changes,
+        so the provenance index counts them by action class and leaves
+        out those merged with a bulk change.
+        """
+
+        self._local = threading.local()
+        self._commit_lock = threading.Lock()
+
+        if store is not None and hasattr(store, "get_context"):
+            self.store = store
+        else:
+            self.store = VirtuosoStoreWrapper(
+                query_endpoint=virtuoso_query_endpoint,
+                update_endpoint=virtuoso_update_endpoint,
+                compact_axioms=compact_axioms
+            )
+
+        self.base = base_graph_uri
+        self.meta_graph_iri = URIRef(f"{self.base}/meta")
+
+        if max_resident_triples is not None:
+            if isinstance(self.store.store, SPARQLUpdateStore):
+                raise ValueError("max_resident_triples requires the in-memory store")
+            self.store.tier = StateTier(
+                f"{self.base}/graphs/", max_resident_triples, spill_dir=spill_dir
+            )
+
+        meta = self.store.get_context(self.meta_graph_iri)
+
+        meta.add((MEMENTO.hasOntologyStateChange, RDF.type, OWL.AnnotationProperty))
+        meta.add((MEMENTO.hasOntologyState, RDF.type, OWL.AnnotationProperty))
+
+
+        GITHUB_BASE = "https://raw.githubusercontent.com/dfsantamaria/Memento/main/ontologies"
+
+        self._memento_url = f"{GITHUB_BASE}/memento-o.owl"
+        self._dyndiff_url = f"{GITHUB_BASE}/DynDiffOnto.owl"
+        self._prov_url     = f"{GITHUB_BASE}/prov-o.ttl"
+
+        meta = self.store.get_context(self.meta_graph_iri)
+        meta.remove((None, None, None))
+
+        try:
+            meta.parse(self._memento_url, format="xml")       
+            meta.parse(self._prov_url, format="turtle")       
+            meta.parse(self._dyndiff_url, format="turtle")      
+
+            print("✓ Base ontologies uploaded successfully from GitHub")
+        except Exception as e:
+            print("Error loading ontologies from GitHub:", e)
+
+        meta.add((MEMENTO.hasPreviousState, RDF.type, OWL.ObjectProperty))
+
+        self.instrumentation = instrumentation
+        self.change_index = {}
+        self.version_index = {}
+        self.label_index = {}
+        self.index_labels = label_index
+        self.fingerprint_index = {}
+        self.index_fingerprints = fingerprints
+        self.change_log = change_log
+        self.typed_changes = typed_changes
+        self.provenance_index = {}
+        self.content_index = OrderedDict()
+        self.content_cache_size = 8
+        self.meta_per_ontology = meta_per_ontology
+        self.parse_cache = parse_cache
+        self._meta_graphs = set()
+        self.wal = WriteAheadLog(wal_path) if wal_path else None
+        if self.wal is not None:
+            self.wal.recover(self.store.store)
+
+    # ================================================================
+    # TRANSACTIONS
+    # ================================================================
+
+    # The open transaction belongs to the thread that opened it: while it
+    # is open, `store` is the transaction for that thread only, so that
+    # writes running concurrently on other threads (AsyncMementoSM) do
+    # not join or clobber it.
+
+    @property
+    def _tx(self):
+        return getattr(self._local, "tx", None)
+
+    @property
+    def store(self):
+        tx = getattr(self._local, "tx", None)
+        return self._store if tx is None else tx
+
+    @store.setter
+    def store(self, wrapper):
+        self._store = wrapper
+
+    @contextmanager
+    def transaction(self, wal_path=None):
+        """
+        Buffers every mutation to meta, OCG and state graphs made inside
+        the block and applies them in one batch on exit; nothing is
+        written if the block raises. Nested blocks join the outer one.
+
+            with m.transaction():
+                m.create_ontology_state(...)
+                m.create_ontology_state(...)
+        """
+        if self._tx is not None:
+            yield self._tx
+            return
+
+        wal = WriteAheadLog(wal_path) if wal_path else self.wal
+        tx = self._local.tx = MementoTransaction(self._store, wal)
+
+        try:
+            yield tx
+        except BaseException:
+            self._local.tx = None
+            tx.rollback()
+            self.change_index.clear()
+            self.version_index.clear()
+            self.label_index.clear()
+            self.fingerprint_index.clear()
+            self.provenance_index.clear()
+            self.content_index.clear()
+            self._meta_graphs.clear()
+            raise
+
+        self._local.tx = None
+        self._mark("persist")
+        # one batch at a time: the WAL is truncated after each one
+        with self._commit_lock:
+            tx.commit()
+
+    # ================================================================
+    # INSTRUMENTATION
+    # ================================================================
+
+    def _mark(self, phase):
+        if self.instrumentation is not None:
+            self.instrumentation.mark(phase)
+
+    def _count(self, name, n=1):
+        if self.instrumentation is not None:
+            self.instrumentation.count(name, n)
+
+    def _holding_states(self):
+        wrapper = self.store if self._tx is None else self._tx.wrapper
+        tier = getattr(wrapper, "tier", None)
+        return tier.hold(wrapper) if tier is not None else nullcontext()
+
+    # ================================================================
+    # CHANGE INDEX
+    # ================================================================
+
+    def _change_index(self, ontology_name, state_name, state_graph=None):
+        state_iri = self._state_iri(ontology_name, state_name)
+        index = self.change_index.get(state_iri)
+        if index is None:
+            ocg = self.store.get_context(self._ocg_iri(ontology_name))
+            if state_graph is None:
+                state_graph = self.get_ontology_state(ontology_name, state_name)
+            index = self.change_index[state_iri] = build_change_index(ocg, state_graph, state_iri)
+        return index
+
+    # ================================================================
+    # UTILITY
+    # ================================================================
+
+    def _state_iri(self, ontology_name, state_name):
+        return make_state_iri(self.base, ontology_name, state_name)
+
+    def _ocg_iri(self, ontology_name):
+        return make_ocg_iri(self.base, ontology_name)
+
+    def _state_graph_iri(self, ontology_name, state_name):
+        return make_state_graph_iri(self.base, ontology_name, state_name)
+
+    def _meta_iri(self, ontology_name):
+        return make_meta_iri(self.base, ontology_name)
+
+    def _log_iri(self, ontology_name):
+        return make_log_iri(self.base, ontology_name)
+
+    def _meta(self, ontology_name):
+        """
+        The graph holding the metadata of an ontology: the global meta
+        graph, or its own one with meta_per_ontology.
+        """
+        if not self.meta_per_ontology:
+            return self.store.get_context(self.meta_graph_iri)
+        if ontology_name not in self._meta_graphs:
+            self._migrate_meta(ontology_name)
+        return self.store.get_context(self._meta_iri(ontology_name))
+
+    def _migrate_meta(self, ontology_name):
+        meta = self.store.get_context(self.meta_graph_iri)
+        target_iri = self._meta_iri(ontology_name)
+
+        if (self.meta_graph_iri, RDFS.seeAlso, target_iri) not in meta:
+            target = self.store.get_context(target_iri)
+            prefixes = (
+                str(self._state_iri(ontology_name, "")),
+                f"{self.base}/version/{ontology_name}/",
+            )
+            moved = [t for t in meta if isinstance(t[0], URIRef) and str(t[0]).startswith(prefixes)]
+            agents = {o for (_, p, o) in moved if p == PROV.wasGeneratedBy}
+
+            for t in moved:
+                target.add(t)
+                meta.remove(t)
+            for agent in agents:
+                for t in meta.triples((agent, None, None)):
+                    target.add(t)
+
+            meta.add((self.meta_graph_iri, RDFS.seeAlso, target_iri))
+
+        self._meta_graphs.add(ontology_name)
+
+    def get_ontology_state(self, ontology_name, state_name):
+        return self.store.get_context(self._state_graph_iri(ontology_name, state_name))
+
+    def get_ontology_states(self, ontology_name):
+        """
+        Sort states by the PROV:startedAtTime timestamp in the meta graph.
+        """
+        prefix = f"{self.base}/graphs/{ontology_name}/state/"
+        found = []
+        meta = self._meta(ontology_name)
+
+        for iri in self.store.context_iris():
+            uri = str(iri)
+            if uri.startswith(prefix):
+                sname = uri.split("/")[-1]
+                state_iri = self._state_iri(ontology_name, sname)
+                tvals = list(meta.objects(state_iri, PROV.startedAtTime))
+                ts = str(tvals[0]) if tvals else ""
+                found.append((sname, ts))
+
+        found.sort(key=lambda x: x[1])
+        return [s for s, _ in found]
+
+    def last_state_iri(self, ontology_name):
+        states = self.get_ontology_states(ontology_name)
+        if not states:
+            return None
+        return self._state_iri(ontology_name, states[-1])
+
+    def get_ontologies(self):
+        """
+        Names of the ontologies in the store (those with an OCG), sorted.
+        """
+        prefix = f"{self.base}/ocg/"
+        return sorted(
+            str(iri)[len(prefix):]
+            for iri in self.store.context_iris()
+            if str(iri).startswith(prefix)
+        )
+
+    # ================================================================
+    # VERSIONS
+    # ================================================================
+
+    def _version_index(self, ontology_name):
+        index = self.version_index.get(ontology_name)
+        if index is not None:
+            return index
+
+        meta = self._meta(ontology_name)
+        found = []
+        for state_name in self.get_ontology_states(ontology_name):
+            state_iri = self._state_iri(ontology_name, state_name)
+            for v in meta.objects(state_iri, MEMENTO.hasOntologyStateVersion):
+                label = next(meta.objects(v, MEMENTO.hasOntologyStateVersionLabel), None)
+                if label is not None:
+                    found.append((str(label), state_name))
+
+        index = self.version_index[ontology_name] = VersionIndex()
+        for version, state_name in found:
+            index.add(version, state_name)
+        return index
+
+    def _index_version(self, ontology_name, state_name, version):
+        index = self.version_index.get(ontology_name)
+        if index is not None:
+            index.remove(state_name)
+            index.add(str(version), state_name)
+
+    def states_by_version(self, ontology_name, low=None, high=None):
+        """
+        States whose version v satisfies low <= v < high (semantic
+        version precedence; either bound may be None), as a list of
+        (version, state_name) sorted by version.
+        """
+        return self._version_index(ontology_name).range(low, high)
+
+    def latest_version(self, ontology_name, major=None, minor=None):
+        """
+        (version, state_name) of the highest version, optionally within
+        a major (and minor) release line, e.g. latest_version(o, major=2)
+        for "latest 2.x"; None if there is none.
+        """
+        return self._version_index(ontology_name).latest(major, minor)
+
+    # ================================================================
+    # LABEL SEARCH
+    # ================================================================
+
+    def _label_index(self, ontology_name, state_name, state_graph=None):
+        state_iri = self._state_iri(ontology_name, state_name)
+        index = self.label_index.get(state_iri)
+        if index is None:
+            if state_graph is None:
+                state_graph = self.get_ontology_state(ontology_name, state_name)
+            index = self.label_index[state_iri] = build_label_index(state_graph)
+        return index
+
+    def _next_label_index(self, ontology_name, prev_state_name):
+        """
+        Starting point of the label index of a new state: a copy of the
+        previous state's index, sharing its unchanged buckets, or None
+        if labels are not indexed.
+        """
+        if not self.index_labels:
+            return None
+        if prev_state_name is None:
+            return LabelIndex()
+        return self._label_index(ontology_name, prev_state_name).copy()
+
+    def search_labels(self, ontology_name, state_name, text, prefix=False, lang=None, properties=None):
+        """
+        Entities of a state whose rdfs:label or rdfs:comment contains
+        every word of `text` (case-insensitive).
+
+            search_labels(o, "s2", "heart fail", prefix=True, lang="en")
+
+        prefix = the last word may be the beginning of a word
+        lang = language tag of the literal ("" for untagged ones)
+        properties = restrict to some of rdfs:label / rdfs:comment
+        """
+        return self._label_index(ontology_name, state_name).search(
+            text, prefix=prefix, lang=lang, properties=properties
+        )
+
+    # ================================================================
+    # FINGERPRINTS
+    # ================================================================
+
+    def _fingerprint(self, ontology_name, state_name):
+        state_iri = self._state_iri(ontology_name, state_name)
+        fp = self.fingerprint_index.get(state_iri)
+        if fp is None:
+            fp = self.fingerprint_index[state_iri] = build_state_fingerprint(
+                self._content_set(ontology_name, state_name)
+            )
+        return fp
+
+    def _next_fingerprint(self, ontology_name, prev_state_name):
+        """
+        Starting point of the fingerprint of a new state: a copy of the
+        previous state's one, or None if states are not fingerprinted.
+        """
+        if not self.index_fingerprints:
+            return None
+        if prev_state_name is None:
+            return StateFingerprint()
+        return self._fingerprint(ontology_name, prev_state_name).copy()
+
+    def _update_fingerprint(self, fp, state_graph, subjects):
+        for s in subjects:
+            if isinstance(s, URIRef):
+                fp.set(s, subject_hash(self._subject_content(state_graph, s)))
+
+    def state_fingerprint(self, ontology_name, state_name):
+        """
+        StateFingerprint of a state; `.root` is equal for states with
+        the same content, and diff_buckets() tells two stores which
+        parts of a state they have to exchange.
+        """
+        return self._fingerprint(ontology_name, state_name)
+
+    # ================================================================
+    # PROVENANCE
+    # ================================================================
+
+    def _agent_iri(self, agent):
+        if isinstance(agent, URIRef):
+            return agent
+        return URIRef(f"{self.base}/agent/{agent.replace(' ', '_')}")
+
+    def _provenance_index(self, ontology_name):
+        index = self.provenance_index.get(ontology_name)
+        if index is None:
+            meta = self._meta(ontology_name)
+            ocg = self.store.get_context(self._ocg_iri(ontology_name))
+            prefix = str(self._state_iri(ontology_name, ""))
+            index = self.provenance_index[ontology_name] = build_provenance_index(meta, ocg, prefix)
+        return index
+
+    def _index_provenance(self, ontology_name, state_name, timestamp, agent_iri, changes):
+        index = self.provenance_index.get(ontology_name)
+        if index is not None:
+            index.add_state(state_name, timestamp, agent_iri)
+            for ch_iri, ch_type in changes:
+                index.add_change(state_name, ch_iri, ch_type)
+
+    def states_between(self, ontology_name, start=None, end=None):
+        """
+        States generated at start <= t < end (datetimes or xsd:dateTime
+        strings; either bound may be None), as a list of
+        (timestamp, state_name, agent) sorted by time.
+        """
+        return self._provenance_index(ontology_name).states_between(
+            timestamp_key(start), timestamp_key(end)
+        )
+
+    def changes_by_agent(self, ontology_name, agent, start=None, end=None):
+        """
+        Change records of the states generated by `agent` (a name or an
+        agent IRI) in [start, end), as (change_iri, change_type,
+        state_name, timestamp).
+
+            changes_by_agent(o, "Shaker_El-Sappagh",
+                             start=datetime.utcnow() - timedelta(days=30))
+        """
+        return self._provenance_index(ontology_name).changes_by_agent(
+            self._agent_iri(agent), timestamp_key(start), timestamp_key(end)
+        )
+
+    def change_counts(self, ontology_name, start=None, end=None):
+        """
+        Number of change records per (agent, change_type), optionally
+        within a time window.
+        """
+        return self._provenance_index(ontology_name).change_counts(
+            timestamp_key(start), timestamp_key(end)
+        )
+
+    # ================================================================
+    # DISJOINTNESS
+    # ================================================================
+
+    def disjoint_groups(self, ontology_name, state_name):
+        """
+        Members of each owl:AllDisjointClasses group of a state.
+        """
+        g = self.get_ontology_state(ontology_name, state_name)
+        return {
+            adc: rdf_list_items(g, head)
+            for adc, head in g.subject_objects(OWL.members)
+            if (adc, RDF.type, OWL.AllDisjointClasses) in g
+        }
+
+    def disjoint_pairs(self, ontology_name, state_name):
+        """
+        Pairwise (a, owl:disjointWith, b) triples implied by the groups
+        of a state, generated on demand.
+        """
+        for items in self.disjoint_groups(ontology_name, state_name).values():
+            for i in range(len(items)):
+                for j in range(i + 1, len(items)):
+                    if isinstance(items[i], URIRef) and isinstance(items[j], URIRef):
+                        yield (items[i], OWL.disjointWith, items[j])
+
+# ================================================================
+# MEMENTO-SM — MODULE 3
+# create_ontology() 
+# ================================================================
+
+    @instrumented
+    @atomic
+    def create_ontology(
+        self,
+        ontology_name: str,
+        graph_or_path,
+        state_name: str,
+        author_name: str,
+        version="1.0",
+        fmt=None,
+        expand_disjoint=True
+    ):
+        """ 
+        Creates the initial ontology snapshot (state s0).
+
+        The input ontology is imported and normalized into a state graph,
+        while all changes are materialized as OntologyStateChange entities
+        according to the MEMENTO model.
+
+        This method corresponds to the initialization phase described in
+        Section X of the paper. 
+        """
+
+        """
+        expand_disjoint = bool
+        If True, every owl:AllDisjointClasses group is expanded into
+        pairwise owl:disjointWith axioms. If False, each group gets an
+        IRI and is kept as a single n-ary axiom; its members can then be
+        edited with ((group, owl:members, cls), addI/delI) changes, and
+        the pairs are available on demand from disjoint_pairs().
+        """
+        
+        # LOAD
+        self._mark("load")
+        g_in = graph_or_path if isinstance(graph_or_path, Graph) else Graph()
+        if not isinstance(graph_or_path, Graph) and self.parse_cache is not None:
+            g_in = self.parse_cache.load(graph_or_path, fmt)
+        elif not isinstance(graph_or_path, Graph):
+            if fmt:
+                g_in.parse(graph_or_path, format=fmt)
+            else:
+                g_in.parse(graph_or_path)
+
+        # ------------------------------------
+        # EXPAND owl:AllDisjointClasses
+        # ------------------------------------
+
+        self._mark("expand_disjoint")
+        if expand_disjoint:
+            for (s,p,o) in expand_all_disjoint_classes(g_in):
+                g_in.add((s,p,o))
+        else:
+            name_disjoint_groups(g_in, self.base, ontology_name)
+
+        # GRAPHS
+        self._mark("copy")
+        state_iri = self._state_iri(ontology_name, state_name)
+        self.change_index.pop(state_iri, None)
+        self.label_index.pop(state_iri, None)
+        self.fingerprint_index.pop(state_iri, None)
+        self.content_index.pop(state_iri, None)
+        ocg = self.store.get_context(self._ocg_iri(ontology_name))
+        meta = self._meta(ontology_name)
+        state_graph = self.store.get_context(self._state_graph_iri(ontology_name, state_name))
+
+        agent_iri = URIRef(f"{self.base}/agent/{author_name.replace(' ', '_')}")
+
+        # ONTOLOGY IRI
+        ontology_iri = None
+        for s in g_in.subjects(RDF.type, OWL.Ontology):
+            ontology_iri = s
+            break
         if ontology_iri is None:
             ontology_iri = URIRef(f"http://example.org/ontology/{ontology_name}")
 
@@ -494,6 +3727,9 @@ class MementoSM:
             if isinstance(o, BNode):
                 copy_bnode_closure(g_in, state_graph, o)
 
+        self._count("triples_copied", len(g_in))
+        self._mark("reify")
+
         ts = iso_timestamp()
         ts_lit = Literal(ts, datatype=XSD.dateTime)
 
@@ -570,6 +3806,8 @@ class MementoSM:
             # OCG
             ocg.add((ch_iri, RDF.type, MEMENTO.OntologyStateChange))
             ocg.add((ch_iri, RDF.type, change_action_class(ch_type)))
+            if self.typed_changes:
+                ocg.add((ch_iri, RDF.type, ch_type))
             ocg.add((ch_iri, MEMENTO.hasOntologyState, state_iri))
 
             # STATE GRAPH
@@ -601,6 +3839,7 @@ class MementoSM:
             ocg.add((axiom_iri, MEMENTO.hasOntologyState, state_iri))
 
             ax_state = add_axiom_bnode(state_graph, adc, OWL.members, members)
+            self._count("axioms_created")
             state_graph.add((ax_state, MEMENTO.hasOntologyState, state_iri))
 
         # --------------------------
@@ -626,6 +3865,7 @@ class MementoSM:
 
                 # STATE (BNode obbligatorio)
                 ax_state = add_axiom_bnode(state_graph, s, RDF.type, o)
+                self._count("axioms_created")
                 state_graph.add((ax_state, MEMENTO.hasOntologyState, state_iri))
                 if s in entity_to_change:
                     state_graph.add((ax_state, MEMENTO.hasOntologyStateChange, entity_to_change[s]))
@@ -662,6 +3902,7 @@ class MementoSM:
             ocg.add((axiom_iri, MEMENTO.hasOntologyState, state_iri))
 
             ax_state = add_axiom_bnode(state_graph, s, p, o)
+            self._count("axioms_created")
             state_graph.add((ax_state, MEMENTO.hasOntologyState, state_iri))
 
             if s in entity_to_change:
@@ -676,6 +3917,7 @@ class MementoSM:
                     entity_to_change[s]
                 ))
 
+        self._mark("metadata")
         version_iri = URIRef(f"{self.base}/version/{ontology_name}/{state_name}-version-{version}")
         now = ts_lit
 
@@ -755,6 +3997,12 @@ class MementoSM:
                 Literal(metadata, datatype=XSD.string)
             ))
 
+        self._index_version(ontology_name, state_name, version)
+        self.provenance_index.pop(ontology_name, None)
+        if self.index_labels:
+            self.label_index[state_iri] = build_label_index(state_graph)
+
+        self._mark("persist")
         self.store.persist()
         return state_iri
 
@@ -763,6 +4011,8 @@ class MementoSM:
 # create_ontology_state(), revert_ontology(), diff, remove
 # ================================================================
 
+    @instrumented
+    @atomic
     def create_ontology_state(
         self,
         ontology_name: str,
@@ -772,7 +4022,9 @@ class MementoSM:
         author: str = None,
         version="1.0",
         prev_state_name=None,
-        bulk=False
+        bulk=False,
+        drop_noops=False,
+        timestamp=None
     ):
         """
         Creates a new ontology state by applying a set of atomic changes
@@ -780,7 +4032,10 @@ class MementoSM:
 
         Each change is reified as an OWL Axiom and linked to exactly one
         OntologyStateChange entity. Optionally, multiple changes of the
-        same type can be grouped using bulk mode.
+        same type can be grouped using bulk mode. Besides the DynDiff
+        types, a change may be typed memento:AddChangeAction or
+        memento:DelChangeAction to add or remove exactly its triple
+        (see EXACT_CHANGE_TYPES).
 
         This method implements the state evolution mechanism defined in
         the MEMENTO-SM model.
@@ -791,44 +4046,104 @@ class MementoSM:
         If True, changes of the same type are grouped into a single
         OntologyStateChange entity, following the bulk strategy
         described in the paper.
+
+        drop_noops = bool
+        If True, changes that would not alter the previous state (see
+        validate_changes) are discarded before any change entity or
+        axiom is created.
+
+        timestamp = str | None
+        prov:startedAtTime of the state ("YYYY-MM-DDTHH:MM:SSZ"),
+        default now; set when replaying a change log.
         """
 
-        meta = self.store.get_context(self.meta_graph_iri)
+        self._mark("load")
+        if previous_state is not None:
+            prev_state_name = previous_state
+
+        states = self.get_ontology_states(ontology_name)
+        ontology_iri = self._ontology_iri(ontology_name, states)
+        if prev_state_name is None:
+            prev_state_name = states[-1] if states else None
+
+        self._write_state(
+            ontology_name, state_name, changes, prev_state_name, author, version,
+            timestamp or iso_timestamp(), ontology_iri, drop_noops=drop_noops
+        )
+
+    def _ontology_iri(self, ontology_name, states=None):
+        """
+        IRI of the owl:Ontology declared by the first state of an
+        ontology (a placeholder IRI if there is none).
+        """
+        if states is None:
+            states = self.get_ontology_states(ontology_name)
+        if states:
+            g0 = self.get_ontology_state(ontology_name, states[0])
+            for s in g0.subjects(RDF.type, OWL.Ontology):
+                return s
+        return URIRef(f"http://example.org/ontology/{ontology_name}")
+
+    def _write_state(self, ontology_name, state_name, changes, prev_state_name, author,
+                     version, ts, ontology_iri, axioms=None, drop_noops=False):
+        """
+        Creates state `state_name` on top of `prev_state_name`, for
+        create_ontology_state() and apply_change_sequence(): the
+        previous state graph is copied inside the store, then only the
+        triples the changes touch are written to the copy, and the OCG
+        and meta graph additions go out in one addN each.
+
+        axioms = dict | None
+        (s, p, o) -> OCG axiom reifying it, updated with the axioms
+        created here; None looks them up in the OCG.
+
+        Returns the IRI of the new state.
+        """
+        meta = self._meta(ontology_name)
         ocg = self.store.get_context(self._ocg_iri(ontology_name))
 
         agent_iri = URIRef(f"{self.base}/agent/{author.replace(' ', '_')}")
         new_state_iri = self._state_iri(ontology_name, state_name)
         new_state_graph = self.store.get_context(self._state_graph_iri(ontology_name, state_name))
-
-        ts = iso_timestamp()
         ts_literal = Literal(ts, datatype=XSD.dateTime)
 
-        if previous_state is not None:
-            prev_state_name = previous_state
-
         # --------------------------
         # FILTER VALID CHANGES 
         # --------------------------
 
+        # exact changes carry content triples (see is_content_triple),
+        # such as class assertions, that DynDiff changes may not
         changes = [
             ((s, p, o), t)
             for ((s, p, o), t) in changes
-            if not is_system_triple(s, p, o, self.base)
+            if (self.is_content_triple(s, p, o) if t in EXACT_CHANGE_TYPES
+                else not is_system_triple(s, p, o, self.base))
         ]
 
-        ontology_iri = None
-        first_states = self.get_ontology_states(ontology_name)
-        if first_states:
-            g0 = self.get_ontology_state(ontology_name, first_states[0])
-            for s in g0.subjects(RDF.type, OWL.Ontology):
-                ontology_iri = s
-                break
-        if ontology_iri is None:
-            ontology_iri = URIRef(f"http://example.org/ontology/{ontology_name}")
+        if drop_noops and prev_state_name:
+            self._mark("validate")
+            kinds = self._classify_changes(self._content_set(ontology_name, prev_state_name), changes)
+            self._count("changes_dropped", kinds.count("noop"))
+            changes = [c for c, kind in zip(changes, kinds) if kind != "noop"]
 
-        if prev_state_name is None:
-            states = self.get_ontology_states(ontology_name)
-            prev_state_name = states[-1] if states else None
+        self.content_index.pop(new_state_iri, None)
+
+        # --------------------------
+        # COPY PREVIOUS STATE 
+        # --------------------------
+
+        self._mark("copy")
+        copied = 0
+
+        # includes the hasOntologyStateChange links of the entities
+        if prev_state_name:
+            copied = self.store.copy_context(
+                self._state_graph_iri(ontology_name, prev_state_name),
+                self._state_graph_iri(ontology_name, state_name)
+            )
+
+        if copied is not None:
+            self._count("triples_copied", copied)
 
         # --------------------------
         # HEADER + IMPORTS
@@ -842,115 +4157,43 @@ class MementoSM:
 
         declare_version_dataprops(new_state_graph)
 
-        # --------------------------
-        # COPY PREVIOUS STATE 
-        # --------------------------
-
-        if prev_state_name:
-            prev_ctx = self.get_ontology_state(ontology_name, prev_state_name)
-
-            for (s,p,o) in prev_ctx:
-
-                if (s, RDF.type, OWL.Axiom) in prev_ctx:
-                    src = list(prev_ctx.objects(s, OWL.annotatedSource))
-                    prop = list(prev_ctx.objects(s, OWL.annotatedProperty))
-                    tgt = list(prev_ctx.objects(s, OWL.annotatedTarget))
-
-                    if not (src and prop and tgt):
-                        continue
-
-                new_state_graph.add((s,p,o))
-
-        # --------------------------
-        # COPY hasOntologyStateChange FROM PREVIOUS STATE
-        # --------------------------
-
-        if prev_state_name:
-            prev_ctx = self.get_ontology_state(ontology_name, prev_state_name)
-
-            for (ent, _, old_change) in prev_ctx.triples(
-                (None, MEMENTO.hasOntologyStateChange, None)
-            ):
-                if not isinstance(ent, URIRef):
-                    continue
-
-                new_state_graph.add(
-                    (ent, MEMENTO.hasOntologyStateChange, old_change)
-                )
-
         # --------------------------
         # METADATA
         # --------------------------
 
+        self._mark("metadata")
+        ocg_add = []
+        meta_add = []
         version_iri = URIRef(f"{self.base}/version/{ontology_name}/{state_name}-version-{version}")
-
         major, minor, patch, metadata = parse_version(version)
 
-        meta.add((version_iri, RDF.type, MEMENTO.OntologyStateVersion))
-        meta.add((version_iri, MEMENTO.hasOntologyStateVersionLabel,
-                Literal(version, datatype=XSD.string)))
-        meta.add((version_iri, MEMENTO.hasOntologyStateVersionMajorRevision,
-                Literal(major, datatype=XSD.integer)))
-        meta.add((version_iri, MEMENTO.hasOntologyStateVersionMinorRevision,
-                Literal(minor, datatype=XSD.integer)))
-        meta.add((version_iri, MEMENTO.hasOntologyStateVersionPatchRevision,
-                Literal(patch, datatype=XSD.integer)))
-
-        if metadata:
-            meta.add((version_iri, MEMENTO.hasOntologyStateVersionMetadata,
-                    Literal(metadata, datatype=XSD.string)))
-
-        meta.add((new_state_iri, RDF.type, MEMENTO.OntologyState))
-        meta.add((new_state_iri, PROV.startedAtTime, ts_literal))
-        meta.add((new_state_iri, PROV.wasGeneratedBy, agent_iri))
-        meta.add((new_state_iri, MEMENTO.hasOntologyStateVersion, version_iri))
-
-        if prev_state_name is not None:
-            prev_state_iri = self._state_iri(ontology_name, prev_state_name)
-            meta.add((new_state_iri, MEMENTO.hasPreviousState, prev_state_iri))
-
-        meta.add((version_iri, RDF.type, MEMENTO.OntologyStateVersion))
-
-        meta.add((agent_iri, RDF.type, PROV.Agent))
-        meta.add((agent_iri, RDF.type, PROV.Person))
-
-        new_state_graph.add((new_state_iri, RDF.type, MEMENTO.OntologyState))
-        new_state_graph.add((new_state_iri, PROV.startedAtTime, ts_literal))
-        new_state_graph.add((new_state_iri, MEMENTO.hasOntologyStateVersion, version_iri))
-        new_state_graph.add((new_state_iri, PROV.wasGeneratedBy, agent_iri))
-
-        if prev_state_name is not None:
-            prev_state_iri = self._state_iri(ontology_name, prev_state_name)
-            new_state_graph.add((new_state_iri, MEMENTO.hasPreviousState, prev_state_iri))
-
-        new_state_graph.add((version_iri, RDF.type, MEMENTO.OntologyStateVersion))
-
-        new_state_graph.add((
-            version_iri,
-            MEMENTO.hasOntologyStateVersionLabel,
-            Literal(version, datatype=XSD.string)
-        ))
-        new_state_graph.add((
-            version_iri,
-            MEMENTO.hasOntologyStateVersionMajorRevision,
-            Literal(major, datatype=XSD.integer)
-        ))
-        new_state_graph.add((
-            version_iri,
-            MEMENTO.hasOntologyStateVersionMinorRevision,
-            Literal(minor, datatype=XSD.integer)
-        ))
-        new_state_graph.add((
-            version_iri,
-            MEMENTO.hasOntologyStateVersionPatchRevision,
-            Literal(patch, datatype=XSD.integer)
-        ))
+        version_triples = [
+            (version_iri, RDF.type, MEMENTO.OntologyStateVersion),
+            (version_iri, MEMENTO.hasOntologyStateVersionLabel, Literal(version, datatype=XSD.string)),
+            (version_iri, MEMENTO.hasOntologyStateVersionMajorRevision, Literal(major, datatype=XSD.integer)),
+            (version_iri, MEMENTO.hasOntologyStateVersionMinorRevision, Literal(minor, datatype=XSD.integer)),
+            (version_iri, MEMENTO.hasOntologyStateVersionPatchRevision, Literal(patch, datatype=XSD.integer)),
+            (new_state_iri, RDF.type, MEMENTO.OntologyState),
+            (new_state_iri, PROV.startedAtTime, ts_literal),
+            (new_state_iri, PROV.wasGeneratedBy, agent_iri),
+            (new_state_iri, MEMENTO.hasOntologyStateVersion, version_iri),
+        ]
         if metadata:
-            new_state_graph.add((
-                version_iri,
-                MEMENTO.hasOntologyStateVersionMetadata,
+            version_triples.append((
+                version_iri, MEMENTO.hasOntologyStateVersionMetadata,
                 Literal(metadata, datatype=XSD.string)
             ))
+        if prev_state_name is not None:
+            version_triples.append((
+                new_state_iri, MEMENTO.hasPreviousState,
+                self._state_iri(ontology_name, prev_state_name)
+            ))
+
+        meta_add.extend(version_triples)
+        meta_add.append((agent_iri, RDF.type, PROV.Agent))
+        meta_add.append((agent_iri, RDF.type, PROV.Person))
+        for t in version_triples:
+            new_state_graph.add(t)
 
         new_state_graph.add((MEMENTO.hasOntologyState, RDF.type, OWL.AnnotationProperty))
         new_state_graph.add((MEMENTO.hasOntologyStateChange, RDF.type, OWL.AnnotationProperty))
@@ -959,6 +4202,7 @@ class MementoSM:
         # BULK X CHANGE TYPE
         # --------------------------
 
+        self._mark("reify")
         bulk_seq = 0
 
         bulk_iris = {}
@@ -968,20 +4212,33 @@ class MementoSM:
                 iri = make_change_iri(self.base, ontology_name, ts, state_name, bulk_seq)
                 bulk_iris[ch_type] = iri
 
-                ocg.add((iri, RDF.type, ch_type))
-                ocg.add((iri, RDF.type, DYNDIFF.BasicChange))
-                ocg.add((iri, RDF.type, PROV.Entity))
-                ocg.add((iri, RDF.type, change_action_class(ch_type)))
-                ocg.add((iri, PROV.startedAtTime, ts_literal))
-                ocg.add((iri, PROV.wasGeneratedBy, agent_iri))
-                ocg.add((iri, MEMENTO.hasOntologyState, new_state_iri))
-                ocg.add((iri, RDF.type, MEMENTO.OntologyStateChange))
+                ocg_add.extend([
+                    (iri, RDF.type, ch_type),
+                    (iri, RDF.type, DYNDIFF.BasicChange),
+                    (iri, RDF.type, PROV.Entity),
+                    (iri, RDF.type, change_action_class(ch_type)),
+                    (iri, PROV.startedAtTime, ts_literal),
+                    (iri, PROV.wasGeneratedBy, agent_iri),
+                    (iri, MEMENTO.hasOntologyState, new_state_iri),
+                    (iri, RDF.type, MEMENTO.OntologyStateChange),
+                ])
 
         for (s, p, o), ch_type in changes:
             if not isinstance(s, URIRef):
                 continue
 
-            if ch_type == DYNDIFF.addC:
+            if p == OWL.members and (s, RDF.type, OWL.AllDisjointClasses) in new_state_graph:
+                add = change_action_class(ch_type) == MEMENTO.AddChangeAction
+                edit_disjoint_group(new_state_graph, s, o, add)
+                continue
+
+            if ch_type == MEMENTO.AddChangeAction:
+                new_state_graph.add((s, p, o))
+
+            elif ch_type == MEMENTO.DelChangeAction:
+                new_state_graph.remove((s, p, o))
+
+            elif ch_type == DYNDIFF.addC:
                 if (s, RDF.type, OWL.Class) not in new_state_graph:
                     new_state_graph.add((s, RDF.type, OWL.Class))
 
@@ -995,19 +4252,7 @@ class MementoSM:
 
             elif ch_type == DYNDIFF.delC:
                 for triple in list(new_state_graph.triples((s, None, None))):
-                    _, pred, obj = triple
-
-                    if pred in (
-                        MEMENTO.hasOntologyStateChange,
-                        RDF.type,
-                        RDFS.label,
-                        RDFS.comment,
-                        RDFS.isDefinedBy,
-                        RDFS.subClassOf,
-                        OWL.equivalentClass,
-                        OWL.versionInfo
-
-                    ):
+                    if triple[1] in DELC_KEPT_PREDICATES:
                         continue
 
                     new_state_graph.remove(triple)
@@ -1016,13 +4261,44 @@ class MementoSM:
         # DELTA + AXIOMS
         # --------------------------
 
-        change_seq = 0
+        known = {} if axioms is None else axioms
+
+        def axiom_of(s, p, o):
+            axiom_iri = known.get((s, p, o))
+            if axiom_iri is None and axioms is None:
+                axiom_iri = find_axiom(ocg, s, p, o)
+            if axiom_iri is None:
+                axiom_iri = make_axiom_iri(self.base, ontology_name)
+                ocg_add.extend([
+                    (axiom_iri, RDF.type, OWL.Axiom),
+                    (axiom_iri, OWL.annotatedSource, s),
+                    (axiom_iri, OWL.annotatedProperty, p),
+                    (axiom_iri, OWL.annotatedTarget, o),
+                ])
+            known[(s, p, o)] = axiom_iri
+            return axiom_iri
+
+        # with typed_changes, numbered after the bulk changes so that
+        # their IRIs differ
+        change_seq = bulk_seq if self.typed_changes else 0
         entity_change = {} 
+        entity_action = {}
+        index = ChangeIndex()
+        labels = self._next_label_index(ontology_name, prev_state_name)
+        fingerprint = self._next_fingerprint(ontology_name, prev_state_name)
+        recorded = []
 
         for (s, p, o), ch_type in changes:
 
             if p in (RDFS.label, RDFS.comment, OWL.versionInfo):
+                if ch_type == MEMENTO.DelChangeAction:
+                    # removed above; the index cannot drop a label, so
+                    # it is rebuilt on the first search
+                    labels = None
+                    continue
                 new_state_graph.add((s, p, o))
+                if labels is not None:
+                    labels.add(s, p, o)
                 continue
 
             if not isinstance(s, URIRef):
@@ -1033,27 +4309,127 @@ class MementoSM:
                 ch_iri = make_change_iri(self.base, ontology_name, ts, state_name, change_seq)
                 entity_change[s] = ch_iri
 
-                action_cls = change_action_class(ch_type)
+                action_cls = entity_action[s] = change_action_class(ch_type)
+
+                ocg_add.extend([
+                    (ch_iri, RDF.type, MEMENTO.OntologyStateChange),
+                    (ch_iri, RDF.type, action_cls),
+                    (ch_iri, MEMENTO.hasOntologyState, new_state_iri),
+                ])
+                # the provenance index records what it would read back
+                # from the OCG (see build_provenance_index)
+                if self.typed_changes:
+                    ocg_add.append((ch_iri, RDF.type, ch_type))
+                    recorded.append((ch_iri, ch_type))
+                elif change_seq > bulk_seq:
+                    recorded.append((ch_iri, action_cls))
+
+                new_state_graph.add((ch_iri, RDF.type, MEMENTO.OntologyStateChange))
+                new_state_graph.add((ch_iri, RDF.type, action_cls))
+                new_state_graph.add((ch_iri, MEMENTO.hasOntologyState, new_state_iri))
+
+                new_state_graph.add((s, MEMENTO.hasOntologyStateChange, ch_iri))
+                if action_cls in (_ADD_ACTION, _DEL_ACTION):
+                    index.add_entity(s, action_cls)
+
+            ch_iri = entity_change[s]
+            if entity_action[s] in (_ADD_ACTION, _DEL_ACTION):
+                index.add_axiom((s, p, o), entity_action[s])
+
+            axiom_iri = axiom_of(s, p, o)
+            ocg_add.append((axiom_iri, MEMENTO.hasOntologyStateChange, ch_iri))
+            ocg_add.append((axiom_iri, MEMENTO.hasOntologyState, new_state_iri))
+
+            ax_state = add_axiom_bnode(new_state_graph, s, p, o)
+            self._count("axioms_created")
+            new_state_graph.add((ax_state, MEMENTO.hasOntologyState, new_state_iri))
+            new_state_graph.add((ax_state, MEMENTO.hasOntologyStateChange, ch_iri))
+
+        self._mark("write")
+        target = new_state_graph.store
+        target.addN((s, p, o, meta) for (s, p, o) in meta_add)
+        target.addN((s, p, o, ocg) for (s, p, o) in ocg_add)
+        self._count("triples_written", len(ocg_add) + len(meta_add))
+
+        if self.change_log:
+            log = self.store.get_context(self._log_iri(ontology_name))
+            target.addN((s, p, o, log) for (s, p, o) in self._log_entries(
+                ontology_name, state_name, new_state_iri, changes
+            ))
+
+        self.change_index[new_state_iri] = index
+        if labels is not None:
+            self.label_index[new_state_iri] = labels
+        if fingerprint is not None:
+            touched = {s for (s, _, _), _ in changes}.union(state_header_subjects(ontology_iri))
+            self._update_fingerprint(fingerprint, new_state_graph, touched)
+            self.fingerprint_index[new_state_iri] = fingerprint
+        self._index_version(ontology_name, state_name, version)
+        self._index_provenance(ontology_name, state_name, ts_literal, agent_iri, recorded)
+        return new_state_iri
+
+    # ================================================================
+    # BATCH REPLAY
+    # ================================================================
+
+    @instrumented
+    @atomic
+    def apply_change_sequence(self, ontology_name, sequence, previous_state=None, drop_noops=False):
+
+        """
+        Creates a chain of states in one pass, with the same result as
+        calling create_ontology_state() once per entry.
 
-                ocg.add((ch_iri, RDF.type, MEMENTO.OntologyStateChange))
-                ocg.add((ch_iri, RDF.type, action_cls))
-                ocg.add((ch_iri, MEMENTO.hasOntologyState, new_state_iri))
+        sequence = iterable of (state_name, changes, version, author)
+        Each state follows the previous entry; the first one follows
+        `previous_state` (default: the last state of the ontology).
 
-                new_state_graph.add((ch_iri, RDF.type, MEMENTO.OntologyStateChange))
-                new_state_graph.add((ch_iri, RDF.type, action_cls))
-                new_state_graph.add((ch_iri, MEMENTO.hasOntologyState, new_state_iri))
+        Each state is written as by create_ontology_state(), except
+        that the OCG axioms are looked up in a dictionary built once for
+        the whole sequence. Timestamps are kept strictly increasing so
+        that the states sort in sequence order.
 
-                new_state_graph.add((s, MEMENTO.hasOntologyStateChange, ch_iri))
+        drop_noops = bool
+        As for create_ontology_state(), per state.
 
-            ch_iri = entity_change[s]
+        Returns the IRIs of the created states.
+        """
+
+        self._mark("load")
+        states = self.get_ontology_states(ontology_name)
+        prev_state_name = previous_state if previous_state is not None else (
+            states[-1] if states else None
+        )
+        ontology_iri = self._ontology_iri(ontology_name, states)
 
-            axiom_iri = get_or_create_axiom(ocg, self.base, ontology_name, s, p, o)
-            ocg.add((axiom_iri, MEMENTO.hasOntologyStateChange, ch_iri))
-            ocg.add((axiom_iri, MEMENTO.hasOntologyState, new_state_iri))
+        ocg = self.store.get_context(self._ocg_iri(ontology_name))
+        axioms = {}
+        for ax in ocg.subjects(RDF.type, OWL.Axiom):
+            src = next(ocg.objects(ax, OWL.annotatedSource), None)
+            prop = next(ocg.objects(ax, OWL.annotatedProperty), None)
+            tgt = next(ocg.objects(ax, OWL.annotatedTarget), None)
+            if src is not None and prop is not None and tgt is not None:
+                axioms.setdefault((src, prop, tgt), ax)
+
+        created = []
+        last_ts = None
+
+        for state_name, changes, version, author in sequence:
+            ts = iso_timestamp()
+            if last_ts is not None and ts <= last_ts:
+                ts = (
+                    datetime.strptime(last_ts, "%Y-%m-%dT%H:%M:%SZ") + timedelta(seconds=1)
+                ).isoformat() + "Z"
+            last_ts = ts
+
+            created.append(self._write_state(
+                ontology_name, state_name, changes, prev_state_name, author, version,
+                ts, ontology_iri, axioms=axioms, drop_noops=drop_noops
+            ))
+            prev_state_name = state_name
 
-            ax_state = add_axiom_bnode(new_state_graph, s, p, o)
-            new_state_graph.add((ax_state, MEMENTO.hasOntologyState, new_state_iri))
-            new_state_graph.add((ax_state, MEMENTO.hasOntologyStateChange, ch_iri))
+        self.store.persist()
+        return created
 
     # ================================================================
     # GET_ONTOLOGY_STATE_DIFF 
@@ -1076,38 +4452,69 @@ class MementoSM:
         if isinstance(s, BNode):
             return False
 
-        if p in (
-            OWL.annotatedSource,
-            OWL.annotatedProperty,
-            OWL.annotatedTarget
-        ):
-            return False
-
-        if p == RDF.type and o == OWL.Axiom:
+        if p in SYSTEM_PREDICATES:
             return False
 
-        if str(p).startswith(str(MEMENTO)) or str(p).startswith(str(PROV)):
+        if str(p).startswith(SYSTEM_NAMESPACES):
             return False
 
-        if p == RDF.type and o in (
-            MEMENTO.OntologyState,
-            MEMENTO.OntologyStateVersion,
-            MEMENTO.OntologyStateChange,
-            PROV.Agent,
-            PROV.Person
-        ):
+        if p == RDF.type and o in SYSTEM_TYPES:
             return False
 
-        if isinstance(s, URIRef) and (
-            "/state/" in str(s)
-            or "/version/" in str(s)
-            or "/change/" in str(s)
-            or "/axiom/" in str(s)
-        ):
+        if isinstance(s, URIRef) and any(part in str(s) for part in SYSTEM_IRI_PARTS):
             return False
 
         return True
     
+    @staticmethod
+    def _content_rows(g, f):
+        """
+        Content triples of a state graph, as rows of ContentFilter `f`.
+        Named owl:AllDisjointClasses groups contribute one (group,
+        owl:members, cls) triple per member instead of their rdf:List,
+        so member edits show up as such.
+        """
+        rows = f.select(g)
+
+        groups = [x for x in g.subjects(RDF.type, OWL.AllDisjointClasses) if isinstance(x, URIRef)]
+        if groups:
+            heads = [(x, OWL.members, head) for x in groups for head in g.objects(x, OWL.members)]
+            rows = f.difference(rows, f.encode(heads))
+            rows = f.union(rows, f.encode(disjoint_member_triples(g)))
+        return rows
+
+    def _pure_content(self, g):
+        """
+        Content triples of a state graph (see _content_rows).
+        """
+        f = ContentFilter()
+        return set(f.decode(self._content_rows(g, f)))
+
+    def _content_delta(self, g1, g2):
+        """
+        (removed, added) content triples from g1 to g2, computed on the
+        encoded rows so that only the delta is decoded.
+        """
+        f = ContentFilter()
+        rows1, rows2 = self._content_rows(g1, f), self._content_rows(g2, f)
+        return (
+            set(f.decode(f.difference(rows1, rows2))),
+            set(f.decode(f.difference(rows2, rows1)))
+        )
+
+    def _subject_content(self, g, s):
+        """
+        The triples of _pure_content(g) whose subject is `s`.
+        """
+        pure = {t for t in g.triples((s, None, None)) if self.is_content_triple(*t)}
+        if isinstance(s, URIRef) and (s, RDF.type, OWL.AllDisjointClasses) in g:
+            for head in g.objects(s, OWL.members):
+                pure.discard((s, OWL.members, head))
+                for c in rdf_list_items(g, head):
+                    pure.add((s, OWL.members, c))
+        return pure
+
+    @instrumented
     def get_ontology_state_diff(self, ontology_name: str, state1: str, state2: str):
 
         """
@@ -1120,114 +4527,244 @@ class MementoSM:
         with the OntologyStateChange that introduced or removed it.
         """
 
+        self._mark("load")
         g1 = self.get_ontology_state(ontology_name, state1)
         g2 = self.get_ontology_state(ontology_name, state2)
-        ocg = self.store.get_context(self._ocg_iri(ontology_name))
 
-        s1_iri = self._state_iri(ontology_name, state1)
-        s2_iri = self._state_iri(ontology_name, state2)
+        if self.index_fingerprints:
+            # only the subjects whose content hashes differ
+            subjects = self._fingerprint(ontology_name, state1).diff_subjects(
+                self._fingerprint(ontology_name, state2)
+            )
+            pure1 = {t for s in subjects for t in self._subject_content(g1, s)}
+            pure2 = {t for s in subjects for t in self._subject_content(g2, s)}
+        else:
+            # the delta alone gives the same classification
+            pure1, pure2 = self._content_delta(g1, g2)
 
-        pure1 = set(
-            (s, p, o)
-            for (s, p, o) in g1
-            if self.is_content_triple(s, p, o)
-        )
+        self._mark("classify")
+        index1 = self._change_index(ontology_name, state1, g1)
+        index2 = self._change_index(ontology_name, state2, g2)
 
-        pure2 = set(
-            (s, p, o)
-            for (s, p, o) in g2
-            if self.is_content_triple(s, p, o)
-        )
+        return classify_diff(pure1, pure2, index1, index2)
+        
+    # ================================================================
+    # DIFF MANY
+    # ================================================================
+
+    def _content_set(self, ontology_name, state_name):
+        """
+        Content triples of a state as a frozenset, kept for the
+        `content_cache_size` most recently used states.
+        """
+        state_iri = self._state_iri(ontology_name, state_name)
+        content = self.content_index.get(state_iri)
+        if content is not None:
+            self.content_index.move_to_end(state_iri)
+            return content
 
-        added = pure2 - pure1
-        removed = pure1 - pure2
+        content = frozenset(self._pure_content(self.get_ontology_state(ontology_name, state_name)))
+        self.content_index[state_iri] = content
+        while len(self.content_index) > self.content_cache_size:
+            self.content_index.popitem(last=False)
+        return content
 
-        # -------------------------------------------------
-        # FALLBACK: if semantic graphs are identical 
-        # use OCG change annotations to produce a diff anyway
-        # -------------------------------------------------
+    def diff_many(self, ontology_name, pairs=None, processes=None):
+
+        """
+        Computes many state diffs at once, e.g. for release notes.
+
+        pairs = iterable of (state1, state2) | None
+        Defaults to every consecutive pair of states.
+
+        processes = int | None
+        Size of the worker pool (default: one per CPU); 1 computes the
+        diffs in this process.
+
+        The content set and change index of each state are computed
+        once and shared by all the pairs using it, and released after
+        its last pair. With more than one process, runs of consecutive
+        pairs are handed to forked workers, which read the states and
+        compute the diffs themselves: only the results come back. The
+        pool is not used for SPARQL stores, whose connections cannot be
+        shared with a child process, nor while other threads run (e.g.
+        under AsyncMementoSM), since they could hold locks the child
+        inherits. Yields (state1, state2, added, removed) in the order
+        of `pairs`, as get_ontology_state_diff() would return them.
+        """
 
-        if not added and not removed:
+        if pairs is None:
+            states = self.get_ontology_states(ontology_name)
+            pairs = list(zip(states, states[1:]))
+        else:
+            pairs = [tuple(p) for p in pairs]
 
-            added_list = []
-            removed_list = []
+        processes = processes or os.cpu_count() or 1
+        fork = (
+            "fork" in multiprocessing.get_all_start_methods()
+            and not isinstance(self.store.store, SPARQLUpdateStore)
+            and threading.active_count() == 1
+        )
 
-            for ch in ocg.subjects(MEMENTO.hasOntologyState, s2_iri):
+        if processes < 2 or len(pairs) < 2 or not fork:
+            yield from self._diff_pairs(ontology_name, pairs)
+            return
 
-                if (ch, RDF.type, MEMENTO.AddChangeAction) in ocg:
-                    action = MEMENTO.AddChangeAction
-                elif (ch, RDF.type, MEMENTO.DelChangeAction) in ocg:
-                    action = MEMENTO.DelChangeAction
-                else:
-                    continue
+        # one run per worker: a run shares the states of its
+        # consecutive pairs, only those at its ends are read twice
+        n = min(processes, len(pairs))
+        size = -(-len(pairs) // n)
+        runs = [pairs[i:i + size] for i in range(0, len(pairs), size)]
 
-                found = False
-                for ax in ocg.subjects(MEMENTO.hasOntologyStateChange, ch):
+        _DIFF_SHARED.update(memento=self, ontology=ontology_name)
+        try:
+            with multiprocessing.get_context("fork").Pool(n) as pool:
+                for results in pool.imap(_diff_chunk, runs):
+                    yield from results
+        finally:
+            _DIFF_SHARED.clear()
 
-                    s = next(ocg.objects(ax, OWL.annotatedSource), None)
-                    p = next(ocg.objects(ax, OWL.annotatedProperty), None)
-                    o = next(ocg.objects(ax, OWL.annotatedTarget), None)
+    def _diff_pairs(self, ontology_name, pairs):
+        """
+        The diffs of diff_many() in this process, each state's content
+        set and change index kept from its first pair to its last.
+        """
+        last = {}
+        for i, pair in enumerate(pairs):
+            for state in pair:
+                last[state] = i
+
+        contents, indexes = {}, {}
+        for i, (state1, state2) in enumerate(pairs):
+            for state in (state1, state2):
+                if state not in contents:
+                    contents[state] = self._content_set(ontology_name, state)
+                    indexes[state] = self._change_index(ontology_name, state)
+
+            added, removed = classify_diff(
+                contents[state1], contents[state2], indexes[state1], indexes[state2]
+            )
+            yield state1, state2, added, removed
 
-                    if s and p and o:
-                        found = True
-                        if action == MEMENTO.AddChangeAction:
-                            added_list.append(((s, p, o), action))
-                        else:
-                            removed_list.append(((s, p, o), action))
+            for state in (state1, state2):
+                if last.get(state) == i:
+                    del last[state]
+                    contents.pop(state, None)
+                    indexes.pop(state, None)
 
-                if not found:
-                    for ent in g2.subjects(MEMENTO.hasOntologyStateChange, ch):
+    # ================================================================
+    # VALIDATION
+    # ================================================================
 
-                        triple = (ent, RDF.type, OWL.Class)
+    @staticmethod
+    def _classify_changes(content, changes):
+        """
+        Kind of each change (see validate_changes). A delC strips every
+        triple of its subject: on a subject without content it changes
+        nothing, but on one that is not declared a class (an individual,
+        a property) it would strip that entity, so it is a conflict to
+        be resolved rather than a no-op to drop.
+        """
+        adds = {t for (t, ch) in changes if change_action_class(ch) == _ADD_ACTION}
+        dels = {t for (t, ch) in changes if change_action_class(ch) == _DEL_ACTION}
+        both = adds & dels
+        subjects = None
+
+        kinds = []
+        for (t, ch) in changes:
+            if t in both:
+                kinds.append("conflicting")
+            elif ch == DYNDIFF.delC and (t[0], RDF.type, OWL.Class) not in content:
+                if subjects is None:
+                    subjects = {s for (s, _, _) in content}
+                kinds.append("conflicting" if t[0] in subjects else "noop")
+            elif t in adds:
+                kinds.append("noop" if t in content else "effective")
+            elif t in dels:
+                kinds.append("effective" if t in content else "noop")
+            else:
+                kinds.append("effective")
+        return kinds
 
-                        if action == MEMENTO.AddChangeAction:
-                            added_list.append((triple, action))
-                        else:
-                            removed_list.append((triple, action))
+    def validate_changes(self, ontology_name, changes, against_state=None):
+        """
+        Classifies a change list against a state (default: the last
+        one) in one pass over its content set:
+
+        noop        = adds a triple already there / deletes an absent one,
+                      or a delC of a subject the state does not mention
+        conflicting = the same triple is both added and deleted, or a
+                      delC targets an entity the state does not declare
+                      a class
+        effective   = every other change
+
+        Returns {"noop": [...], "effective": [...], "conflicting": [...]}
+        with the changes in their original order.
+        """
+        changes = list(changes)
+        if against_state is None:
+            states = self.get_ontology_states(ontology_name)
+            against_state = states[-1] if states else None
 
-            return added_list, removed_list
+        content = self._content_set(ontology_name, against_state) if against_state else frozenset()
 
-        def find_type(triple, state_iri, state_graph):
-            s, p, o = triple
+        result = {"noop": [], "effective": [], "conflicting": []}
+        for change, kind in zip(changes, self._classify_changes(content, changes)):
+            result[kind].append(change)
+        return result
 
-            for ax in ocg.subjects(OWL.annotatedSource, s):
-                if (ax, OWL.annotatedProperty, p) not in ocg:
-                    continue
-                if (ax, OWL.annotatedTarget, o) not in ocg:
-                    continue
+    # ================================================================
+    # DELTA CLASSIFICATION
+    # ================================================================
 
-                for ch in ocg.objects(ax, MEMENTO.hasOntologyStateChange):
-                    if (ch, MEMENTO.hasOntologyState, state_iri) not in ocg:
-                        continue
+    @staticmethod
+    def _classify_delta(removed, added):
+        """
+        DynDiff change list turning one content set into another:
+        `removed` triples first, then `added` ones, typed by the kind of
+        entity they declare (class, property, other).
+        """
+        delta = []
 
-                    if (ch, RDF.type, MEMENTO.AddChangeAction) in ocg:
-                        return MEMENTO.AddChangeAction
-                    if (ch, RDF.type, MEMENTO.DelChangeAction) in ocg:
-                        return MEMENTO.DelChangeAction
+        for (s, p, o) in removed:
+            if p == RDF.type and o == OWL.Class:
+                ch = DYNDIFF.delC
+            elif p == RDF.type and o in (
+                OWL.ObjectProperty,
+                OWL.DatatypeProperty,
+                OWL.AnnotationProperty
+            ):
+                ch = DYNDIFF.delP
+            else:
+                ch = DYNDIFF.delI
 
-            if isinstance(s, URIRef):
-                for ch in state_graph.objects(s, MEMENTO.hasOntologyStateChange):
-                    if (ch, MEMENTO.hasOntologyState, state_iri) not in ocg:
-                        continue
+            delta.append(((s, p, o), ch))
 
-                    if (ch, RDF.type, MEMENTO.AddChangeAction) in ocg:
-                        return MEMENTO.AddChangeAction
-                    if (ch, RDF.type, MEMENTO.DelChangeAction) in ocg:
-                        return MEMENTO.DelChangeAction
+        for (s, p, o) in added:
+            if p == RDF.type and o == OWL.Class:
+                ch = DYNDIFF.addC
+            elif p == RDF.type and o in (
+                OWL.ObjectProperty,
+                OWL.DatatypeProperty,
+                OWL.AnnotationProperty
+            ):
+                ch = DYNDIFF.addP
+            else:
+                ch = DYNDIFF.addI
 
-            return None
+            delta.append(((s, p, o), ch))
 
-        added_list   = [(t, find_type(t, s2_iri, g2)) for t in added]
-        removed_list = [(t, find_type(t, s1_iri, g1)) for t in removed]
+        return delta
 
-        return added_list, removed_list
-        
     # ================================================================
     # REVERT
     # ================================================================
 
+    @instrumented
+    @atomic
     def revert_ontology(self, ontology_name, target_state, new_state_name, author, version=None):
 
+        self._mark("load")
         target_graph = self.get_ontology_state(ontology_name, target_state)
 
         states = self.get_ontology_states(ontology_name)
@@ -1237,59 +4774,14 @@ class MementoSM:
         current_state = states[-1]
         current_graph = self.get_ontology_state(ontology_name, current_state)
 
-        pure_target = {
-            (s,p,o) for (s,p,o) in target_graph
-            if self.is_content_triple(s,p,o)
-        }
-
-        pure_current = {
-            (s,p,o) for (s,p,o) in current_graph
-            if self.is_content_triple(s,p,o)
-        }
-
-        delta = []
-
-        # -------------------------
-        # REMOVE (current - target)
-        # -------------------------
-
-        for (s,p,o) in pure_current - pure_target:
-            if p == RDF.type and o == OWL.Class:
-                ch = DYNDIFF.delC
-            elif p == RDF.type and o in (
-                OWL.ObjectProperty,
-                OWL.DatatypeProperty,
-                OWL.AnnotationProperty
-            ):
-                ch = DYNDIFF.delP
-            else:
-                ch = DYNDIFF.delI
-
-            delta.append(((s,p,o), ch))
+        removed, added = self._content_delta(current_graph, target_graph)
 
-        # -------------------------
-        # ADD (target - current)
-        # -------------------------
-        
-        for (s,p,o) in pure_target:
-            if (s,p,o) not in pure_current:
-                if p == RDF.type and o == OWL.Class:
-                    ch = DYNDIFF.addC
-                elif p == RDF.type and o in (
-                    OWL.ObjectProperty,
-                    OWL.DatatypeProperty,
-                    OWL.AnnotationProperty
-                ):
-                    ch = DYNDIFF.addP
-                else:
-                    ch = DYNDIFF.addI
+        self._mark("delta")
+        delta = self._classify_delta(removed, list(added))
 
-                delta.append(((s,p,o), ch))
-
-        for (s, p, o) in pure_target:
+        for (s, p, o) in added:
             if p == RDF.type and o == OWL.Class:
-                if (s, p, o) not in pure_current:
-                    delta.append(((s, RDF.type, OWL.Class), DYNDIFF.addC))
+                delta.append(((s, RDF.type, OWL.Class), DYNDIFF.addC))
 
         if version is None:
             version = f"revert_to_{target_state}"
@@ -1323,10 +4815,326 @@ class MementoSM:
             bulk=False
         )
 
+    # ================================================================
+    # MERGE
+    # ================================================================
+
+    def merge_conflicts(self, ontology_name, base, left, right):
+        """
+        Conflicting edits of the branches `left` and `right` against
+        their common ancestor `base` (see find_merge_conflicts).
+        """
+        b = self._content_set(ontology_name, base)
+        l = self._content_set(ontology_name, left)
+        r = self._content_set(ontology_name, right)
+        return find_merge_conflicts(l - b, b - l, r - b, b - r)
+
+    @instrumented
+    @atomic
+    def merge_states(self, ontology_name, base, left, right, new_state_name, author,
+                     version=None, prefer=None):
+
+        """
+        Three-way merge of two states branched from `base`.
+
+        Both deltas against the base are computed on the content sets of
+        the three states; edits that do not conflict are combined and
+        the merged state is created with create_ontology_state() on top
+        of `left`, with a prov:wasDerivedFrom link to `right`. Its
+        changes are exact (see EXACT_CHANGE_TYPES): the merged content
+        is the combined target, and replaying the changes (e.g. from a
+        change log) gives the same state.
+
+        prefer = None | "left" | "right"
+        On conflicting edits (see merge_conflicts) raise MergeConflict,
+        or keep the edits of the preferred branch for the conflicting
+        entities/axioms. Returns the IRI of the merged state.
+        """
+
+        if prefer not in (None, "left", "right"):
+            raise ValueError(f"prefer must be None, 'left' or 'right', not {prefer!r}")
+
+        self._mark("delta")
+        b = self._content_set(ontology_name, base)
+        l = self._content_set(ontology_name, left)
+        r = self._content_set(ontology_name, right)
+
+        left_added, left_removed = l - b, b - l
+        right_added, right_removed = r - b, b - r
+
+        conflicts = find_merge_conflicts(left_added, left_removed, right_added, right_removed)
+        if conflicts and prefer is None:
+            raise MergeConflict(conflicts)
+
+        added = left_added | right_added
+        removed = left_removed | right_removed
+
+        # drop the edits of the other branch on the conflicting slots
+        for (_, _, left_delta, right_delta) in conflicts:
+            lose_added, lose_removed = right_delta if prefer == "left" else left_delta
+            keep_added, keep_removed = left_delta if prefer == "left" else right_delta
+            added -= lose_added - keep_added
+            removed -= lose_removed - keep_removed
+
+        # exact changes on top of `left`: DynDiff ones would not reach
+        # the target (delI/delP remove nothing, delC strips a subject)
+        target = (b - removed) | added
+        to_remove, to_add = l - target, target - l
+
+        # disjoint group members are edited while the group is declared
+        changes = (
+            [(t, MEMENTO.DelChangeAction) for t in sorted(to_remove, key=lambda t: t[1] == RDF.type)] +
+            [(t, MEMENTO.AddChangeAction) for t in sorted(to_add, key=lambda t: t[1] != RDF.type)]
+        )
+
+        self._mark("create")
+        if version is None:
+            version = f"merge_{left}_{right}"
+
+        self.create_ontology_state(
+            ontology_name=ontology_name,
+            changes=changes,
+            previous_state=left,
+            state_name=new_state_name,
+            author=author,
+            version=version,
+            bulk=False
+        )
+
+        state_iri = self._state_iri(ontology_name, new_state_name)
+        g = self.get_ontology_state(ontology_name, new_state_name)
+
+        right_iri = self._state_iri(ontology_name, right)
+        self._meta(ontology_name).add((state_iri, PROV.wasDerivedFrom, right_iri))
+        g.add((state_iri, PROV.wasDerivedFrom, right_iri))
+
+        return state_iri
+
+    # ================================================================
+    # REPLICATION
+    # ================================================================
+
+    _STATE_HEADER = (
+        RDF.type,
+        PROV.startedAtTime,
+        PROV.wasGeneratedBy,
+        MEMENTO.hasOntologyStateVersion,
+        MEMENTO.hasPreviousState
+    )
+
+    def _log_entries(self, ontology_name, state_name, state_iri, changes):
+        """
+        Change log triples of a new state: the state itself, marking it
+        as logged, and one numbered entry per change it applied.
+        """
+        yield (state_iri, RDF.type, MEMENTO.OntologyState)
+        for seq, ((s, p, o), ch_type) in enumerate(changes, 1):
+            entry = make_log_entry_iri(self.base, ontology_name, state_name, seq)
+            yield (entry, RDF.type, ch_type)
+            yield (entry, MEMENTO.hasOntologyState, state_iri)
+            yield (entry, OWL.annotatedSource, s)
+            yield (entry, OWL.annotatedProperty, p)
+            yield (entry, OWL.annotatedTarget, o)
+
+    def _logged_changes(self, ontology_name, state_name):
+        """
+        The changes of a state as it applied them, in order, from the
+        change log; None if the state was not logged.
+        """
+        log = self.store.get_context(self._log_iri(ontology_name))
+        state_iri = self._state_iri(ontology_name, state_name)
+        if (state_iri, RDF.type, MEMENTO.OntologyState) not in log:
+            return None
+
+        entries = []
+        for entry in log.subjects(MEMENTO.hasOntologyState, state_iri):
+            seq = int(str(entry).rsplit("-", 1)[1])
+            entries.append((seq, (
+                (log.value(entry, OWL.annotatedSource),
+                 log.value(entry, OWL.annotatedProperty),
+                 log.value(entry, OWL.annotatedTarget)),
+                log.value(entry, RDF.type)
+            )))
+        return [change for _, change in sorted(entries)]
+
+    def export_change_log(self, ontology_name, since, out):
+        """
+        Writes the history of an ontology after state `since` to the
+        text stream `out`, for import_change_log() on another store that
+        already holds `since` (e.g. restored from a checkpoint). Each
+        state is written after the state it was created from, with the
+        changes recorded in the change log when it was created (see
+        `change_log`); a state without them raises ValueError.
+
+        One JSON array per line: a header, then per state its name,
+        version, author, previous state and timestamp, its changes and
+        any further metadata, each RDF term written once (terms are
+        numbered by their first ["T", ...] line). The size of the log
+        follows the number of changes, not the size of the states.
+
+        Returns the names of the exported states.
+        """
+        meta = self._meta(ontology_name)
+        listed = self.states_between(ontology_name)
+        times = {name: ts for ts, name, _ in listed}
+        if since not in times:
+            raise ValueError(f"Unknown state {since!r} of {ontology_name}")
+
+        prev = {}
+        for name in times:
+            prev_iri = meta.value(self._state_iri(ontology_name, name), MEMENTO.hasPreviousState)
+            prev[name] = None if prev_iri is None else str(prev_iri).split("/")[-1]
+
+        # the ancestors of `since` are on the replica already
+        held = set()
+        name = since
+        while name is not None and name not in held:
+            held.add(name)
+            name = prev.get(name)
+
+        # timestamps have one-second resolution: a state is written after
+        # its previous state, whatever their times
+        pending = [name for ts, name, _ in listed if ts >= times[since] and name not in held]
+        unplaced = set(pending)
+        states = []
+        for name in pending:
+            chain = []
+            while name in unplaced:
+                unplaced.discard(name)
+                chain.append(name)
+                name = prev[name]
+            states.extend(reversed(chain))
+
+        terms = TermDictionary()
+
+        def ref(term):
+            n = len(terms)
+            i = terms.intern(term)
+            if i == n:
+                out.write(json.dumps(["T", encode_term(term)]) + "\n")
+            return i
+
+        out.write(json.dumps(["memento-log", 1, self.base, ontology_name]) + "\n")
+
+        exported = []
+        for state_name in states:
+            state_iri = self._state_iri(ontology_name, state_name)
+            prev_iri = meta.value(state_iri, MEMENTO.hasPreviousState)
+            if prev_iri is None:
+                raise ValueError(
+                    f"State {state_name!r} was not created from changes; "
+                    f"replicate it with a checkpoint"
+                )
+            prev_state_name = str(prev_iri).split("/")[-1]
+
+            changes = self._logged_changes(ontology_name, state_name)
+            if changes is None:
+                raise ValueError(
+                    f"State {state_name!r} has no change log; enable change_log "
+                    f"or replicate it with a checkpoint"
+                )
+
+            version_iri = meta.value(state_iri, MEMENTO.hasOntologyStateVersion)
+            version = meta.value(version_iri, MEMENTO.hasOntologyStateVersionLabel)
+            agent = meta.value(state_iri, PROV.wasGeneratedBy)
+            ts = meta.value(state_iri, PROV.startedAtTime)
+
+            out.write(json.dumps([
+                "S", state_name, str(version), str(agent).split("/")[-1],
+                prev_state_name, timestamp_key(ts.toPython())
+            ]) + "\n")
+
+            for (s, p, o), ch_type in changes:
+                out.write(json.dumps(["C", ref(ch_type), ref(s), ref(p), ref(o)]) + "\n")
+
+            for p, o in meta.predicate_objects(state_iri):
+                if p not in self._STATE_HEADER:
+                    out.write(json.dumps(["M", ref(p), ref(o)]) + "\n")
+
+            out.write('["E"]\n')
+            exported.append(state_name)
+
+        return exported
+
+    @instrumented
+    @atomic
+    def import_change_log(self, lines):
+        """
+        Replays a log written by export_change_log(), state by state,
+        through create_ontology_state() with the original timestamps.
+        IRIs under the base of the exporting store are mapped to this
+        store's base. States already present are skipped, so a log can
+        be imported again.
+
+        Returns the IRIs of the created states.
+        """
+        terms = []
+        source_base = ontology_name = None
+        state = None
+        created = []
+
+        for line in lines:
+            if not line.strip():
+                continue
+            rec = json.loads(line)
+            tag = rec[0]
+
+            if tag == "memento-log":
+                _, version, source_base, ontology_name = rec
+                if version != 1:
+                    raise ValueError(f"Unsupported change log version {version}")
+
+            elif tag == "T":
+                t = decode_term(rec[1])
+                if isinstance(t, URIRef) and str(t).startswith(source_base + "/"):
+                    t = URIRef(self.base + str(t)[len(source_base):])
+                terms.append(t)
+
+            elif tag == "S":
+                state = {"header": rec[1:], "changes": [], "meta": []}
+
+            elif tag == "C":
+                ch_type, s, p, o = (terms[i] for i in rec[1:])
+                state["changes"].append(((s, p, o), ch_type))
+
+            elif tag == "M":
+                state["meta"].append((terms[rec[1]], terms[rec[2]]))
+
+            elif tag == "E":
+                state_name, version, author, prev_state_name, ts = state["header"]
+                state_iri = self._state_iri(ontology_name, state_name)
+                existing = {name for _, name, _ in self.states_between(ontology_name)}
+
+                if state_name not in existing:
+                    if prev_state_name not in existing:
+                        raise ValueError(
+                            f"Previous state {prev_state_name!r} of {state_name!r} "
+                            f"is missing from {ontology_name}"
+                        )
+                    self.create_ontology_state(
+                        ontology_name, state["changes"],
+                        previous_state=prev_state_name, state_name=state_name,
+                        author=author, version=version, timestamp=ts
+                    )
+                    meta = self._meta(ontology_name)
+                    state_graph = self.store.get_context(self._state_graph_iri(ontology_name, state_name))
+                    for p, o in state["meta"]:
+                        meta.add((state_iri, p, o))
+                        state_graph.add((state_iri, p, o))
+                    created.append(state_iri)
+                state = None
+
+            else:
+                raise ValueError(f"Unknown change log record {tag!r}")
+
+        self.store.persist()
+        return created
+
     # ================================================================
     # REMOVE
     # ================================================================
 
+    @atomic
     def remove_ontology_state(self, ontology_name, state_name):
 
         """
@@ -1337,7 +5145,282 @@ class MementoSM:
         """
 
         self.store.remove_context(self._state_graph_iri(ontology_name, state_name))
+        self.change_index.pop(self._state_iri(ontology_name, state_name), None)
+        self.label_index.pop(self._state_iri(ontology_name, state_name), None)
+        self.fingerprint_index.pop(self._state_iri(ontology_name, state_name), None)
+        self.content_index.pop(self._state_iri(ontology_name, state_name), None)
+        if ontology_name in self.version_index:
+            self.version_index[ontology_name].remove(state_name)
         self.store.persist()
         return True                                                                      
+
+# ================================================================
+# MEMENTO-SM — MODULE 5
+# Checkpoints
+# ================================================================
+
+    @instrumented
+    def save_checkpoint(self, path):
+
+        """
+        Writes every named graph (meta, OCG, states) to a binary
+        checkpoint: a term dictionary plus one integer triple array per
+        graph. Returns the number of graphs written.
+        """
+
+        graphs = []
+        for iri in self.store.context_iris():
+            ctx = self.store.get_context(iri)
+            graphs.append((iri, ctx.triples((None, None, None))))
+
+        index = write_checkpoint(path, graphs, base=self.base)
+        self._count("graphs", len(index["graphs"]))
+        self._count("terms", index["terms"]["count"])
+        return len(index["graphs"])
+
+    @instrumented
+    def load_checkpoint(self, path, lazy=True):
+
+        """
+        Loads a checkpoint written by save_checkpoint(), replacing the
+        graphs it contains.
+
+        lazy = bool
+        Meta and OCG graphs are loaded at once; with lazy=True each
+        state graph is only read from the mapped file the first time it
+        is accessed.
+        """
+
+        reader = CheckpointReader(path)
+        if reader.base != self.base:
+            reader.close()
+            raise ValueError(
+                f"Checkpoint base {reader.base} does not match {self.base}"
+            )
+
+        state_prefix = f"{self.base}/graphs/"
+        wrapper = self.store if self._tx is None else self._tx.wrapper
+        self.change_index.clear()
+        self.version_index.clear()
+        self.label_index.clear()
+        self.fingerprint_index.clear()
+        self.provenance_index.clear()
+        self.content_index.clear()
+        self._meta_graphs.clear()
+
+        for iri in reader.graphs:
+            self.store.remove_context(iri)
+
+            if lazy and str(iri).startswith(state_prefix):
+                wrapper.register_lazy(iri, reader.loader(iri))
+                continue
+
+            ctx = self.store.get_context(iri)
+            self.store.store.addN((s, p, o, ctx) for (s, p, o) in reader.triples(iri))
+            self._count("triples_loaded", reader.count(iri))
+
+        # closed now unless lazy state graphs are still to be read
+        reader.release()
+        self.store.persist()
+        return len(reader)
+
+# ================================================================
+# MEMENTO-SM — MODULE 6
+# Compaction
+# ================================================================
+
+    @instrumented
+    @atomic
+    def compact(self, ontology_name, policy=None, archive=None):
+
+        """
+        Garbage-collects the history of an ontology.
+
+        States not retained by `policy` (a RetentionPolicy; by default
+        every state that still has a graph is kept) are removed. Then
+        the OCG changes and axioms, and the meta state/version nodes,
+        that are only reachable from removed states are pruned. The
+        hasPreviousState links of the kept states are relinked to their
+        nearest kept ancestor; the change log of a relinked state is
+        dropped with those of the removed states, since it no longer
+        leads from its previous state to it.
+
+        archive = str | None
+        If set, every pruned triple is written there as a checkpoint,
+        under its original graph name (read it with CheckpointReader).
+
+        Returns a report with the removed states and the pruned nodes
+        and triples.
+        """
+
+        started = time.perf_counter()
+        policy = policy or RetentionPolicy()
+
+        self._mark("plan")
+        meta = self._meta(ontology_name)
+        ocg = self.store.get_context(self._ocg_iri(ontology_name))
+        ocg_before = len(ocg)
+
+        states = [
+            s for s in self.get_ontology_states(ontology_name)
+            if len(self.get_ontology_state(ontology_name, s))
+        ]
+        keep = policy.retained(self, ontology_name, states)
+        kept = [s for s in states if s in keep]
+        removed_states = [s for s in states if s not in keep]
+
+        state_prefix = str(self._state_iri(ontology_name, ""))
+        live = {self._state_iri(ontology_name, s) for s in kept}
+        dead = {
+            st for st in meta.subjects(RDF.type, MEMENTO.OntologyState)
+            if str(st).startswith(state_prefix) and st not in live
+        }
+
+        pruned = {}
+
+        def drop(graph, triples):
+            triples = list(triples)
+            for t in triples:
+                graph.remove(t)
+            pruned.setdefault(graph.identifier, []).extend(triples)
+            return len(triples)
+
+        # --------------------------
+        # STATE GRAPHS
+        # --------------------------
+
+        self._mark("states")
+        for s in removed_states:
+            iri = self._state_graph_iri(ontology_name, s)
+            pruned[iri] = list(self.store.get_context(iri))
+            self.store.remove_context(iri)
+
+        # --------------------------
+        # OCG
+        # --------------------------
+
+        self._mark("ocg")
+        referenced = set()
+        for s in kept:
+            referenced.update(
+                self.get_ontology_state(ontology_name, s).objects(None, MEMENTO.hasOntologyStateChange)
+            )
+
+        dead_changes = {
+            ch for ch, st in ocg.subject_objects(MEMENTO.hasOntologyState)
+            if st in dead
+            and (ch, RDF.type, MEMENTO.OntologyStateChange) in ocg
+            and ch not in referenced
+        }
+        for ch in dead_changes:
+            drop(ocg, ocg.triples((ch, None, None)))
+
+        drop(ocg, [
+            t for t in ocg.triples((None, MEMENTO.hasOntologyState, None)) if t[2] in dead
+        ])
+        drop(ocg, [
+            t for t in ocg.triples((None, MEMENTO.hasOntologyStateChange, None)) if t[2] in dead_changes
+        ])
+
+        dead_axioms = [
+            ax for ax in ocg.subjects(RDF.type, OWL.Axiom)
+            if (ax, MEMENTO.hasOntologyState, None) not in ocg
+        ]
+        for ax in dead_axioms:
+            drop(ocg, ocg.triples((ax, None, None)))
+
+        # --------------------------
+        # META
+        # --------------------------
+
+        self._mark("meta")
+        previous = dict(meta.subject_objects(MEMENTO.hasPreviousState))
+        relinked = set()
+
+        for st in live:
+            prev = previous.get(st)
+            if prev is None or prev not in dead:
+                continue
+            relinked.add(st)
+
+            anc = prev
+            while anc is not None and anc in dead:
+                anc = previous.get(anc)
+
+            graph = self.store.get_context(
+                self._state_graph_iri(ontology_name, str(st)[len(state_prefix):])
+            )
+            for g in (meta, graph):
+                g.remove((st, MEMENTO.hasPreviousState, prev))
+                if anc is not None:
+                    g.add((st, MEMENTO.hasPreviousState, anc))
+
+        versions = set()
+        for st in dead:
+            versions.update(meta.objects(st, MEMENTO.hasOntologyStateVersion))
+            drop(meta, meta.triples((st, None, None)))
+        for v in versions:
+            if (None, MEMENTO.hasOntologyStateVersion, v) not in meta:
+                drop(meta, meta.triples((v, None, None)))
+
+        # --------------------------
+        # CHANGE LOG
+        # --------------------------
+
+        # the changes of a relinked state no longer lead from its
+        # previous state to it
+        log = self.store.get_context(self._log_iri(ontology_name))
+        for st in dead | relinked:
+            if (st, RDF.type, MEMENTO.OntologyState) in log:
+                entries = list(log.subjects(MEMENTO.hasOntologyState, st))
+                drop(log, [t for e in entries for t in log.triples((e, None, None))])
+                drop(log, log.triples((st, None, None)))
+
+        self._mark("indexes")
+        self._rebuild_indexes(ontology_name)
+
+        if archive is not None:
+            self._mark("archive")
+            write_checkpoint(archive, pruned.items(), base=self.base)
+
+        self.store.persist()
+
+        triples_removed = {str(iri): len(ts) for iri, ts in pruned.items() if ts}
+        self._count("states_removed", len(removed_states))
+        self._count("triples_removed", sum(triples_removed.values()))
+
+        return {
+            "states_removed": removed_states,
+            "states_kept": kept,
+            "changes_pruned": len(dead_changes),
+            "axioms_pruned": len(dead_axioms),
+            "triples_removed": triples_removed,
+            "ocg_triples": (ocg_before, len(ocg)),
+            "archive": archive,
+            "seconds": time.perf_counter() - started,
+        }
+
+    def _rebuild_indexes(self, ontology_name):
+        """
+        Rebuilds the derived structures after the history of an
+        ontology has been pruned.
+        """
+        prefix = str(self._state_iri(ontology_name, ""))
+        for cache in (self.change_index, self.label_index, self.fingerprint_index, self.content_index):
+            for state_iri in [i for i in cache if str(i).startswith(prefix)]:
+                del cache[state_iri]
+        self.version_index.pop(ontology_name, None)
+        self.provenance_index.pop(ontology_name, None)
+
+        wrapper = self.store if self._tx is None else self._tx.wrapper
+        vacuum = getattr(wrapper.store, "vacuum", None)
+        if vacuum is None:
+            return
+        if self._tx is None:
+            vacuum()
+        else:
+            # the pruned triples are only removed from the table when
+            # the transaction is applied
+            self._tx.after_commit(vacuum)
                                                                                                                                                                                                                                                                                             
 
@@ -0,0 +1,125 @@
+# ================================================================
+# MEMENTO-SM
+# ASYNC FACADE — asyncio API over MementoSM
+# ================================================================
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from rdflib import Graph
+from rdflib.plugins.stores.sparqlstore import SPARQLUpdateStore
+
+from memento import MementoSM, VirtuosoStoreWrapper
+
+
+class AsyncMementoSM:
+    """
+    Asyncio facade over MementoSM.
+
+    Every call runs the synchronous MementoSM operation on a worker
+    thread, so the event loop is never blocked by store I/O. With a
+    SPARQL backend the store runs on a keep-alive connection pool and up
+    to `max_concurrency` operations (and HTTP requests) are in flight at
+    the same time, so many ontologies can be diffed in parallel against
+    one endpoint. The in-memory store is not thread-safe, hence its
+    operations are executed one at a time.
+
+    Writes to the same ontology are serialized, since each new state
+    depends on the last one.
+    """
+
+    def __init__(self, memento=None, max_concurrency=8, **memento_kwargs):
+
+        if memento is None:
+            query_endpoint = memento_kwargs.get("virtuoso_query_endpoint")
+            update_endpoint = memento_kwargs.get("virtuoso_update_endpoint")
+
+            if query_endpoint and update_endpoint and "store" not in memento_kwargs:
+                memento_kwargs["store"] = VirtuosoStoreWrapper(
+                    query_endpoint=query_endpoint,
+                    update_endpoint=update_endpoint,
+                    pool_size=max_concurrency
+                )
+
+            memento = MementoSM(**memento_kwargs)
+
+        self.memento = memento
+        self.remote = isinstance(memento.store.store, SPARQLUpdateStore)
+        self.max_concurrency = max_concurrency if self.remote else 1
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="memento"
+        )
+        self._limit = asyncio.Semaphore(self.max_concurrency)
+        self._write_locks = {}
+
+    async def _run(self, fn, *args, **kwargs):
+        async with self._limit:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._executor, functools.partial(fn, *args, **kwargs)
+            )
+
+    def _write_lock(self, ontology_name):
+        lock = self._write_locks.get(ontology_name)
+        if lock is None:
+            lock = self._write_locks[ontology_name] = asyncio.Lock()
+        return lock
+
+    def _materialize_state(self, ontology_name, state_name):
+        ctx = self.memento.get_ontology_state(ontology_name, state_name)
+        if not self.remote:
+            return ctx
+
+        g = Graph(identifier=ctx.identifier)
+        for t in ctx:
+            g.add(t)
+        return g
+
+    # ================================================================
+    # READ
+    # ================================================================
+
+    async def get_ontology_states(self, ontology_name):
+        return await self._run(self.memento.get_ontology_states, ontology_name)
+
+    async def get_ontology_state(self, ontology_name, state_name):
+        """
+        Returns the state graph. With a SPARQL backend the graph is
+        fetched once into memory, so that iterating it afterwards does
+        not issue blocking requests from the event loop.
+        """
+        return await self._run(self._materialize_state, ontology_name, state_name)
+
+    async def get_ontology_state_diff(self, ontology_name, state1, state2):
+        return await self._run(
+            self.memento.get_ontology_state_diff, ontology_name, state1, state2
+        )
+
+    # ================================================================
+    # WRITE
+    # ================================================================
+
+    async def create_ontology_state(self, ontology_name, changes, **kwargs):
+        async with self._write_lock(ontology_name):
+            return await self._run(
+                self.memento.create_ontology_state, ontology_name, changes, **kwargs
+            )
+
+    # ================================================================
+    # LIFECYCLE
+    # ================================================================
+
+    async def close(self):
+        self._executor.shutdown(wait=True)
+        pool = getattr(self.memento.store.store, "pool", None)
+        if pool is not None:
+            pool.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
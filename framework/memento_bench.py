@@ -0,0 +1,132 @@
+# ================================================================
+# MEMENTO-SM
+# BENCHMARK HARNESS — scaling curves of the main operations
+# ================================================================
+
+import argparse
+import json
+import sys
+import time
+
+from memento import MementoSM, Instrumentation
+from memento_synth import generate_ontology, generate_history
+
+
+# base size, multiplied by the scale factor
+BASE_SIZE = {
+    "n_classes": 200,
+    "n_object_properties": 10,
+    "n_datatype_properties": 5,
+    "n_individuals": 100,
+    "disjoint_groups": 5,
+}
+
+OPERATIONS = ("create_ontology", "create_ontology_state", "get_ontology_state_diff", "revert_ontology")
+
+
+def run_scale(scale, n_states=5, changes_per_state=100, seed=0, **memento_kwargs):
+    """
+    Ingests a synthetic ontology `scale` times the base size, builds a
+    history of `n_states` states, diffs the first and last state and
+    reverts to the first one. Returns one result row.
+    """
+
+    size = {k: max(1, int(v * scale)) for k, v in BASE_SIZE.items()}
+    g = generate_ontology(seed=seed, **size)
+    history = generate_history(g, n_states, n_add=changes_per_state, n_del=changes_per_state // 2, seed=seed)
+
+    instr = Instrumentation()
+    m = MementoSM(instrumentation=instr, **memento_kwargs)
+
+    t0 = time.perf_counter()
+    m.create_ontology("SYNTH", g, "s0", "synth", version="1.0.0")
+    for state_name, changes, version, author in history:
+        m.create_ontology_state("SYNTH", changes, state_name=state_name, author=author, version=version)
+    last = history[-1][0] if history else "s0"
+    m.get_ontology_state_diff("SYNTH", "s0", last)
+    m.revert_ontology("SYNTH", "s0", "revert", "synth")
+    total = time.perf_counter() - t0
+
+    ops = instr.to_dict()["operations"]
+    row = {
+        "scale": scale,
+        "triples": len(g),
+        "states": n_states,
+        "total_seconds": total,
+    }
+    for op in OPERATIONS:
+        calls, seconds = ops.get(op, {}).get("calls", 0), ops.get(op, {}).get("seconds", 0.0)
+        row[f"{op}_seconds"] = seconds / calls if calls else None
+    return row
+
+
+def run_benchmark(scales=(1, 10), **kwargs):
+    return [run_scale(scale, **kwargs) for scale in scales]
+
+
+def find_regressions(results, baseline, tolerance=0.25):
+    """
+    Timings in `results` more than `tolerance` slower than the row of
+    the same scale in `baseline`, as (scale, metric, baseline, now).
+    """
+    previous = {row["scale"]: row for row in baseline}
+    regressions = []
+    for row in results:
+        ref = previous.get(row["scale"])
+        if ref is None:
+            continue
+        for key, value in row.items():
+            if not key.endswith("_seconds") or value is None or not ref.get(key):
+                continue
+            if value > ref[key] * (1 + tolerance):
+                regressions.append((row["scale"], key, ref[key], value))
+    return regressions
+
+
+def format_table(results):
+    cols = ["scale", "triples", "total_seconds"] + [f"{op}_seconds" for op in OPERATIONS]
+    lines = ["\t".join(cols)]
+    for row in results:
+        lines.append("\t".join(
+            f"{row[c]:.3f}" if isinstance(row[c], float) else str(row[c]) for c in cols
+        ))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MementoSM scaling benchmark")
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10])
+    parser.add_argument("--states", type=int, default=5)
+    parser.add_argument("--changes", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--compact-axioms", action="store_true")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    results = run_benchmark(
+        args.scales,
+        n_states=args.states,
+        changes_per_state=args.changes,
+        seed=args.seed,
+        compact_axioms=args.compact_axioms,
+    )
+    print(format_table(results))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f), args.tolerance)
+        for scale, key, before, now in regressions:
+            print(f"REGRESSION scale={scale} {key}: {before:.3f}s -> {now:.3f}s")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+# ================================================================
+# MEMENTO-SM
+# COMMAND LINE — batch ingest, apply, diff, revert, export, replication
+# ================================================================
+
+import argparse
+import contextlib
+import os
+import sys
+import time
+
+from rdflib.plugins.parsers.ntriples import W3CNTriplesParser
+
+from memento import MementoSM, Instrumentation, ParseCache, DYNDIFF
+
+
+# ================================================================
+# CHANGE FILES
+# ================================================================
+#
+# One change per line: the DynDiff change type followed by the triple
+# in N-Triples syntax; blank lines and lines starting with # are
+# skipped.
+#
+#   addC <http://ex.org/A> <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://www.w3.org/2002/07/owl#Class> .
+#   delI <http://ex.org/a> <http://www.w3.org/2000/01/rdf-schema#label> "old"@en .
+#
+# `memento diff` writes this same format, so a diff can be replayed.
+
+class _Sink:
+    def __init__(self):
+        self.triples = []
+
+    def triple(self, s, p, o):
+        self.triples.append((s, p, o))
+
+
+def read_changes(lines):
+    types, statements = [], []
+    for n, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        ch_type, _, statement = line.partition(" ")
+        if not statement:
+            raise ValueError(f"line {n}: expected '<type> <s> <p> <o> .'")
+        types.append(DYNDIFF[ch_type])
+        statements.append(statement)
+
+    sink = _Sink()
+    W3CNTriplesParser(sink=sink).parsestring("\n".join(statements) + "\n")
+    if len(sink.triples) != len(types):
+        raise ValueError("one N-Triples statement per line expected")
+    return list(zip(sink.triples, types))
+
+
+def write_changes(changes, out):
+    for (s, p, o), ch_type in changes:
+        out.write(f"{str(ch_type).split('/')[-1]} {s.n3()} {p.n3()} {o.n3()} .\n")
+
+
+# ================================================================
+# STORE
+# ================================================================
+
+def open_store(args):
+    instr = Instrumentation() if (args.timing or args.progress) else None
+    if instr is not None and args.progress:
+        instr.subscribe(_progress)
+
+    # keep stdout for command output (exports, diffs)
+    with contextlib.redirect_stdout(sys.stderr):
+        m = MementoSM(
+            base_graph_uri=args.base,
+            instrumentation=instr,
+            compact_axioms=args.compact_axioms,
+            change_log=True,
+            parse_cache=ParseCache(args.parse_cache) if args.parse_cache else None,
+        )
+    if os.path.exists(args.store):
+        m.load_checkpoint(args.store, lazy=True)
+    return m
+
+
+def save_store(m, args):
+    m.save_checkpoint(args.store)
+
+
+def _progress(event):
+    if event["event"] == "operation":
+        print(f"  {event['operation']}: {event['seconds']:.3f}s", file=sys.stderr)
+
+
+def _step(args, i, n, what):
+    if args.progress:
+        print(f"[{i}/{n}] {what}", file=sys.stderr)
+
+
+def _output(args):
+    return open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+
+
+# ================================================================
+# COMMANDS
+# ================================================================
+
+def cmd_init(m, args):
+    m.create_ontology(
+        args.ontology, args.file, args.state, args.author,
+        version=args.version, fmt=args.format,
+        expand_disjoint=not args.no_expand_disjoint,
+    )
+    save_store(m, args)
+    print(m._state_iri(args.ontology, args.state))
+
+
+def cmd_apply(m, args):
+    names = args.state or [os.path.splitext(os.path.basename(f))[0] for f in args.files]
+    versions = args.version or ["1.0"] * len(args.files)
+    if len(names) != len(args.files) or len(versions) != len(args.files):
+        raise SystemExit("apply: give one --state and one --version per change file")
+
+    entries = []
+    for i, path in enumerate(args.files, 1):
+        _step(args, i, len(args.files), f"reading {path}")
+        with open(path, encoding="utf-8") as f:
+            entries.append((names[i - 1], read_changes(f), versions[i - 1], args.author))
+
+    if args.batch:
+        created = m.apply_change_sequence(args.ontology, entries, previous_state=args.previous,
+                                          drop_noops=args.drop_noops)
+    else:
+        created = []
+        previous = args.previous
+        for i, (name, changes, version, author) in enumerate(entries, 1):
+            _step(args, i, len(entries), f"state {name} ({len(changes)} changes)")
+            m.create_ontology_state(
+                args.ontology, changes, previous_state=previous, state_name=name,
+                author=author, version=version, bulk=args.bulk, drop_noops=args.drop_noops,
+            )
+            created.append(m._state_iri(args.ontology, name))
+            previous = name
+
+    save_store(m, args)
+    for iri in created:
+        print(iri)
+
+
+def cmd_diff(m, args):
+    out = _output(args)
+    try:
+        if args.consecutive:
+            results = m.diff_many(args.ontology, processes=args.processes)
+            n = max(0, len(m.get_ontology_states(args.ontology)) - 1)
+        else:
+            if not (args.state1 and args.state2):
+                raise SystemExit("diff: give two states or --consecutive")
+            added, removed = m.get_ontology_state_diff(args.ontology, args.state1, args.state2)
+            results = [(args.state1, args.state2, added, removed)]
+            n = 1
+
+        for i, (s1, s2, added, removed) in enumerate(results, 1):
+            _step(args, i, n, f"{s1} -> {s2}")
+            out.write(f"# {s1} -> {s2}: +{len(added)} -{len(removed)}\n")
+            write_changes(
+                m._classify_delta([t for t, _ in removed], [t for t, _ in added]), out
+            )
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def cmd_revert(m, args):
+    m.revert_ontology(args.ontology, args.target, args.new_state, args.author, version=args.version)
+    save_store(m, args)
+    print(m._state_iri(args.ontology, args.new_state))
+
+
+def cmd_export(m, args):
+    g = m.get_ontology_state(args.ontology, args.state)
+    data = g.serialize(format=args.format)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(data)
+    else:
+        sys.stdout.write(data)
+
+
+def cmd_log(m, args):
+    out = _output(args)
+    try:
+        m.export_change_log(args.ontology, args.since, out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def cmd_replay(m, args):
+    with open(args.file, encoding="utf-8") as f:
+        created = m.import_change_log(f)
+    save_store(m, args)
+    for iri in created:
+        print(iri)
+
+
+def cmd_states(m, args):
+    versions = {name: v for v, name in m.states_by_version(args.ontology)}
+    times = {name: (ts, agent) for ts, name, agent in m.states_between(args.ontology)}
+    for name in m.get_ontology_states(args.ontology):
+        ts, agent = times.get(name, ("", ""))
+        print(f"{name}\t{versions.get(name, '')}\t{ts}\t{str(agent).split('/')[-1]}")
+
+
+def cmd_ontologies(m, args):
+    for name in m.get_ontologies():
+        print(name)
+
+
+# ================================================================
+# ARGUMENTS
+# ================================================================
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="memento", description="MementoSM ontology versioning")
+    parser.add_argument("--store", default=os.environ.get("MEMENTO_STORE", "memento.ckpt"),
+                        help="checkpoint file holding the store (default: $MEMENTO_STORE or memento.ckpt)")
+    parser.add_argument("--base", default="http://example.org/memento", help="base graph URI")
+    parser.add_argument("--compact-axioms", action="store_true")
+    parser.add_argument("--parse-cache", metavar="DIR", help="cache parsed ontology files in DIR")
+    parser.add_argument("--progress", action="store_true", help="report progress on stderr")
+    parser.add_argument("--timing", action="store_true", help="print operation timings on stderr")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("init", help="create an ontology from a file")
+    p.add_argument("ontology")
+    p.add_argument("file")
+    p.add_argument("--state", default="s0")
+    p.add_argument("--author", required=True)
+    p.add_argument("--version", default="1.0.0")
+    p.add_argument("--format", help="RDF format of the file (guessed by default)")
+    p.add_argument("--no-expand-disjoint", action="store_true",
+                   help="keep owl:AllDisjointClasses groups as named n-ary axioms")
+    p.set_defaults(func=cmd_init)
+
+    p = sub.add_parser("apply", help="create states from change files")
+    p.add_argument("ontology")
+    p.add_argument("files", nargs="+")
+    p.add_argument("--state", action="append", help="state name per file (default: file name)")
+    p.add_argument("--version", action="append", help="version per file")
+    p.add_argument("--author", required=True)
+    p.add_argument("--previous", help="state the first file applies to (default: the last one)")
+    p.add_argument("--bulk", action="store_true", help="one change entity per change type")
+    p.add_argument("--batch", action="store_true",
+                   help="apply all files in one pass (apply_change_sequence)")
+    p.add_argument("--drop-noops", action="store_true")
+    p.set_defaults(func=cmd_apply)
+
+    p = sub.add_parser("diff", help="diff two states, or every consecutive pair")
+    p.add_argument("ontology")
+    p.add_argument("state1", nargs="?")
+    p.add_argument("state2", nargs="?")
+    p.add_argument("--consecutive", action="store_true")
+    p.add_argument("--processes", type=int, help="worker processes for --consecutive")
+    p.add_argument("-o", "--output")
+    p.set_defaults(func=cmd_diff)
+
+    p = sub.add_parser("revert", help="create a state equal to an earlier one")
+    p.add_argument("ontology")
+    p.add_argument("target")
+    p.add_argument("new_state")
+    p.add_argument("--author", required=True)
+    p.add_argument("--version")
+    p.set_defaults(func=cmd_revert)
+
+    p = sub.add_parser("export", help="serialize a state graph")
+    p.add_argument("ontology")
+    p.add_argument("state")
+    p.add_argument("--format", default="turtle")
+    p.add_argument("-o", "--output")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("log", help="write the change log of the states after --since")
+    p.add_argument("ontology")
+    p.add_argument("--since", required=True, help="last state the replica already holds")
+    p.add_argument("-o", "--output")
+    p.set_defaults(func=cmd_log)
+
+    p = sub.add_parser("replay", help="create the states of a change log")
+    p.add_argument("file")
+    p.set_defaults(func=cmd_replay)
+
+    p = sub.add_parser("states", help="list the states of an ontology")
+    p.add_argument("ontology")
+    p.set_defaults(func=cmd_states)
+
+    p = sub.add_parser("ontologies", help="list the ontologies in the store")
+    p.set_defaults(func=cmd_ontologies)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    started = time.perf_counter()
+    m = open_store(args)
+    args.func(m, args)
+
+    if args.timing:
+        print(m.instrumentation.to_json(), file=sys.stderr)
+        print(f"total: {time.perf_counter() - started:.3f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,323 @@
+# ================================================================
+# MEMENTO-SM
+# SHARDED MANAGER — ontologies partitioned across worker processes
+# ================================================================
+
+import hashlib
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+
+from rdflib import Graph
+
+from memento import MementoSM
+
+
+# MementoSM methods whose first argument is the ontology name
+ROUTED = (
+    "create_ontology",
+    "create_ontology_state",
+    "apply_change_sequence",
+    "get_ontology_state",
+    "get_ontology_states",
+    "get_ontology_state_diff",
+    "diff_many",
+    "revert_ontology",
+    "remove_ontology_state",
+    "last_state_iri",
+    "states_by_version",
+    "latest_version",
+    "search_labels",
+    "state_fingerprint",
+    "states_between",
+    "changes_by_agent",
+    "change_counts",
+    "disjoint_groups",
+    "disjoint_pairs",
+    "merge_conflicts",
+    "merge_states",
+    "compact",
+)
+
+# MementoSM arguments naming one store: every shard needs its own
+_SHARED_STORE_KWARGS = ("store", "virtuoso_query_endpoint", "virtuoso_update_endpoint")
+
+
+class _Triples(list):
+    """A graph shipped between processes as a plain list of triples."""
+
+    @classmethod
+    def of(cls, g):
+        return cls(g.triples((None, None, None)))
+
+    def graph(self):
+        g = Graph()
+        for t in self:
+            g.add(t)
+        return g
+
+
+def _portable(value):
+    if isinstance(value, Graph):
+        return _Triples.of(value)
+    if hasattr(value, "__next__"):
+        return list(value)
+    return value
+
+
+def _shard_worker(tasks, results, memento_kwargs):
+    m = MementoSM(**memento_kwargs)
+
+    while True:
+        item = tasks.get()
+        if item is None:
+            break
+
+        req_id, method, args, kwargs = item
+        args = [a.graph() if isinstance(a, _Triples) else a for a in args]
+        if method == "diff_many":
+            # daemonic workers cannot fork a pool; the shards are the
+            # parallelism here
+            kwargs = dict(kwargs, processes=1)
+        try:
+            if method == "export_change_log":
+                # the caller's stream stays in the caller: the log is
+                # sent back as text
+                out = io.StringIO()
+                value = (m.export_change_log(*args, out=out, **kwargs), out.getvalue())
+            else:
+                value = _portable(getattr(m, method)(*args, **kwargs))
+            results.put((req_id, True, value))
+        except Exception as e:
+            try:
+                results.put((req_id, False, e))
+            except Exception:
+                results.put((req_id, False, RuntimeError(repr(e))))
+
+
+class ShardedMementoSM:
+    """
+    MementoSM API over `n_shards` worker processes, each running its
+    own MementoSM (and store) for a fixed subset of the ontologies.
+
+    Calls are routed by ontology name, so different ontologies are
+    ingested and diffed in parallel while the states of one ontology
+    stay on one shard. Graphs cross process boundaries as triple lists:
+    get_ontology_state() returns an in-memory copy of the state.
+
+    batch() sends many calls at once and is the way to keep all the
+    workers busy from a single caller:
+
+        with ShardedMementoSM(n_shards=4) as m:
+            m.batch([("create_ontology", (name, path, "s0", "me"), {}) for ...])
+
+    `memento_kwargs` go to every shard's MementoSM, except that a
+    `wal_path` gets the shard number as a suffix. A store or SPARQL
+    endpoint would be shared by all the shards, whose MementoSM each
+    reset the global meta graph, and is rejected.
+    """
+
+    def __init__(self, n_shards=None, start_method=None, **memento_kwargs):
+        shared = [k for k in _SHARED_STORE_KWARGS if memento_kwargs.get(k) is not None]
+        if shared:
+            raise ValueError(
+                f"ShardedMementoSM shards cannot share one store ({', '.join(shared)})"
+            )
+
+        self.n_shards = n_shards or multiprocessing.cpu_count()
+        ctx = multiprocessing.get_context(start_method)
+
+        self._ids = itertools.count()
+        self._pending = {}
+        self._sent_to = {}
+        self._results = ctx.Queue()
+        self._tasks = []
+        self._workers = []
+
+        for shard in range(self.n_shards):
+            kwargs = dict(memento_kwargs)
+            if kwargs.get("wal_path"):
+                kwargs["wal_path"] = f"{kwargs['wal_path']}.{shard}"
+            tasks = ctx.Queue()
+            worker = ctx.Process(
+                target=_shard_worker,
+                args=(tasks, self._results, kwargs),
+                daemon=True
+            )
+            worker.start()
+            self._tasks.append(tasks)
+            self._workers.append(worker)
+
+    def shard_of(self, ontology_name):
+        digest = hashlib.blake2b(ontology_name.encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big") % self.n_shards
+
+    # ================================================================
+    # DISPATCH
+    # ================================================================
+
+    def _send(self, shard, method, args, kwargs):
+        req_id = next(self._ids)
+        args = tuple(_Triples.of(a) if isinstance(a, Graph) else a for a in args)
+        self._tasks[shard].put((req_id, method, args, kwargs))
+        self._sent_to[req_id] = shard
+        return req_id
+
+    def _receive(self, req_id, poll=1.0):
+        while req_id not in self._pending:
+            try:
+                rid, ok, value = self._results.get(timeout=poll)
+            except queue.Empty:
+                shard = self._sent_to[req_id]
+                worker = self._workers[shard]
+                if not worker.is_alive():
+                    del self._sent_to[req_id]
+                    raise RuntimeError(
+                        f"shard {shard} worker exited (code {worker.exitcode}) before answering"
+                    )
+                continue
+            self._pending[rid] = (ok, value)
+        self._sent_to.pop(req_id, None)
+        return self._pending.pop(req_id)
+
+    def _result(self, req_id):
+        ok, value = self._receive(req_id)
+        if not ok:
+            raise value
+        return value.graph() if isinstance(value, _Triples) else value
+
+    def _gather(self, req_ids):
+        """
+        Results of `req_ids` in order. Every reply (or dead worker) is
+        collected before the first failure is raised, so none is left
+        behind in _pending.
+        """
+        results = []
+        for req_id in req_ids:
+            try:
+                results.append(self._receive(req_id))
+            except RuntimeError as e:
+                results.append((False, e))
+        for ok, value in results:
+            if not ok:
+                raise value
+        return [v.graph() if isinstance(v, _Triples) else v for _, v in results]
+
+    def _route(self, method, args, kwargs):
+        ontology_name = args[0] if args else kwargs.get("ontology_name")
+        if ontology_name is None:
+            raise TypeError(f"{method}() needs an ontology name")
+        return self.shard_of(ontology_name)
+
+    def call(self, method, *args, **kwargs):
+        if method not in ROUTED:
+            raise AttributeError(method)
+        shard = self._route(method, args, kwargs)
+        return self._result(self._send(shard, method, args, kwargs))
+
+    def batch(self, calls):
+        """
+        Runs [(method, args, kwargs), ...] and returns their results in
+        order. Every call is queued before any result is awaited, so the
+        shards work concurrently; calls on the same ontology still run
+        in the given order. The first failure is raised once all the
+        calls have completed.
+        """
+        req_ids = []
+        for method, args, kwargs in calls:
+            if method not in ROUTED:
+                raise AttributeError(method)
+            shard = self._route(method, args, kwargs)
+            req_ids.append(self._send(shard, method, args, kwargs))
+        return self._gather(req_ids)
+
+    def __getattr__(self, name):
+        if name not in ROUTED:
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self.call(name, *args, **kwargs)
+
+    # ================================================================
+    # CROSS-ONTOLOGY
+    # ================================================================
+
+    def _broadcast(self, method, *args, **kwargs):
+        req_ids = [
+            self._send(shard, method, args, kwargs)
+            for shard in range(self.n_shards)
+        ]
+        return self._gather(req_ids)
+
+    def get_ontologies(self):
+        return sorted(name for names in self._broadcast("get_ontologies") for name in names)
+
+    # ================================================================
+    # REPLICATION
+    # ================================================================
+
+    def export_change_log(self, ontology_name, since, out):
+        """
+        MementoSM.export_change_log() on the ontology's shard; the log
+        is written to `out` here.
+        """
+        req_id = self._send(self.shard_of(ontology_name), "export_change_log",
+                            (ontology_name, since), {})
+        exported, text = self._result(req_id)
+        out.write(text)
+        return exported
+
+    def import_change_log(self, lines):
+        """
+        MementoSM.import_change_log() on the shard of the ontology named
+        in the log's header.
+        """
+        lines = [line for line in lines if line.strip()]
+        header = json.loads(lines[0]) if lines else None
+        if not header or header[0] != "memento-log":
+            raise ValueError("Change log does not start with a memento-log header")
+        ontology_name = header[3]
+        return self._result(self._send(self.shard_of(ontology_name), "import_change_log", (lines,), {}))
+
+    def save_checkpoint(self, path):
+        """
+        One checkpoint per shard, at `path` with the shard number as a
+        suffix. Returns the number of graphs written.
+        """
+        req_ids = [
+            self._send(shard, "save_checkpoint", (f"{path}.{shard}",), {})
+            for shard in range(self.n_shards)
+        ]
+        return sum(self._gather(req_ids))
+
+    def load_checkpoint(self, path, lazy=True):
+        """
+        Loads the checkpoints written by save_checkpoint(). Ontologies
+        are placed on shards by name, so the checkpoints must come from
+        a manager with the same number of shards.
+        """
+        if os.path.exists(f"{path}.{self.n_shards}") or not os.path.exists(f"{path}.{self.n_shards - 1}"):
+            raise ValueError(f"Checkpoint {path} was not written by {self.n_shards} shards")
+        req_ids = [
+            self._send(shard, "load_checkpoint", (f"{path}.{shard}",), {"lazy": lazy})
+            for shard in range(self.n_shards)
+        ]
+        self._gather(req_ids)
+
+    # ================================================================
+    # LIFECYCLE
+    # ================================================================
+
+    def close(self):
+        for tasks in self._tasks:
+            tasks.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._tasks, self._workers = [], []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
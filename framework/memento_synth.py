@@ -0,0 +1,278 @@
+# ================================================================
+# MEMENTO-SM
+# SYNTHETIC DATA — ontologies and change streams for scale testing
+# ================================================================
+
+import random
+
+from rdflib import Graph, URIRef, BNode, Literal, Namespace
+from rdflib.collection import Collection
+from rdflib.namespace import RDF, RDFS, OWL, XSD
+
+from memento import (
+    DYNDIFF, MEMENTO, DELC_KEPT_PREDICATES,
+    change_action_class, expand_all_disjoint_classes, is_system_triple
+)
+
+
+SYNTH = Namespace("http://example.org/synth#")
+
+
+def generate_ontology(
+    n_classes=1000,
+    n_object_properties=50,
+    n_datatype_properties=20,
+    n_individuals=500,
+    depth=6,
+    restriction_ratio=0.1,
+    disjoint_groups=10,
+    disjoint_group_size=5,
+    seed=0,
+    ns=SYNTH
+):
+    """
+    Builds a random OWL ontology shaped like a real one:
+
+    - a subclass tree of `n_classes` classes at most `depth` levels deep
+    - object/datatype properties with domains and ranges
+    - about `restriction_ratio` of the classes with an
+      owl:someValuesFrom restriction (a BNode) as superclass
+    - `disjoint_groups` owl:AllDisjointClasses groups of sibling classes
+    - typed individuals with property assertions
+
+    Every entity has an English rdfs:label; classes also get a comment.
+    The same arguments always give the same graph.
+    """
+
+    rnd = random.Random(seed)
+    g = Graph()
+    g.bind("synth", ns)
+    g.bind("owl", OWL)
+
+    g.add((URIRef(str(ns).rstrip("#/")), RDF.type, OWL.Ontology))
+
+    # --------------------------
+    # CLASSES
+    # --------------------------
+
+    classes = []
+    level = {}
+    children = {}
+
+    for i in range(n_classes):
+        c = ns[f"C{i}"]
+        g.add((c, RDF.type, OWL.Class))
+        g.add((c, RDFS.label, Literal(f"Class {i}", lang="en")))
+        g.add((c, RDFS.comment, Literal(f"Synthetic class number {i}.", lang="en")))
+
+        parents = [p for p in classes[-64:] if level[p] < depth - 1]
+        if parents:
+            parent = rnd.choice(parents)
+            g.add((c, RDFS.subClassOf, parent))
+            level[c] = level[parent] + 1
+            children.setdefault(parent, []).append(c)
+        else:
+            level[c] = 0
+
+        classes.append(c)
+
+    # --------------------------
+    # PROPERTIES
+    # --------------------------
+
+    object_properties = []
+    for i in range(n_object_properties):
+        p = ns[f"op{i}"]
+        g.add((p, RDF.type, OWL.ObjectProperty))
+        g.add((p, RDFS.label, Literal(f"object property {i}", lang="en")))
+        if classes:
+            g.add((p, RDFS.domain, rnd.choice(classes)))
+            g.add((p, RDFS.range, rnd.choice(classes)))
+        object_properties.append(p)
+
+    datatype_properties = []
+    for i in range(n_datatype_properties):
+        p = ns[f"dp{i}"]
+        g.add((p, RDF.type, OWL.DatatypeProperty))
+        g.add((p, RDFS.label, Literal(f"datatype property {i}", lang="en")))
+        if classes:
+            g.add((p, RDFS.domain, rnd.choice(classes)))
+        g.add((p, RDFS.range, rnd.choice((XSD.string, XSD.integer))))
+        datatype_properties.append(p)
+
+    # --------------------------
+    # RESTRICTIONS (BNode)
+    # --------------------------
+
+    if object_properties:
+        for c in classes:
+            if rnd.random() >= restriction_ratio:
+                continue
+            r = BNode()
+            g.add((r, RDF.type, OWL.Restriction))
+            g.add((r, OWL.onProperty, rnd.choice(object_properties)))
+            g.add((r, OWL.someValuesFrom, rnd.choice(classes)))
+            g.add((c, RDFS.subClassOf, r))
+
+    # --------------------------
+    # owl:AllDisjointClasses
+    # --------------------------
+
+    families = [kids for kids in children.values() if len(kids) >= 2]
+    rnd.shuffle(families)
+    for kids in families[:disjoint_groups]:
+        adc = BNode()
+        head = BNode()
+        g.add((adc, RDF.type, OWL.AllDisjointClasses))
+        g.add((adc, OWL.members, head))
+        Collection(g, head, kids[:disjoint_group_size])
+
+    # --------------------------
+    # INDIVIDUALS
+    # --------------------------
+
+    individuals = []
+    for i in range(n_individuals):
+        ind = ns[f"i{i}"]
+        g.add((ind, RDF.type, OWL.NamedIndividual))
+        if classes:
+            g.add((ind, RDF.type, rnd.choice(classes)))
+        g.add((ind, RDFS.label, Literal(f"individual {i}", lang="en")))
+        if individuals and object_properties:
+            g.add((ind, rnd.choice(object_properties), rnd.choice(individuals)))
+        if datatype_properties:
+            g.add((ind, rnd.choice(datatype_properties), Literal(rnd.randint(0, 10 ** 6))))
+        individuals.append(ind)
+
+    return g
+
+
+def change_type(triple, add):
+    """
+    DynDiff change type of adding/removing `triple`: class and property
+    types for the declarations of classes and properties, individual
+    types (which MementoSM applies as plain triple edits) otherwise.
+    """
+    s, p, o = triple
+    if p == RDF.type and o == OWL.Class:
+        return DYNDIFF.addC if add else DYNDIFF.delC
+    if p == RDF.type and o in (OWL.ObjectProperty, OWL.DatatypeProperty, OWL.AnnotationProperty):
+        return DYNDIFF.addP if add else DYNDIFF.delP
+    return DYNDIFF.addI if add else DYNDIFF.delI
+
+
+def replay_changes(graph, changes, base_uri="http://example.org/memento"):
+    """
+    Applies a change list to `graph` as MementoSM.create_ontology_state()
+    does: system triples (see is_system_triple) are dropped, additions
+    are added; delC removes the triples of its subject except those in
+    DELC_KEPT_PREDICATES; delI/delP remove nothing.
+    """
+    changes = [(t, ch) for t, ch in changes if not is_system_triple(*t, base_uri)]
+    for t, ch in changes:
+        if change_action_class(ch) == MEMENTO.AddChangeAction:
+            graph.add(t)
+    for (s, _, _), ch in changes:
+        if ch == DYNDIFF.delC:
+            for t in list(graph.triples((s, None, None))):
+                if t[1] not in DELC_KEPT_PREDICATES:
+                    graph.remove(t)
+
+
+def generate_changes(graph, n_add=100, n_del=50, seed=0, ns=SYNTH, prefix="N"):
+    """
+    A realistic change set against `graph`: new classes (type,
+    superclass, label), relabelled entities, new individuals and
+    assertions; removed subclass edges, labels and whole classes.
+
+    Returns a list of ((s, p, o), change_type) and applies it to
+    `graph` with replay_changes(), so that successive calls build a
+    consistent history. Only class and property declarations get class
+    and property change types: removing a label or a superclass is a
+    delI, which MementoSM records but does not apply. For `graph` to
+    track the stored states it must hold what the store holds, i.e. the
+    pairwise owl:disjointWith triples that create_ontology() expands
+    owl:AllDisjointClasses into (expand_all_disjoint_classes).
+    """
+
+    rnd = random.Random(seed)
+    classes = [c for c in graph.subjects(RDF.type, OWL.Class) if isinstance(c, URIRef)]
+    individuals = list(graph.subjects(RDF.type, OWL.NamedIndividual))
+    properties = list(graph.subjects(RDF.type, OWL.ObjectProperty))
+
+    added, removed = [], []
+
+    # --------------------------
+    # ADDITIONS
+    # --------------------------
+
+    i = 0
+    while len(added) < n_add:
+        i += 1
+        kind = rnd.random()
+        if kind < 0.4 or not classes:
+            c = ns[f"{prefix}{seed}_{i}"]
+            added.append((c, RDF.type, OWL.Class))
+            added.append((c, RDFS.label, Literal(f"New class {seed}.{i}", lang="en")))
+            if classes:
+                added.append((c, RDFS.subClassOf, rnd.choice(classes)))
+            classes.append(c)
+        elif kind < 0.6:
+            c = rnd.choice(classes)
+            added.append((c, RDFS.label, Literal(f"Renamed class {seed}.{i}", lang="en")))
+        else:
+            ind = ns[f"{prefix}{seed}_i{i}"]
+            added.append((ind, RDF.type, OWL.NamedIndividual))
+            added.append((ind, RDF.type, rnd.choice(classes)))
+            if properties and individuals:
+                added.append((ind, rnd.choice(properties), rnd.choice(individuals)))
+            individuals.append(ind)
+    added = added[:n_add]
+
+    # --------------------------
+    # DELETIONS
+    # --------------------------
+
+    existing = [
+        t for t in graph
+        if isinstance(t[0], URIRef) and t[1] in (RDFS.subClassOf, RDFS.label)
+        and not isinstance(t[2], BNode)
+    ]
+    rnd.shuffle(existing)
+    removed.extend(existing[:max(0, n_del - n_del // 5)])
+
+    for c in rnd.sample(classes, min(len(classes), n_del // 5)):
+        removed.append((c, RDF.type, OWL.Class))
+
+    changes = [(t, change_type(t, True)) for t in added]
+    changes += [(t, change_type(t, False)) for t in removed]
+    replay_changes(graph, changes)
+    return changes
+
+
+def generate_history(graph, n_states=10, n_add=100, n_del=50, seed=0, author="synth",
+                     first_version=(1, 0, 0)):
+    """
+    Entries (state_name, changes, version, author) for
+    MementoSM.apply_change_sequence(), evolving a copy of `graph`.
+    Every fifth state is a minor release, the others are patches.
+    """
+
+    work = Graph()
+    for t in graph:
+        work.add(t)
+    for t in expand_all_disjoint_classes(work):
+        work.add(t)
+
+    major, minor, patch = first_version
+    history = []
+
+    for k in range(1, n_states + 1):
+        if k % 5 == 0:
+            minor, patch = minor + 1, 0
+        else:
+            patch += 1
+        changes = generate_changes(work, n_add, n_del, seed=seed * 100003 + k)
+        history.append((f"s{k}", changes, f"{major}.{minor}.{patch}", author))
+
+    return history
@@ -0,0 +1,138 @@
+import contextlib
+import http.server
+import io
+import os
+import sys
+import threading
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from rdflib import ConjunctiveGraph, URIRef
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "framework"))
+
+from memento import MementoSM  # noqa: E402
+
+
+@pytest.fixture
+def make_memento():
+    """MementoSM factory, silencing the base-ontology download report."""
+    def make(**kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return MementoSM(**kwargs)
+    return make
+
+
+class SPARQLServer(http.server.ThreadingHTTPServer):
+    """
+    Stand-in SPARQL 1.1 endpoint (query at /sparql, update at /update)
+    over an in-memory rdflib dataset, with keep-alive connections.
+    Results are sent as SPARQL JSON: rdflib's XML writer drops falsy
+    literals such as "0".
+    Counts the connections opened and the most requests in flight at
+    once; each request takes at least `delay` seconds.
+    """
+    daemon_threads = True
+
+    def __init__(self, delay=0.0):
+        super().__init__(("127.0.0.1", 0), SPARQLHandler)
+        self.dataset = ConjunctiveGraph()
+        self.delay = delay
+        self.connections = 0
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self.data_lock = threading.Lock()
+
+    @property
+    def query_endpoint(self):
+        return f"http://127.0.0.1:{self.server_port}/sparql"
+
+    @property
+    def update_endpoint(self):
+        return f"http://127.0.0.1:{self.server_port}/update"
+
+
+class SPARQLHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def _reply(self, status, body=b"", content_type="text/plain"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, params, body):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            time.sleep(server.delay)
+            path = urlsplit(self.path).path
+            ctype = (self.headers.get("Content-Type") or "").split(";")[0]
+
+            if path == "/update":
+                with server.data_lock:
+                    server.dataset.update(body.decode("utf-8"))
+                return self._reply(200)
+
+            if ctype == "application/x-www-form-urlencoded":
+                params.update(parse_qs(body.decode("utf-8")))
+                query = params["query"][0]
+            elif ctype == "application/sparql-query":
+                query = body.decode("utf-8")
+            else:
+                query = params["query"][0]
+
+            graph = server.dataset
+            if "default-graph-uri" in params:
+                graph = server.dataset.get_context(URIRef(params["default-graph-uri"][0]))
+            with server.data_lock:
+                result = graph.query(query)
+                if result.type in ("CONSTRUCT", "DESCRIBE"):
+                    data = result.graph.serialize(format="xml", encoding="utf-8")
+                    return self._reply(200, data, "application/rdf+xml")
+                data = result.serialize(format="json")
+            self._reply(200, data, "application/sparql-results+json")
+        except Exception as e:
+            self._reply(400, repr(e).encode("utf-8"))
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def do_GET(self):
+        self._handle(parse_qs(urlsplit(self.path).query), b"")
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self._handle(parse_qs(urlsplit(self.path).query), body)
+
+
+@pytest.fixture
+def sparql_server():
+    """A running SPARQLServer, shut down after the test."""
+    servers = []
+
+    def start(**kwargs):
+        server = SPARQLServer(**kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
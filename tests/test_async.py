@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+from rdflib import ConjunctiveGraph, Graph, Literal, Namespace, URIRef
+from rdflib.namespace import OWL, RDF, RDFS
+
+from memento import DYNDIFF, VirtuosoStoreWrapper
+from memento_async import AsyncMementoSM
+
+EX = Namespace("http://example.org/pool#")
+
+
+def base_graph():
+    g = Graph()
+    g.add((URIRef("http://example.org/pool"), RDF.type, OWL.Ontology))
+    for i in range(4):
+        g.add((EX[f"C{i}"], RDF.type, OWL.Class))
+        g.add((EX[f"C{i}"], RDFS.label, Literal(f"class {i}", lang="en")))
+        if i:
+            g.add((EX[f"C{i}"], RDFS.subClassOf, EX[f"C{i - 1}"]))
+    return g
+
+
+def changes(k):
+    return [
+        ((EX[f"N{k}"], RDF.type, OWL.Class), DYNDIFF.addC),
+        ((EX[f"N{k}"], RDFS.subClassOf, EX.C0), DYNDIFF.addI),
+    ]
+
+
+def build(m, ontologies=("O",)):
+    for name in ontologies:
+        m.create_ontology(name, base_graph(), "s0", "alice")
+        m.create_ontology_state(name, changes(1), previous_state="s0", state_name="s1",
+                                author="alice", timestamp="2099-01-01T00:00:01Z")
+    return m
+
+
+def seed(server, m):
+    # SPARQLStore cannot write the axiom blank nodes, so the endpoint is
+    # filled with the quads of an in-memory build
+    server.dataset.addN(ConjunctiveGraph(store=m.store.store).quads())
+
+
+def test_pooled_store_matches_the_in_memory_store(make_memento, sparql_server):
+    server = sparql_server()
+    local = build(make_memento())
+    seed(server, local)
+
+    store = VirtuosoStoreWrapper(query_endpoint=server.query_endpoint,
+                                 update_endpoint=server.update_endpoint, pool_size=2)
+    remote = make_memento(store=store)
+    assert sorted(remote.get_ontology_states("O")) == ["s0", "s1"]
+    for state in ("s0", "s1"):
+        assert remote._content_set("O", state) == local._content_set("O", state)
+    # the added and removed lists come from set differences: compare them as sets
+    diffs = [m.get_ontology_state_diff("O", "s0", "s1") for m in (remote, local)]
+    assert [set(part) for part in diffs[0]] == [set(part) for part in diffs[1]]
+
+    # updates go through the same pool
+    g = Graph(store=store.store, identifier=URIRef("http://example.org/pool/scratch"))
+    g.add((EX.X, RDF.type, OWL.Class))
+    assert (EX.X, RDF.type, OWL.Class) in server.dataset
+
+    # every request went over the two keep-alive connections
+    assert server.connections <= 2
+    assert server.requests > 10 * server.connections
+    store.store.close()
+
+
+def test_async_reads_run_concurrently(make_memento, sparql_server):
+    server = sparql_server(delay=0.02)
+    names = [f"O{i}" for i in range(4)]
+    local = build(make_memento(), names)
+    seed(server, local)
+
+    async def run():
+        async with AsyncMementoSM(virtuoso_query_endpoint=server.query_endpoint,
+                                  virtuoso_update_endpoint=server.update_endpoint,
+                                  max_concurrency=4) as m:
+            assert m.remote and m.max_concurrency == 4
+            diffs = await asyncio.gather(*(m.get_ontology_state_diff(n, "s0", "s1")
+                                           for n in names))
+            states = await asyncio.gather(*(m.get_ontology_state(n, "s1") for n in names))
+            return diffs, states
+
+    diffs, states = asyncio.run(run())
+    for name, diff, g in zip(names, diffs, states):
+        expected = local.get_ontology_state_diff(name, "s0", "s1")
+        assert [set(part) for part in diff] == [set(part) for part in expected]
+        assert set(g) == set(local.get_ontology_state(name, "s1"))
+    assert server.max_in_flight > 1
+    assert server.connections <= 4
+
+
+def test_writes_to_one_ontology_are_serialized(sparql_server, monkeypatch):
+    server = sparql_server()
+    running = []
+    overlaps = []
+
+    def create_ontology_state(ontology_name, changes, **kwargs):
+        running.append(ontology_name)
+        overlaps.append(list(running))
+        time.sleep(0.05)
+        running.remove(ontology_name)
+        return kwargs["state_name"]
+
+    async def run():
+        async with AsyncMementoSM(virtuoso_query_endpoint=server.query_endpoint,
+                                  virtuoso_update_endpoint=server.update_endpoint,
+                                  max_concurrency=4) as m:
+            monkeypatch.setattr(m.memento, "create_ontology_state", create_ontology_state)
+            return await asyncio.gather(*(
+                m.create_ontology_state(name, changes(k), state_name=f"s{k}")
+                for k, name in enumerate(["A", "A", "B", "A"], 1)
+            ))
+
+    assert asyncio.run(run()) == ["s1", "s2", "s3", "s4"]
+    # "A" writes one at a time, "B" alongside them
+    assert all(running.count("A") <= 1 for running in overlaps)
+    assert any(sorted(running) == ["A", "B"] for running in overlaps)
+
+
+def test_in_memory_store_runs_one_operation_at_a_time(make_memento):
+    m = AsyncMementoSM(make_memento())
+    assert not m.remote and m.max_concurrency == 1
+    asyncio.run(m.close())
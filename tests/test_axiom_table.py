@@ -0,0 +1,99 @@
+import random
+
+from rdflib import BNode, Graph, Namespace, URIRef
+from rdflib.namespace import OWL, RDF, RDFS
+from rdflib.plugins.stores.memory import Memory
+
+from memento import CompactAxiomStore
+
+EX = Namespace("http://example.org/axioms#")
+A = URIRef("http://example.org/axioms/a")
+B = URIRef("http://example.org/axioms/b")
+
+
+def axiom(node, target=None):
+    ts = [
+        (node, RDF.type, OWL.Axiom),
+        (node, OWL.annotatedSource, EX.C),
+        (node, OWL.annotatedProperty, RDFS.subClassOf),
+    ]
+    if target is not None:
+        ts.append((node, OWL.annotatedTarget, target))
+    return ts
+
+
+def shared(store, node, target=None):
+    """`node` added to A, then A copied to B in one addN."""
+    a, b = Graph(store=store, identifier=A), Graph(store=store, identifier=B)
+    for t in axiom(node, target):
+        a.add(t)
+    store.addN((s, p, o, b) for (s, p, o) in a)
+    return a, b
+
+
+def test_copies_share_rows():
+    store = CompactAxiomStore()
+    a, b = shared(store, BNode(), EX.D)
+    assert len(store.axioms) == 1
+    assert set(a) == set(b)
+    assert len(b) == 4
+
+
+def test_adding_to_a_shared_axiom_changes_one_context():
+    store = CompactAxiomStore()
+    node = BNode()
+    a, b = shared(store, node)
+
+    b.add((node, OWL.annotatedTarget, EX.D))
+    assert (node, OWL.annotatedTarget, EX.D) in b
+    assert (node, OWL.annotatedTarget, None) not in a
+    assert set(a) == set(axiom(node))
+    assert set(b) == set(axiom(node, EX.D))
+
+
+def test_partial_remove_keeps_the_other_triples():
+    store = CompactAxiomStore()
+    node = BNode()
+    a, b = shared(store, node, EX.D)
+
+    b.remove((node, OWL.annotatedTarget, EX.D))
+    assert set(b) == set(axiom(node))
+    assert set(a) == set(axiom(node, EX.D))
+
+    b.add((node, OWL.annotatedTarget, EX.D))
+    assert set(b) == set(a)
+    # B is back on the shared row; its own copy is garbage
+    store.vacuum()
+    assert len(store.axioms) == 1
+
+
+def test_same_contents_as_a_plain_store():
+    rng = random.Random(7)
+    plain, compact = Memory(), CompactAxiomStore()
+    nodes = [BNode() for _ in range(6)]
+    values = {
+        RDF.type: [OWL.Axiom],
+        OWL.annotatedSource: [EX.C, EX.D],
+        OWL.annotatedTarget: [EX.E, EX.F],
+        RDFS.label: [EX.G],
+    }
+
+    for _ in range(400):
+        ctx = rng.choice((A, B))
+        node = rng.choice(nodes)
+        p = rng.choice(list(values))
+        t = (node, p, rng.choice(values[p]))
+        op = rng.random()
+        for store in (plain, compact):
+            g = Graph(store=store, identifier=ctx)
+            if op < 0.15:
+                other = Graph(store=store, identifier=B if ctx == A else A)
+                store.addN((s, p, o, other) for (s, p, o) in g.triples((node, None, None)))
+            elif op < 0.6:
+                g.add(t)
+            else:
+                g.remove(t)
+
+    for ctx in (A, B):
+        assert set(Graph(store=compact, identifier=ctx)) == set(Graph(store=plain, identifier=ctx))
+        assert len(Graph(store=compact, identifier=ctx)) == len(Graph(store=plain, identifier=ctx))
@@ -0,0 +1,70 @@
+import pytest
+from rdflib import Graph, Literal, Namespace, URIRef
+from rdflib.namespace import OWL, RDF, RDFS
+
+import memento
+from memento import DYNDIFF, MEMENTO
+
+EX = Namespace("http://example.org/index#")
+
+
+def base_graph():
+    g = Graph()
+    g.add((URIRef("http://example.org/index"), RDF.type, OWL.Ontology))
+    for c in (EX.A, EX.B, EX.D):
+        g.add((c, RDF.type, OWL.Class))
+    g.add((EX.B, RDFS.subClassOf, EX.A))
+    g.add((EX.D, EX.P, Literal("x")))
+    return g
+
+
+@pytest.fixture
+def history(make_memento):
+    m = make_memento()
+    m.create_ontology("O", base_graph(), "s0", "alice")
+    m.create_ontology_state("O", [
+        ((EX.C, RDF.type, OWL.Class), DYNDIFF.addC),
+        ((EX.C, RDFS.subClassOf, EX.A), DYNDIFF.addI),
+        ((EX.D, RDF.type, OWL.Class), DYNDIFF.delC),
+    ], previous_state="s0", state_name="s1", author="alice", timestamp="2030-01-01T00:00:01Z")
+    # no content change: the diff falls back to the recorded changes
+    m.create_ontology_state("O", [((EX.A, RDF.type, OWL.Class), DYNDIFF.addC)],
+                            previous_state="s1", state_name="s2", author="bob",
+                            timestamp="2030-01-01T00:00:02Z")
+    return m
+
+
+PAIRS = [("s0", "s1"), ("s1", "s0"), ("s1", "s2"), ("s0", "s2")]
+
+
+def diffs(m):
+    return {pair: tuple(set(part) for part in m.get_ontology_state_diff("O", *pair))
+            for pair in PAIRS}
+
+
+def test_changes_are_classified(history):
+    added, removed = history.get_ontology_state_diff("O", "s0", "s1")
+    assert set(added) == {((EX.C, RDF.type, OWL.Class), MEMENTO.AddChangeAction),
+                          ((EX.C, RDFS.subClassOf, EX.A), MEMENTO.AddChangeAction)}
+    assert {t for t, _ in removed} == {(EX.D, EX.P, Literal("x"))}
+
+
+def test_identical_content_lists_the_recorded_changes(history):
+    added, removed = history.get_ontology_state_diff("O", "s1", "s2")
+    assert added == [((EX.A, RDF.type, OWL.Class), MEMENTO.AddChangeAction)]
+    assert removed == []
+
+
+def test_rebuilt_index_gives_the_same_diffs(history):
+    built = diffs(history)
+    assert history.change_index
+    history.change_index.clear()
+    assert diffs(history) == built
+
+
+def test_diffs_without_numpy(history, monkeypatch):
+    built = diffs(history)
+    history.change_index.clear()
+    history.content_index.clear()
+    monkeypatch.setattr(memento, "np", None)
+    assert diffs(history) == built
@@ -0,0 +1,110 @@
+import io
+
+import pytest
+from rdflib import Graph, Literal, Namespace, URIRef
+from rdflib.namespace import OWL, RDF, RDFS
+
+from memento import DYNDIFF, RetentionPolicy
+
+EX = Namespace("http://example.org/log#")
+
+
+def base_graph():
+    g = Graph()
+    g.add((URIRef("http://example.org/log"), RDF.type, OWL.Ontology))
+    for c in (EX.A, EX.B):
+        g.add((c, RDF.type, OWL.Class))
+        g.add((c, RDFS.label, Literal(str(c)[-1])))
+    g.add((EX.B, EX.P, Literal("x")))
+    return g
+
+
+@pytest.fixture
+def primary(make_memento, tmp_path):
+    m = make_memento(change_log=True)
+    m.create_ontology("O", base_graph(), "s0", "alice")
+    m.save_checkpoint(str(tmp_path / "s0.ckpt"))
+    return m
+
+
+def replicate(make_memento, primary, tmp_path):
+    out = io.StringIO()
+    exported = primary.export_change_log("O", "s0", out)
+    replica = make_memento(change_log=True)
+    replica.load_checkpoint(str(tmp_path / "s0.ckpt"))
+    replica.import_change_log(io.StringIO(out.getvalue()))
+    return exported, replica
+
+
+def test_replica_matches_primary(make_memento, primary, tmp_path):
+    primary.create_ontology_state("O", [
+        ((EX.C, RDF.type, OWL.Class), DYNDIFF.addC),
+        ((EX.C, RDFS.subClassOf, EX.A), DYNDIFF.addI),
+        ((EX.C, RDFS.label, Literal("C")), DYNDIFF.addI),
+    ], previous_state="s0", state_name="s1", author="alice")
+    primary.create_ontology_state("O", [
+        ((EX.B, RDF.type, OWL.Class), DYNDIFF.delC),
+        ((EX.A, RDFS.label, Literal("A2")), DYNDIFF.delC),
+    ], previous_state="s1", state_name="s2", author="bob")
+
+    _, replica = replicate(make_memento, primary, tmp_path)
+    for state in ("s1", "s2"):
+        assert replica._content_set("O", state) == primary._content_set("O", state)
+    assert sorted(replica.change_counts("O").items()) == sorted(primary.change_counts("O").items())
+
+
+def test_states_follow_their_previous_state(make_memento, primary, tmp_path):
+    # the child's time sorts first (a clock stepped back, or a tie
+    # within one second)
+    primary.create_ontology_state("O", [((EX.D, RDF.type, OWL.Class), DYNDIFF.addC)],
+                                  previous_state="s0", state_name="s1", author="alice",
+                                  timestamp="2099-01-01T00:00:02Z")
+    primary.create_ontology_state("O", [((EX.E, RDF.type, OWL.Class), DYNDIFF.addC)],
+                                  previous_state="s1", state_name="s2", author="alice",
+                                  timestamp="2099-01-01T00:00:01Z")
+
+    exported, replica = replicate(make_memento, primary, tmp_path)
+    assert exported == ["s1", "s2"]
+    assert replica._content_set("O", "s2") == primary._content_set("O", "s2")
+
+
+def test_changes_are_replayed_as_applied(make_memento, primary, tmp_path):
+    # label changes of every type, and a no-op that drop_noops discards
+    primary.create_ontology_state("O", [
+        ((EX.A, RDFS.label, Literal("A")), DYNDIFF.delI),
+        ((EX.A, RDFS.comment, Literal("first")), DYNDIFF.addP),
+        ((EX.B, RDFS.label, Literal("B2")), DYNDIFF.addC),
+        ((EX.B, EX.P, Literal("x")), DYNDIFF.addI),
+    ], previous_state="s0", state_name="s1", author="alice", drop_noops=True)
+
+    _, replica = replicate(make_memento, primary, tmp_path)
+    logged = primary._logged_changes("O", "s1")
+    assert ((EX.B, EX.P, Literal("x")), DYNDIFF.addI) not in logged
+    assert logged[0] == ((EX.A, RDFS.label, Literal("A")), DYNDIFF.delI)
+    assert replica._logged_changes("O", "s1") == logged
+    assert replica._content_set("O", "s1") == primary._content_set("O", "s1")
+    assert sorted(replica.change_counts("O").items()) == sorted(primary.change_counts("O").items())
+
+
+def test_unlogged_states_are_not_exported(make_memento, primary):
+    m = make_memento()
+    m.create_ontology("O", base_graph(), "s0", "alice")
+    m.create_ontology_state("O", [((EX.C, RDF.type, OWL.Class), DYNDIFF.addC)],
+                            previous_state="s0", state_name="s1", author="alice")
+    with pytest.raises(ValueError, match="change log"):
+        m.export_change_log("O", "s0", io.StringIO())
+
+
+def test_compaction_drops_the_log_of_relinked_states(primary):
+    for k in (1, 2, 3):
+        primary.create_ontology_state("O", [((EX[f"N{k}"], RDF.type, OWL.Class), DYNDIFF.addC)],
+                                      state_name=f"s{k}", author="alice", version=f"1.0.{k}-a",
+                                      timestamp=f"2099-01-01T00:00:0{k}Z")
+    primary.compact("O", RetentionPolicy(keep=("s0", "s1", "s3"), keep_last=0, keep_releases=False))
+
+    assert primary._logged_changes("O", "s1") is not None
+    assert primary._logged_changes("O", "s2") is None
+    assert primary._logged_changes("O", "s3") is None
+    with pytest.raises(ValueError, match="change log"):
+        primary.export_change_log("O", "s0", io.StringIO())
+
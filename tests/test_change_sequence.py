@@ -0,0 +1,68 @@
+import itertools
+from collections import Counter
+
+import pytest
+from rdflib import BNode
+from rdflib.namespace import OWL, RDF
+
+import memento
+from memento_synth import SYNTH, generate_history, generate_ontology
+
+
+@pytest.fixture
+def deterministic(monkeypatch):
+    """Same timestamps and axiom IRIs for every store built after it."""
+    def reset():
+        seconds = itertools.count()
+        axioms = itertools.count()
+        monkeypatch.setattr(memento, "iso_timestamp",
+                            lambda: "2030-01-01T00:%02d:%02dZ" % divmod(next(seconds), 60))
+        monkeypatch.setattr(memento, "make_axiom_iri",
+                            lambda base, o: memento.URIRef(f"{base}/axiom/{o}/{next(axioms)}"))
+    return reset
+
+
+def shape(g):
+    """
+    The triples of `g` with each blank node replaced by its outgoing
+    ground triples: a cheaper stand-in for rdflib's isomorphic().
+    """
+    def sig(t):
+        if not isinstance(t, BNode):
+            return t
+        return tuple(sorted((p, o) for p, o in g.predicate_objects(t) if not isinstance(o, BNode)))
+    return Counter((sig(s), p, sig(o)) for s, p, o in g)
+
+
+def graphs(m, states):
+    yield m.store.get_context(m._ocg_iri("O"))
+    yield m._meta("O")
+    for state in states:
+        yield m.get_ontology_state("O", state)
+
+
+@pytest.mark.parametrize("drop_noops", [False, True])
+def test_sequence_matches_chained_states(make_memento, deterministic, drop_noops):
+    g = generate_ontology(30, n_individuals=15, seed=3)
+    history = generate_history(g, n_states=4, n_add=12, n_del=8, seed=3)
+    # a change that is a no-op in every state
+    history[2][1].append(((SYNTH.op0, RDF.type, OWL.ObjectProperty), memento.DYNDIFF.addP))
+
+    built = []
+    for batched in (False, True):
+        deterministic()
+        m = make_memento()
+        m.create_ontology("O", g, "s0", "alice")
+        if batched:
+            m.apply_change_sequence("O", history, drop_noops=drop_noops)
+        else:
+            for state_name, changes, version, author in history:
+                m.create_ontology_state("O", changes, state_name=state_name, author=author,
+                                        version=version, drop_noops=drop_noops)
+        built.append(m)
+
+    chained, batched = built
+    states = [state for state, *_ in history]
+    assert batched.get_ontology_states("O") == chained.get_ontology_states("O")
+    for a, b in zip(graphs(chained, states), graphs(batched, states)):
+        assert shape(a) == shape(b)
@@ -0,0 +1,103 @@
+import contextlib
+import gc
+import os
+import warnings
+
+import pytest
+from rdflib import Graph, Literal, Namespace, URIRef
+from rdflib.namespace import OWL, RDF, RDFS
+
+from memento import DYNDIFF
+
+EX = Namespace("http://example.org/ckpt#")
+
+
+def base_graph():
+    g = Graph()
+    g.add((URIRef("http://example.org/ckpt"), RDF.type, OWL.Ontology))
+    for c in (EX.A, EX.B):
+        g.add((c, RDF.type, OWL.Class))
+        g.add((c, RDFS.label, Literal(str(c)[-1], lang="en")))
+    g.add((EX.B, RDFS.subClassOf, EX.A))
+    return g
+
+
+def open_handles(path):
+    """Number of file descriptors of this process open on `path`."""
+    if not os.path.isdir("/proc/self/fd"):
+        pytest.skip("needs /proc")
+    n = 0
+    for fd in os.listdir("/proc/self/fd"):
+        try:
+            n += os.readlink(os.path.join("/proc/self/fd", fd)) == str(path)
+        except OSError:
+            pass
+    return n
+
+
+@contextlib.contextmanager
+def closes_its_files():
+    """Fails if a file opened inside the block is left to the GC."""
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", ResourceWarning)
+        yield
+        gc.collect()
+    assert not [w for w in caught if issubclass(w.category, ResourceWarning)]
+
+
+@pytest.fixture
+def checkpoint(make_memento, tmp_path):
+    m = make_memento()
+    m.create_ontology("O", base_graph(), "s0", "alice")
+    m.create_ontology_state("O", [
+        ((EX.C, RDF.type, OWL.Class), DYNDIFF.addC),
+        ((EX.C, RDFS.subClassOf, EX.B), DYNDIFF.addI),
+    ], previous_state="s0", state_name="s1", author="alice")
+    path = tmp_path / "O.ckpt"
+    m.save_checkpoint(str(path))
+    return m, path
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_round_trip(make_memento, checkpoint, lazy):
+    m, path = checkpoint
+    r = make_memento()
+    r.load_checkpoint(str(path), lazy=lazy)
+
+    assert sorted(r.get_ontology_states("O")) == ["s0", "s1"]
+    for state in ("s0", "s1"):
+        assert r._content_set("O", state) == m._content_set("O", state)
+    # the added and removed lists come from set differences: compare them as sets
+    diffs = [g.get_ontology_state_diff("O", "s0", "s1") for g in (r, m)]
+    assert [set(part) for part in diffs[0]] == [set(part) for part in diffs[1]]
+
+
+def test_eager_load_closes_the_file(make_memento, checkpoint):
+    _, path = checkpoint
+    r = make_memento()
+    with closes_its_files():
+        r.load_checkpoint(str(path), lazy=False)
+    assert open_handles(path) == 0
+
+
+def test_lazy_load_closes_the_file_once_read(make_memento, checkpoint):
+    _, path = checkpoint
+    r = make_memento()
+    with closes_its_files():
+        r.load_checkpoint(str(path))
+        assert open_handles(path)
+
+        r.get_ontology_state("O", "s0")
+        assert open_handles(path)
+        r.get_ontology_state("O", "s1")
+    assert open_handles(path) == 0
+
+
+def test_reload_closes_the_replaced_reader(make_memento, checkpoint):
+    _, path = checkpoint
+    r = make_memento()
+    r.load_checkpoint(str(path))
+    one_reader = open_handles(path)
+    with closes_its_files():
+        r.load_checkpoint(str(path))
+    assert open_handles(path) == one_reader
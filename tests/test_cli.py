@@ -0,0 +1,89 @@
+import itertools
+
+import pytest
+from rdflib import Graph, Literal, Namespace, URIRef
+from rdflib.namespace import OWL, RDF, RDFS
+
+import memento
+from memento import DYNDIFF
+from memento_cli import main, read_changes
+
+EX = Namespace("http://example.org/cli#")
+
+CHANGES = """\
+# a class and its place in the hierarchy
+addC <http://example.org/cli#C> <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://www.w3.org/2002/07/owl#Class> .
+addI <http://example.org/cli#C> <http://www.w3.org/2000/01/rdf-schema#subClassOf> <http://example.org/cli#A> .
+
+delC <http://example.org/cli#B> <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <http://www.w3.org/2002/07/owl#Class> .
+"""
+
+
+@pytest.fixture
+def cli(tmp_path, capsys, monkeypatch):
+    """Runs `memento` on a store in tmp_path; returns its stdout lines."""
+    # one second per state, so that states list in creation order
+    seconds = itertools.count()
+    monkeypatch.setattr(memento, "iso_timestamp",
+                        lambda: "2030-01-01T00:%02d:%02dZ" % divmod(next(seconds), 60))
+
+    def run(*argv, store="store.ckpt"):
+        assert main(["--store", str(tmp_path / store), *argv]) == 0
+        return capsys.readouterr().out.splitlines()
+    return run
+
+
+@pytest.fixture
+def files(tmp_path):
+    g = Graph()
+    g.add((URIRef("http://example.org/cli"), RDF.type, OWL.Ontology))
+    for c in (EX.A, EX.B):
+        g.add((c, RDF.type, OWL.Class))
+    g.add((EX.B, EX.P, Literal("x")))
+    g.serialize(tmp_path / "onto.ttl", format="turtle")
+    (tmp_path / "s1.changes").write_text(CHANGES, encoding="utf-8")
+    return tmp_path
+
+
+def test_round_trip(cli, files):
+    base = "http://example.org/memento/state/O"
+    assert cli("init", "O", str(files / "onto.ttl"), "--author", "alice") == [f"{base}/s0"]
+    assert cli("apply", "O", str(files / "s1.changes"), "--author", "bob",
+               "--version", "1.1.0") == [f"{base}/s1"]
+    assert cli("ontologies") == ["O"]
+    assert [line.split("\t")[:2] for line in cli("states", "O")] == [["s0", "1.0.0"],
+                                                                    ["s1", "1.1.0"]]
+
+    out = cli("diff", "O", "s0", "s1")
+    assert out[0] == "# s0 -> s1: +2 -1"
+    # delC strips the unprotected triples of B
+    assert set(read_changes(out)) == {
+        ((EX.C, RDF.type, OWL.Class), DYNDIFF.addC),
+        ((EX.C, RDFS.subClassOf, EX.A), DYNDIFF.addI),
+        ((EX.B, EX.P, Literal("x")), DYNDIFF.delI),
+    }
+
+    cli("export", "O", "s1", "-o", str(files / "s1.ttl"))
+    exported = Graph().parse(files / "s1.ttl", format="turtle")
+    assert (EX.C, RDFS.subClassOf, EX.A) in exported
+    assert (EX.B, EX.P, Literal("x")) not in exported
+
+    # replicate s1 through the change log onto a copy of s0
+    cli("init", "O", str(files / "onto.ttl"), "--author", "alice", store="replica.ckpt")
+    cli("log", "O", "--since", "s0", "-o", str(files / "s1.log"))
+    assert cli("replay", str(files / "s1.log"), store="replica.ckpt") == [f"{base}/s1"]
+    replayed = cli("diff", "O", "s0", "s1", store="replica.ckpt")
+    assert replayed[0] == out[0]
+    assert set(read_changes(replayed)) == set(read_changes(out))
+
+
+def test_revert(cli, files):
+    cli("init", "O", str(files / "onto.ttl"), "--author", "alice")
+    cli("apply", "O", str(files / "s1.changes"), "--author", "bob", "--batch")
+    assert cli("revert", "O", "s0", "s2", "--author", "carol") == [
+        "http://example.org/memento/state/O/s2"
+    ]
+    assert [line.split("\t")[0] for line in cli("states", "O")] == ["s0", "s1", "s2"]
+
+    reverted = Graph().parse(data="\n".join(cli("export", "O", "s2")), format="turtle")
+    assert (EX.B, EX.P, Literal("x")) in reverted
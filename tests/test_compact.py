@@ -0,0 +1,41 @@
+import pytest
+from rdflib import Graph, Literal, Namespace, URIRef
+from rdflib.namespace import OWL, RDF, RDFS
+
+from memento import DYNDIFF, RetentionPolicy
+
+EX = Namespace("http://example.org/compact#")
+
+
+def base_graph():
+    g = Graph()
+    g.add((URIRef("http://example.org/compact"), RDF.type, OWL.Ontology))
+    for i in range(5):
+        g.add((EX[f"C{i}"], RDF.type, OWL.Class))
+        g.add((EX[f"C{i}"], RDFS.label, Literal(f"class {i}")))
+        if i:
+            g.add((EX[f"C{i}"], RDFS.subClassOf, EX[f"C{i - 1}"]))
+    return g
+
+
+@pytest.mark.parametrize("wal", [False, True])
+def test_compact_reclaims_axiom_rows(make_memento, tmp_path, wal):
+    kwargs = {"wal_path": str(tmp_path / "wal.log")} if wal else {}
+    m = make_memento(compact_axioms=True, **kwargs)
+    m.create_ontology("O", base_graph(), "s0", "alice", version="1.0.0-a")
+    # sibling branches: the axioms of s1 and s2 are in no other state
+    for k in range(1, 4):
+        m.create_ontology_state("O", [
+            ((EX[f"N{k}"], RDF.type, OWL.Class), DYNDIFF.addC),
+            ((EX[f"N{k}"], RDFS.subClassOf, EX.C0), DYNDIFF.addI),
+        ], previous_state="s0", state_name=f"s{k}", author="alice",
+            version=f"1.0.{k}-a", timestamp=f"2099-01-01T00:00:0{k}Z")
+
+    table = m.store.store
+    rows_before = len(table.axioms)
+    expected = m._content_set("O", "s3")
+
+    report = m.compact("O", RetentionPolicy(keep_last=1, keep_releases=False))
+    assert sorted(report["states_removed"]) == ["s0", "s1", "s2"]
+    assert len(table.axioms) < rows_before
+    assert m._content_set("O", "s3") == expected
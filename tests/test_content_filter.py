@@ -0,0 +1,78 @@
+import pytest
+from rdflib.namespace import OWL, RDF
+
+import memento
+from memento import DYNDIFF, ContentFilter, MementoSM
+from memento_synth import generate_history, generate_ontology
+
+BACKENDS = [
+    False,
+    pytest.param(True, marks=pytest.mark.skipif(memento.np is None, reason="NumPy not installed")),
+]
+
+
+@pytest.fixture(scope="module")
+def states():
+    """Two state graphs with provenance, reifications and disjoint groups."""
+    import contextlib
+    import io
+    with contextlib.redirect_stdout(io.StringIO()):
+        m = MementoSM()
+    g = generate_ontology(n_classes=80, n_individuals=30, seed=3)
+    m.create_ontology("O", g, "s0", "alice", expand_disjoint=False)
+    for name, changes, version, author in generate_history(g, 1, n_add=30, n_del=10, seed=3):
+        m.create_ontology_state("O", changes, state_name=name, author=author, version=version)
+    return m, m.get_ontology_state("O", "s0"), m.get_ontology_state("O", "s1")
+
+
+def expected(g):
+    return {t for t in g if MementoSM.is_content_triple(*t)}
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_select_matches_is_content_triple(states, use_numpy):
+    _, g0, g1 = states
+    f = ContentFilter(use_numpy=use_numpy)
+    for g in (g0, g1):
+        assert set(f.decode(f.select(g))) == expected(g)
+
+
+@pytest.mark.parametrize("use_numpy", BACKENDS)
+def test_difference_and_union(states, use_numpy):
+    _, g0, g1 = states
+    f = ContentFilter(use_numpy=use_numpy)
+    a, b = f.select(g0), f.select(g1)
+    e0, e1 = expected(g0), expected(g1)
+
+    assert set(f.decode(f.difference(a, b))) == e0 - e1
+    assert set(f.decode(f.difference(b, a))) == e1 - e0
+    assert set(f.decode(f.union(a, b))) == e0 | e1
+
+
+def test_system_triples_are_dropped(states):
+    m, g0, _ = states
+    content = m._pure_content(g0)
+    assert content
+    assert not any(p == OWL.annotatedSource for (_, p, _) in content)
+    assert not any(p == RDF.type and o == OWL.Axiom for (_, p, o) in content)
+    assert not any(str(s).startswith(str(DYNDIFF)) for (s, _, _) in content
+                   if (s, RDF.type, OWL.Axiom) in g0)
+
+
+def test_pure_content_keeps_no_state(states):
+    m, g0, g1 = states
+    m._pure_content(g0)
+    removed, added = m._content_delta(g0, g1)
+    assert removed == m._pure_content(g0) - m._pure_content(g1)
+    assert added == m._pure_content(g1) - m._pure_content(g0)
+    assert not hasattr(m, "content_filter")
+
+
+def test_compact_axiom_store_keeps_its_table(make_memento):
+    # the filter's term flags must not shadow the store's module names
+    m = make_memento(compact_axioms=True)
+    g = generate_ontology(n_classes=20, n_individuals=5, seed=4)
+    m.create_ontology("O", g, "s0", "alice")
+    assert len(m.store.store.axioms)
+    state = m.get_ontology_state("O", "s0")
+    assert len(set(state.subjects(RDF.type, OWL.Axiom))) == len(m.store.store.axioms)
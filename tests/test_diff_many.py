@@ -0,0 +1,75 @@
+import multiprocessing
+import threading
+
+import pytest
+from rdflib import Graph, Namespace, URIRef
+from rdflib.namespace import OWL, RDF, RDFS
+
+import memento
+from memento import DYNDIFF
+
+EX = Namespace("http://example.org/many#")
+
+fork = pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(),
+                          reason="needs the fork start method")
+
+
+@pytest.fixture
+def history(make_memento):
+    g = Graph()
+    g.add((URIRef("http://example.org/many"), RDF.type, OWL.Ontology))
+    g.add((EX.C0, RDF.type, OWL.Class))
+    m = make_memento()
+    m.create_ontology("O", g, "s0", "alice")
+    for k in range(1, 6):
+        m.create_ontology_state("O", [
+            ((EX[f"C{k}"], RDF.type, OWL.Class), DYNDIFF.addC),
+            ((EX[f"C{k}"], RDFS.subClassOf, EX[f"C{k - 1}"]), DYNDIFF.addI),
+            ((EX[f"C{k - 1}"], RDF.type, OWL.Class), DYNDIFF.delC),
+        ], previous_state=f"s{k - 1}", state_name=f"s{k}", author="alice",
+            timestamp=f"2030-01-01T00:00:0{k}Z")
+    return m
+
+
+def as_sets(results):
+    return [(s1, s2, set(added), set(removed)) for s1, s2, added, removed in results]
+
+
+def expected(m, pairs):
+    return as_sets((s1, s2, *m.get_ontology_state_diff("O", s1, s2)) for s1, s2 in pairs)
+
+
+PAIRS = [("s0", "s5"), ("s1", "s2"), ("s5", "s0"), ("s3", "s3"), ("s1", "s2")]
+
+
+def test_serial_diffs_match_single_diffs(history):
+    consecutive = [(f"s{k - 1}", f"s{k}") for k in range(1, 6)]
+    assert as_sets(history.diff_many("O", processes=1)) == expected(history, consecutive)
+    assert as_sets(history.diff_many("O", PAIRS, processes=1)) == expected(history, PAIRS)
+
+
+@fork
+def test_pooled_diffs_match_single_diffs(history):
+    if threading.active_count() > 1:
+        pytest.skip("other threads are running")
+    results = history.diff_many("O", PAIRS, processes=2)
+    first = next(results)
+    # the workers' state stays in place until the pool is closed
+    assert memento._DIFF_SHARED["memento"] is history
+    assert as_sets([first, *results]) == expected(history, PAIRS)
+    assert memento._DIFF_SHARED == {}
+
+
+def test_no_pool_while_other_threads_run(history, monkeypatch):
+    def no_fork(*args):
+        raise AssertionError("forked with other threads running")
+    monkeypatch.setattr(memento.multiprocessing, "get_context", no_fork)
+
+    done = threading.Event()
+    thread = threading.Thread(target=done.wait)
+    thread.start()
+    try:
+        assert as_sets(history.diff_many("O", PAIRS, processes=2)) == expected(history, PAIRS)
+    finally:
+        done.set()
+        thread.join()
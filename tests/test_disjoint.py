@@ -0,0 +1,59 @@
+from rdflib import BNode, Graph, Namespace, URIRef
+from rdflib.collection import Collection
+from rdflib.namespace import OWL, RDF
+
+from memento import DYNDIFF
+
+EX = Namespace("http://example.org/disjoint#")
+MEMBERS = [EX.A, EX.B, EX.C, EX.D]
+
+
+def base_graph(groups=1):
+    g = Graph()
+    g.add((URIRef("http://example.org/disjoint"), RDF.type, OWL.Ontology))
+    for c in MEMBERS + [EX.E]:
+        g.add((c, RDF.type, OWL.Class))
+    for k in range(groups):
+        adc, head = BNode(), BNode()
+        g.add((adc, RDF.type, OWL.AllDisjointClasses))
+        g.add((adc, OWL.members, head))
+        Collection(g, head, MEMBERS[k:] + MEMBERS[:k])
+    return g
+
+
+def test_group_iris_follow_their_members(make_memento):
+    iris = []
+    for _ in range(2):
+        m = make_memento()
+        m.create_ontology("O", base_graph(), "s0", "alice", expand_disjoint=False)
+        iris.append(set(m.disjoint_groups("O", "s0")))
+    assert iris[0] == iris[1]
+    (group,) = iris[0]
+    assert str(group).startswith(f"{m.base}/disjoint/O/")
+
+
+def test_repeated_group_is_kept_once(make_memento):
+    m = make_memento()
+    m.create_ontology("O", base_graph(groups=2), "s0", "alice", expand_disjoint=False)
+    groups = m.disjoint_groups("O", "s0")
+    assert list(groups.values()) == [MEMBERS]
+    assert len(list(m.disjoint_pairs("O", "s0"))) == 6
+
+
+def test_groups_and_member_edits_are_content(make_memento):
+    m = make_memento()
+    m.create_ontology("O", base_graph(), "s0", "alice", expand_disjoint=False)
+    (group,) = m.disjoint_groups("O", "s0")
+    content = m._content_set("O", "s0")
+    assert (group, RDF.type, OWL.AllDisjointClasses) in content
+    assert {(group, OWL.members, c) for c in MEMBERS} <= content
+
+    m.create_ontology_state("O", [
+        ((group, OWL.members, EX.E), DYNDIFF.addI),
+        ((group, OWL.members, EX.A), DYNDIFF.delI),
+    ], previous_state="s0", state_name="s1", author="alice")
+
+    assert m.disjoint_groups("O", "s1") == {group: [EX.B, EX.C, EX.D, EX.E]}
+    added, removed = m.get_ontology_state_diff("O", "s0", "s1")
+    assert {t for t, _ in added} == {(group, OWL.members, EX.E)}
+    assert {t for t, _ in removed} == {(group, OWL.members, EX.A)}
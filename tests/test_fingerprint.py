@@ -0,0 +1,95 @@
+from rdflib import Graph, Literal, Namespace, URIRef
+from rdflib.namespace import OWL, RDF, RDFS
+
+from memento import DYNDIFF, StateFingerprint, build_state_fingerprint, subject_hash
+
+EX = Namespace("http://example.org/fp#")
+
+
+def base_graph():
+    g = Graph()
+    g.add((URIRef("http://example.org/fp"), RDF.type, OWL.Ontology))
+    for i in range(20):
+        c = EX[f"C{i}"]
+        g.add((c, RDF.type, OWL.Class))
+        g.add((c, RDFS.label, Literal(f"class {i}")))
+    return g
+
+
+def test_copy_leaves_the_original_alone():
+    fp = StateFingerprint(8)
+    fp.set(EX.A, 1)
+    fp.set(EX.B, 2)
+    root = fp.root
+
+    copy = fp.copy()
+    copy.set(EX.A, 5)
+    copy.set(EX.C, 3)
+    assert fp.root == root
+    assert copy.root != root
+
+    # writing to the original after the copy does not reach the copy
+    copy_root = copy.root
+    fp.set(EX.B, 7)
+    assert copy.root == copy_root
+    assert copy.diff_subjects(fp) == {EX.A, EX.B, EX.C}
+
+
+def test_diff_buckets_and_subjects():
+    a = StateFingerprint(16)
+    for i in range(40):
+        a.set(EX[f"S{i}"], i + 1)
+    b = a.copy()
+    assert a.diff_buckets(b) == []
+    assert a.diff_subjects(b) == set()
+
+    b.set(EX.S3, 100)
+    b.set(EX.S7, 0)
+    assert sorted(a.diff_buckets(b)) == sorted({a.bucket_of(EX.S3), a.bucket_of(EX.S7)})
+    assert a.diff_subjects(b) == {EX.S3, EX.S7}
+    assert b.diff_subjects(a) == {EX.S3, EX.S7}
+
+    b.set(EX.S3, 4)
+    b.set(EX.S7, 8)
+    assert a.root == b.root
+
+
+def test_incremental_fingerprint_matches_a_rebuilt_one():
+    content = {(EX.A, RDF.type, OWL.Class), (EX.A, RDFS.label, Literal("a")), (EX.B, RDF.type, OWL.Class)}
+    fp = build_state_fingerprint(content, n_buckets=8)
+    step = StateFingerprint(8)
+    step.set(EX.A, subject_hash([t for t in content if t[0] == EX.A]))
+    step.set(EX.B, subject_hash([t for t in content if t[0] == EX.B]))
+    assert fp.root == step.root
+
+
+def test_state_diff_by_fingerprint(make_memento):
+    changes = [
+        ((EX.C20, RDF.type, OWL.Class), DYNDIFF.addC),
+        ((EX.C3, RDFS.comment, Literal("third")), DYNDIFF.addI),
+        ((EX.C5, RDF.type, OWL.Class), DYNDIFF.delC),
+    ]
+    diffs = []
+    for fingerprints in (True, False):
+        m = make_memento(fingerprints=fingerprints)
+        m.create_ontology("O", base_graph(), "s0", "alice")
+        m.create_ontology_state("O", list(changes), previous_state="s0", state_name="s1", author="alice")
+        m.create_ontology_state("O", [
+            ((EX.C21, RDF.type, OWL.Class), DYNDIFF.addC),
+        ], previous_state="s1", state_name="s2", author="alice")
+        diffs.append([
+            tuple(set(part) for part in m.get_ontology_state_diff("O", "s0", s))
+            for s in ("s1", "s2")
+        ])
+
+        if fingerprints:
+            s0 = m.state_fingerprint("O", "s0")
+            rebuilt = build_state_fingerprint(m._pure_content(m.get_ontology_state("O", "s0")))
+            assert s0.root == rebuilt.root
+            assert m.state_fingerprint("O", "s1").diff_subjects(s0) >= {EX.C20, EX.C3}
+
+    assert diffs[0] == diffs[1]
+    added, _ = diffs[0][0]
+    assert {t for t, _ in added} >= {(EX.C20, RDF.type, OWL.Class), (EX.C3, RDFS.comment, Literal("third"))}
+    added, _ = diffs[0][1]
+    assert {t for t, _ in added} >= {(EX.C20, RDF.type, OWL.Class), (EX.C21, RDF.type, OWL.Class)}
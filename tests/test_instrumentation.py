@@ -0,0 +1,94 @@
+import json
+
+import pytest
+from rdflib import Graph, Namespace, URIRef
+from rdflib.namespace import OWL, RDF, RDFS
+
+from memento import DYNDIFF, Instrumentation
+
+EX = Namespace("http://example.org/instr#")
+
+
+def base_graph():
+    g = Graph()
+    g.add((URIRef("http://example.org/instr"), RDF.type, OWL.Ontology))
+    g.add((EX.A, RDF.type, OWL.Class))
+    g.add((EX.B, RDFS.subClassOf, EX.A))
+    return g
+
+
+@pytest.fixture
+def events():
+    return []
+
+
+@pytest.fixture
+def instrumented(make_memento, events):
+    instr = Instrumentation(callback=events.append)
+    m = make_memento(instrumentation=instr)
+    m.create_ontology("O", base_graph(), "s0", "alice")
+    m.create_ontology_state("O", [((EX.C, RDF.type, OWL.Class), DYNDIFF.addC)],
+                            previous_state="s0", state_name="s1", author="alice")
+    m.get_ontology_state_diff("O", "s0", "s1")
+    m.revert_ontology("O", "s0", "s2", "alice")
+    return m, instr
+
+
+def operations(events):
+    return [e["operation"] for e in events if e["event"] == "operation"]
+
+
+def test_operations_and_phases_are_reported(instrumented, events):
+    m, instr = instrumented
+    ops = operations(events)
+    for op in ("create_ontology", "create_ontology_state", "get_ontology_state_diff",
+               "revert_ontology"):
+        assert op in ops
+        assert instr.operations[op][0] == ops.count(op)
+
+    phases = {e["phase"] for e in events
+              if e["event"] == "phase" and e["operation"] == "create_ontology"}
+    assert {"load", "copy", "reify", "metadata", "persist"} <= phases
+
+    # each phase event precedes the event of its operation
+    first_op = next(i for i, e in enumerate(events) if e["event"] == "operation")
+    assert all(e["operation"] == "create_ontology" for e in events[:first_op])
+    assert all(e["seconds"] >= 0 for e in events)
+
+
+def test_counters(instrumented):
+    _, instr = instrumented
+    assert instr.counters[("create_ontology", "triples_copied")] == len(base_graph())
+    assert instr.counters[("create_ontology", "axioms_created")] > 0
+    assert instr.counters[("create_ontology_state", "axioms_created")] > 0
+
+
+def test_exports(instrumented):
+    _, instr = instrumented
+    data = json.loads(instr.to_json())
+    assert data["operations"]["create_ontology"]["calls"] == 1
+    assert "create_ontology.reify" in data["phases"]
+    assert data["counters"]["create_ontology.triples_copied"] == len(base_graph())
+
+    text = instr.to_prometheus(prefix="m")
+    assert 'm_operations_total{operation="create_ontology"} 1' in text.splitlines()
+    assert '# TYPE m_phase_seconds_total counter' in text
+    assert "peak_memory" not in text
+
+    instr.reset()
+    assert instr.to_dict() == {"operations": {}, "phases": {}, "counters": {}, "peak_memory": {}}
+
+
+def test_peak_memory_is_sampled_on_request(make_memento, events):
+    instr = Instrumentation(callback=events.append, trace_memory=True)
+    m = make_memento(instrumentation=instr)
+    m.create_ontology("O", base_graph(), "s0", "alice")
+    assert instr.peak_memory["create_ontology"] > 0
+    assert events[-1]["peak_memory"] > 0
+    assert "m_peak_memory_bytes" in instr.to_prometheus(prefix="m")
+
+
+def test_off_by_default(make_memento):
+    m = make_memento()
+    assert m.instrumentation is None
+    m.create_ontology("O", base_graph(), "s0", "alice")
@@ -0,0 +1,42 @@
+from rdflib import Graph, Literal, Namespace, URIRef
+from rdflib.namespace import OWL, RDF, RDFS
+
+from memento import DYNDIFF, build_label_index
+
+EX = Namespace("http://example.org/labels#")
+
+
+def base_graph():
+    g = Graph()
+    g.add((URIRef("http://example.org/labels"), RDF.type, OWL.Ontology))
+    for i, name in enumerate(("heart failure", "heart rate", "zebra fish")):
+        c = EX[f"C{i}"]
+        g.add((c, RDF.type, OWL.Class))
+        g.add((c, RDFS.label, Literal(name, lang="en")))
+    return g
+
+
+def test_new_states_share_unchanged_buckets(make_memento):
+    m = make_memento(label_index=True)
+    m.create_ontology("O", base_graph(), "s0", "alice")
+    m.create_ontology_state("O", [
+        ((EX.C3, RDF.type, OWL.Class), DYNDIFF.addC),
+        ((EX.C3, RDFS.label, Literal("heart valve", lang="en")), DYNDIFF.addI),
+        ((EX.C0, RDFS.comment, Literal("Danio rerio", lang="la")), DYNDIFF.addI),
+    ], previous_state="s0", state_name="s1", author="alice")
+
+    s0 = m._label_index("O", "s0")
+    s1 = m._label_index("O", "s1")
+    shared = sum(a is b for a, b in zip(s0.postings, s1.postings))
+    assert shared >= s0.n_buckets - 4
+
+    # the previous state's index is left as it was
+    assert s0.search("heart", prefix=True) == {EX.C0, EX.C1}
+    assert s0.search("valve") == set()
+    assert s1.search("heart", prefix=True) == {EX.C0, EX.C1, EX.C3}
+    assert s1.search("danio", lang="la") == {EX.C0}
+
+    rebuilt = build_label_index(m.get_ontology_state("O", "s1"))
+    assert len(rebuilt) == len(s1)
+    for text in ("heart", "hea", "zebra", "valve", "danio"):
+        assert rebuilt.search(text, prefix=True) == s1.search(text, prefix=True)
@@ -0,0 +1,98 @@
+import io
+
+import pytest
+from rdflib import Graph, Literal, Namespace, URIRef
+from rdflib.namespace import OWL, RDF, RDFS
+
+from memento import DYNDIFF, MEMENTO, MergeConflict
+
+EX = Namespace("http://example.org/merge#")
+
+
+def base_graph():
+    g = Graph()
+    g.add((URIRef("http://example.org/merge"), RDF.type, OWL.Ontology))
+    for c in (EX.A, EX.B, EX.D):
+        g.add((c, RDF.type, OWL.Class))
+    g.add((EX.B, RDFS.subClassOf, EX.A))
+    g.add((EX.D, EX.P, Literal("x")))
+    return g
+
+
+@pytest.fixture
+def branched(make_memento):
+    m = make_memento()
+    m.create_ontology("O", base_graph(), "base", "alice")
+    return m
+
+
+def content(m, state):
+    return m._content_set("O", state)
+
+
+def test_right_removals_are_applied(branched):
+    m = branched
+    m.create_ontology_state("O", [((EX.C, RDF.type, OWL.Class), DYNDIFF.addC)],
+                            previous_state="base", state_name="left", author="alice")
+    # delC strips the unprotected triples of D
+    m.create_ontology_state("O", [((EX.D, RDF.type, OWL.Class), DYNDIFF.delC)],
+                            previous_state="base", state_name="right", author="bob")
+    assert (EX.D, EX.P, Literal("x")) not in content(m, "right")
+
+    m.merge_states("O", "base", "left", "right", "merged", "carol")
+
+    merged = content(m, "merged")
+    assert (EX.C, RDF.type, OWL.Class) in merged
+    assert (EX.D, EX.P, Literal("x")) not in merged
+    assert merged == content(m, "left") - (content(m, "base") - content(m, "right"))
+
+
+def replace_value(m, state, value, author):
+    m.create_ontology_state("O", [((EX.D, RDF.type, OWL.Class), DYNDIFF.delC),
+                                  ((EX.D, EX.P, Literal(value)), DYNDIFF.addI)],
+                            previous_state="base", state_name=state, author=author)
+
+
+def test_conflicting_edits(branched):
+    m = branched
+    replace_value(m, "left", "y", "alice")
+    replace_value(m, "right", "z", "bob")
+
+    with pytest.raises(MergeConflict):
+        m.merge_states("O", "base", "left", "right", "merged", "carol")
+
+    m.merge_states("O", "base", "left", "right", "merged", "carol", prefer="right")
+    merged = content(m, "merged")
+    assert (EX.D, EX.P, Literal("z")) in merged
+    assert (EX.D, EX.P, Literal("y")) not in merged
+    assert (EX.D, EX.P, Literal("x")) not in merged
+
+
+def test_merged_state_replicates(make_memento, tmp_path):
+    m = make_memento(change_log=True)
+    m.create_ontology("O", base_graph(), "base", "alice")
+    m.save_checkpoint(str(tmp_path / "base.ckpt"))
+
+    m.create_ontology_state("O", [((EX.C, RDF.type, OWL.Class), DYNDIFF.addC),
+                                  ((EX.D, EX.Q, Literal("y")), DYNDIFF.addI)],
+                            previous_state="base", state_name="left", author="alice")
+    m.create_ontology_state("O", [((EX.D, RDF.type, OWL.Class), DYNDIFF.delC),
+                                  ((EX.B, RDFS.label, Literal("B")), DYNDIFF.addI)],
+                            previous_state="base", state_name="right", author="bob")
+    m.merge_states("O", "base", "left", "right", "merged", "carol")
+    merged = content(m, "merged")
+    assert (EX.D, EX.P, Literal("x")) not in merged
+    assert {(EX.D, EX.Q, Literal("y")), (EX.B, RDFS.label, Literal("B"))} <= merged
+
+    # exact changes remove labels, which DynDiff changes never do
+    m.create_ontology_state("O", [((EX.B, RDFS.label, Literal("B")), MEMENTO.DelChangeAction)],
+                            previous_state="merged", state_name="merged2", author="carol")
+    assert (EX.B, RDFS.label, Literal("B")) not in content(m, "merged2")
+
+    out = io.StringIO()
+    m.export_change_log("O", "base", out)
+    replica = make_memento(change_log=True)
+    replica.load_checkpoint(str(tmp_path / "base.ckpt"))
+    replica.import_change_log(io.StringIO(out.getvalue()))
+    for state in ("merged", "merged2"):
+        assert content(replica, state) == content(m, state)
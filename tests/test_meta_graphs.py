@@ -0,0 +1,78 @@
+from rdflib import Graph, Namespace, URIRef
+from rdflib.namespace import OWL, PROV, RDF, RDFS
+
+from memento import DYNDIFF
+
+EX = Namespace("http://example.org/meta#")
+
+
+def base_graph():
+    g = Graph()
+    g.add((URIRef("http://example.org/meta"), RDF.type, OWL.Ontology))
+    g.add((EX.A, RDF.type, OWL.Class))
+    return g
+
+
+def build(m):
+    for name in ("O", "P"):
+        m.create_ontology(name, base_graph(), "s0", "alice", version="1.0.0")
+        m.create_ontology_state(name, [((EX.B, RDF.type, OWL.Class), DYNDIFF.addC)],
+                                previous_state="s0", state_name="s1", author="bob",
+                                version="1.1.0", timestamp="2030-01-01T00:00:01Z")
+
+
+def about(graph, m, name):
+    """Triples of `graph` about the states and versions of `name`."""
+    prefixes = (str(m._state_iri(name, "")), f"{m.base}/version/{name}/")
+    return {t for t in graph if str(t[0]).startswith(prefixes)}
+
+
+def test_metadata_is_kept_per_ontology(make_memento):
+    m = make_memento(meta_per_ontology=True)
+    build(m)
+    meta = m.store.get_context(m.meta_graph_iri)
+    for name in ("O", "P"):
+        assert (m.meta_graph_iri, RDFS.seeAlso, m._meta_iri(name)) in meta
+        assert not about(meta, m, name)
+        assert about(m._meta(name), m, name)
+    assert m.get_ontology_states("O") == ["s0", "s1"]
+    assert m.latest_version("P") == ("1.1.0", "s1")
+
+
+def test_global_metadata_is_migrated(make_memento, tmp_path):
+    path = str(tmp_path / "global.ckpt")
+    old = make_memento()
+    build(old)
+    old.save_checkpoint(path)
+    old_meta = old.store.get_context(old.meta_graph_iri)
+    moved = about(old_meta, old, "O")
+    agents = {o for (_, p, o) in moved if p == PROV.wasGeneratedBy}
+    assert moved and agents
+
+    m = make_memento(meta_per_ontology=True)
+    m.load_checkpoint(path)
+    meta = m.store.get_context(m.meta_graph_iri)
+    assert about(meta, m, "O") == moved
+
+    assert m.get_ontology_states("O") == old.get_ontology_states("O")
+    assert m.last_state_iri("O") == old.last_state_iri("O")
+    assert m.states_by_version("O") == old.states_by_version("O")
+
+    own = m._meta("O")
+    assert about(own, m, "O") == moved
+    assert not about(meta, m, "O")
+    assert (m.meta_graph_iri, RDFS.seeAlso, m._meta_iri("O")) in meta
+    # agents are shared by the ontologies: copied, not moved
+    for agent in agents:
+        assert set(own.triples((agent, None, None))) == set(meta.triples((agent, None, None)))
+        assert set(meta.triples((agent, None, None)))
+
+    # the other ontology is migrated on its own first access
+    assert about(meta, m, "P") == about(old_meta, old, "P")
+    assert m.get_ontology_states("P") == ["s0", "s1"]
+    assert not about(meta, m, "P")
+
+    # a second pass finds the registry entry and moves nothing
+    m._meta_graphs.clear()
+    assert m.get_ontology_states("O") == ["s0", "s1"]
+    assert about(m._meta("O"), m, "O") == moved
@@ -0,0 +1,57 @@
+import os
+
+import pytest
+from rdflib import Graph, Literal, Namespace
+from rdflib.compare import isomorphic
+from rdflib.namespace import OWL, RDF, RDFS
+
+from memento import ParseCache
+
+EX = Namespace("http://example.org/pc#")
+
+
+@pytest.fixture
+def ontology_file(tmp_path):
+    g = Graph()
+    g.add((EX.A, RDF.type, OWL.Class))
+    g.add((EX.A, RDFS.label, Literal("A", lang="en")))
+    g.add((EX.A, RDFS.subClassOf, EX.B))
+    path = tmp_path / "o.owl"
+    g.serialize(destination=str(path), format="xml")
+    return str(path), g
+
+
+@pytest.mark.parametrize("fmt", [None, "xml", "application/rdf+xml"])
+def test_load_matches_parse(tmp_path, ontology_file, fmt):
+    path, g = ontology_file
+    cache = ParseCache(str(tmp_path / "cache"))
+
+    first = cache.load(path, fmt)
+    second = cache.load(path, fmt)
+
+    assert isomorphic(first, g)
+    assert isomorphic(second, g)
+    assert (cache.misses, cache.hits) == (1, 1)
+
+
+def test_segments_survive_a_new_cache(tmp_path, ontology_file):
+    path, g = ontology_file
+    ParseCache(str(tmp_path / "cache")).load(path, "application/rdf+xml")
+
+    cache = ParseCache(str(tmp_path / "cache"))
+    assert isomorphic(cache.load(path, "application/rdf+xml"), g)
+    assert (cache.misses, cache.hits) == (0, 1)
+    assert all(os.sep not in name for name in os.listdir(tmp_path / "cache"))
+
+
+def test_changed_file_is_reparsed(tmp_path, ontology_file):
+    path, g = ontology_file
+    cache = ParseCache(str(tmp_path / "cache"))
+    cache.load(path)
+
+    g.add((EX.C, RDF.type, OWL.Class))
+    g.serialize(destination=path, format="xml")
+    os.utime(path, ns=(0, 0))
+
+    assert isomorphic(cache.load(path), g)
+    assert cache.misses == 2
@@ -0,0 +1,81 @@
+import pytest
+from rdflib import Graph, Literal, Namespace, URIRef
+from rdflib.namespace import OWL, PROV, RDF, RDFS
+
+from memento import DYNDIFF, MEMENTO
+
+EX = Namespace("http://example.org/prov#")
+
+CHANGES = [
+    ((EX.C, RDF.type, OWL.Class), DYNDIFF.addC),
+    ((EX.C, RDFS.subClassOf, EX.A), DYNDIFF.addI),
+    ((EX.C, RDFS.label, Literal("C")), DYNDIFF.addC),
+    ((EX.D, RDFS.subClassOf, EX.A), DYNDIFF.addI),
+]
+
+
+def base_graph():
+    g = Graph()
+    g.add((URIRef("http://example.org/prov"), RDF.type, OWL.Ontology))
+    g.add((EX.A, RDF.type, OWL.Class))
+    g.add((EX.D, RDF.type, OWL.Class))
+    return g
+
+
+def build(make_memento, **kwargs):
+    m = make_memento(**kwargs)
+    m.create_ontology("O", base_graph(), "s0", "alice")
+    m.change_counts("O")
+    m.create_ontology_state("O", CHANGES, previous_state="s0", state_name="s1", author="bob",
+                            timestamp="2030-01-01T00:00:00Z")
+    return m
+
+
+def records(m):
+    """Change records of s1 by sequence number, with their types."""
+    ocg = m.store.get_context(m._ocg_iri("O"))
+    state_iri = m._state_iri("O", "s1")
+    return {
+        int(str(ch).rsplit("-", 1)[1]): set(ocg.objects(ch, RDF.type))
+        for ch in ocg.subjects(MEMENTO.hasOntologyState, state_iri)
+        if (ch, RDF.type, MEMENTO.OntologyStateChange) in ocg
+    }
+
+
+def test_default_ocg_layout(make_memento):
+    m = build(make_memento)
+    ocg = m.store.get_context(m._ocg_iri("O"))
+    bulk = {DYNDIFF.BasicChange, PROV.Entity, MEMENTO.OntologyStateChange, MEMENTO.AddChangeAction}
+
+    # bulk changes 1 (addC) and 2 (addI); the records of C and D reuse
+    # their IRIs and add no type of their own
+    assert records(m) == {1: bulk | {DYNDIFF.addC}, 2: bulk | {DYNDIFF.addI}}
+    assert not list(ocg.triples((None, PROV.hadMember, None)))
+    assert not list(ocg.subjects(OWL.annotatedProperty, RDFS.label))
+
+
+def test_typed_changes_layout(make_memento):
+    m = build(make_memento, typed_changes=True)
+    entity = {MEMENTO.OntologyStateChange, MEMENTO.AddChangeAction}
+    found = records(m)
+    assert set(found) == {1, 2, 3, 4}
+    assert found[3] == entity | {DYNDIFF.addC}
+    assert found[4] == entity | {DYNDIFF.addI}
+
+
+@pytest.mark.parametrize("typed", [False, True])
+def test_rebuilt_provenance_index_matches(make_memento, typed):
+    m = build(make_memento, typed_changes=typed)
+    written = m.changes_by_agent("O", "bob")
+    counts = m.change_counts("O")
+
+    m.provenance_index.clear()
+    assert sorted(m.changes_by_agent("O", "bob")) == sorted(written)
+    assert m.change_counts("O") == counts
+
+    bob = URIRef(f"{m.base}/agent/bob")
+    if typed:
+        assert counts[(bob, DYNDIFF.addC)] == counts[(bob, DYNDIFF.addI)] == 1
+    else:
+        # both entity records share an IRI with a bulk change
+        assert written == []
@@ -0,0 +1,122 @@
+import io
+import os
+
+import pytest
+from rdflib import BNode, Graph, Literal, Namespace, URIRef
+from rdflib.namespace import OWL, RDF
+
+from memento import DYNDIFF, MergeConflict
+from memento_shard import ShardedMementoSM
+
+EX = Namespace("http://example.org/shard#")
+
+
+def base_graph():
+    g = Graph()
+    g.add((URIRef("http://example.org/shard"), RDF.type, OWL.Ontology))
+    g.add((EX.A, RDF.type, OWL.Class))
+    g.add((EX.A, EX.P, Literal("x")))
+    return g
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"store": object()},
+    {"virtuoso_query_endpoint": "http://127.0.0.1:1/sparql",
+     "virtuoso_update_endpoint": "http://127.0.0.1:1/update"},
+])
+def test_shared_store_is_rejected(kwargs):
+    with pytest.raises(ValueError, match="share one store"):
+        ShardedMementoSM(n_shards=2, **kwargs)
+
+
+def test_shards_get_their_own_wal(tmp_path):
+    wal = tmp_path / "wal.log"
+    with ShardedMementoSM(n_shards=2, wal_path=str(wal)) as m:
+        names = [f"O{i}" for i in range(6)]
+        m.batch([("create_ontology", (n, base_graph(), "s0", "alice"), {}) for n in names])
+        assert m.get_ontologies() == names
+    assert sorted(os.listdir(tmp_path)) == ["wal.log.0", "wal.log.1"]
+
+
+def test_broadcast_collects_every_reply():
+    with ShardedMementoSM(n_shards=3) as m:
+        with pytest.raises(AttributeError):
+            m._broadcast("no_such_method")
+        assert m._pending == {} and m._sent_to == {}
+        assert m.get_ontologies() == []
+
+
+def test_merge_on_a_shard():
+    with ShardedMementoSM(n_shards=2) as m:
+        m.create_ontology("O", base_graph(), "base", "alice")
+        for state, value in (("left", "y"), ("right", "z")):
+            m.create_ontology_state("O", [((EX.A, EX.P, Literal(value)), DYNDIFF.addI),
+                                          ((EX[state], RDF.type, OWL.Class), DYNDIFF.addC)],
+                                    previous_state="base", state_name=state, author="bob")
+
+        assert m.merge_conflicts("O", "base", "left", "right") == []
+        m.merge_states("O", "base", "left", "right", "merged", "carol")
+        merged = set(m.get_ontology_state("O", "merged"))
+        assert {(EX.left, RDF.type, OWL.Class), (EX.right, RDF.type, OWL.Class),
+                (EX.A, EX.P, Literal("y")), (EX.A, EX.P, Literal("z"))} <= merged
+
+
+def test_merge_conflict_crosses_the_shard():
+    with ShardedMementoSM(n_shards=2) as m:
+        m.create_ontology("O", base_graph(), "base", "alice")
+        for state in ("left", "right"):
+            m.create_ontology_state("O", [((EX.A, RDF.type, OWL.Class), DYNDIFF.delC),
+                                          ((EX.A, EX.P, Literal(state)), DYNDIFF.addI)],
+                                    previous_state="base", state_name=state, author="bob")
+        conflicts = m.merge_conflicts("O", "base", "left", "right")
+        with pytest.raises(MergeConflict) as info:
+            m.merge_states("O", "base", "left", "right", "merged", "carol")
+        assert info.value.conflicts == conflicts != []
+
+
+def history(m, names):
+    m.batch([("create_ontology", (n, base_graph(), "s0", "alice"), {}) for n in names])
+    m.batch([("create_ontology_state",
+              (n, [((EX[n], RDF.type, OWL.Class), DYNDIFF.addC)]),
+              {"previous_state": "s0", "state_name": "s1", "author": "bob"}) for n in names])
+
+
+def test_checkpoint_per_shard(tmp_path):
+    path = str(tmp_path / "ckpt")
+    names = [f"O{i}" for i in range(4)]
+    with ShardedMementoSM(n_shards=2) as m:
+        history(m, names)
+        expected = {n: set(m.get_ontology_state(n, "s1")) for n in names}
+        assert m.save_checkpoint(path) > 0
+
+    with ShardedMementoSM(n_shards=3) as r:
+        with pytest.raises(ValueError, match="3 shards"):
+            r.load_checkpoint(path)
+    with ShardedMementoSM(n_shards=2) as r:
+        r.load_checkpoint(path, lazy=False)
+        assert r.get_ontologies() == names
+        assert {n: set(r.get_ontology_state(n, "s1")) for n in names} == expected
+
+
+def ground(g):
+    return {t for t in g if not any(isinstance(x, BNode) for x in t)}
+
+
+def test_change_log_between_shards(tmp_path):
+    path = str(tmp_path / "ckpt")
+    with ShardedMementoSM(n_shards=2, change_log=True) as m, \
+            ShardedMementoSM(n_shards=2, change_log=True) as r:
+        m.create_ontology("O", base_graph(), "s0", "alice")
+        m.save_checkpoint(path)
+        m.create_ontology_state("O", [((EX.B, RDF.type, OWL.Class), DYNDIFF.addC)],
+                                previous_state="s0", state_name="s1", author="bob")
+
+        out = io.StringIO()
+        assert m.export_change_log("O", "s0", out) == ["s1"]
+        r.load_checkpoint(path)
+        assert len(r.import_change_log(io.StringIO(out.getvalue()))) == 1
+        assert ground(r.get_ontology_state("O", "s1")) == ground(m.get_ontology_state("O", "s1"))
+        assert (EX.B, RDF.type, OWL.Class) in ground(r.get_ontology_state("O", "s1"))
+
+        with pytest.raises(ValueError, match="header"):
+            r.import_change_log(["", '["S", "s2"]'])
@@ -0,0 +1,34 @@
+from rdflib import Graph
+
+from memento import DYNDIFF, expand_all_disjoint_classes
+from memento_synth import generate_changes, generate_ontology
+
+
+def test_label_and_superclass_removals_are_instance_changes():
+    work = generate_ontology(40, n_individuals=20, seed=1)
+    changes = generate_changes(work, 20, 20, seed=1)
+    removed = [(t, ch) for t, ch in changes if ch in (DYNDIFF.delC, DYNDIFF.delI, DYNDIFF.delP)]
+    assert removed
+    for (s, p, o), ch in removed:
+        assert (ch == DYNDIFF.delC) == (str(o).endswith("#Class"))
+
+
+def test_working_graph_tracks_the_store(make_memento):
+    g = generate_ontology(40, n_individuals=20, seed=2)
+    work = Graph()
+    for t in g:
+        work.add(t)
+    for t in expand_all_disjoint_classes(work):
+        work.add(t)
+
+    m = make_memento()
+    m.create_ontology("O", g, "s0", "alice")
+    s0, w0 = m._content_set("O", "s0"), m._pure_content(work)
+
+    for k in (1, 2):
+        changes = generate_changes(work, 20, 15, seed=k)
+        m.create_ontology_state("O", changes, previous_state=f"s{k - 1}",
+                                state_name=f"s{k}", author="alice")
+        st, wk = m._content_set("O", f"s{k}"), m._pure_content(work)
+        assert st - s0 == wk - w0
+        assert s0 - st == w0 - wk
@@ -0,0 +1,72 @@
+from rdflib import Graph, Literal, Namespace, URIRef
+from rdflib.namespace import OWL, RDF, RDFS
+
+from memento import DYNDIFF
+
+EX = Namespace("http://example.org/tier#")
+
+
+def base_graph(n=40):
+    g = Graph()
+    g.add((URIRef("http://example.org/tier"), RDF.type, OWL.Ontology))
+    for i in range(n):
+        g.add((EX[f"C{i}"], RDF.type, OWL.Class))
+        g.add((EX[f"C{i}"], RDFS.label, Literal(f"class {i}")))
+    return g
+
+
+def build(m, n_states):
+    m.create_ontology("O", base_graph(), "s0", "alice")
+    for k in range(1, n_states + 1):
+        m.create_ontology_state("O", [((EX[f"N{k}"], RDF.type, OWL.Class), DYNDIFF.addC)],
+                                previous_state=f"s{k - 1}", state_name=f"s{k}", author="alice")
+
+
+def resident_triples(m, tier):
+    return sum(len(Graph(store=m.store.store, identifier=iri)) for iri in tier.resident)
+
+
+def test_running_total_matches_the_resident_graphs(make_memento, tmp_path):
+    m = make_memento(max_resident_triples=500, spill_dir=str(tmp_path))
+    build(m, 6)
+    tier = m.store.tier
+    assert tier.spilled
+    assert tier.total == resident_triples(m, tier)
+    assert tier.total <= 500 or len(tier.resident) <= tier.pinned
+
+    # rehydrating the oldest state spills others and keeps the count
+    g = m.get_ontology_state("O", "s0")
+    assert len(g) and tier.rehydrated
+    assert tier.total == resident_triples(m, tier)
+
+
+def test_spilled_states_read_back_unchanged(make_memento, tmp_path):
+    plain = make_memento()
+    build(plain, 4)
+    tiered = make_memento(max_resident_triples=300, spill_dir=str(tmp_path))
+    build(tiered, 4)
+
+    assert tiered.store.tier.spilled
+    for k in range(5):
+        assert tiered._content_set("O", f"s{k}") == plain._content_set("O", f"s{k}")
+
+
+def test_context_access_does_not_scan_the_store(make_memento, tmp_path, monkeypatch):
+    m = make_memento(max_resident_triples=10 ** 6, spill_dir=str(tmp_path))
+    build(m, 3)
+
+    def no_scan(*args, **kwargs):
+        raise AssertionError("context_iris() called")
+
+    monkeypatch.setattr(type(m.store), "context_iris", no_scan)
+    m.get_ontology_state("O", "s1")
+    m.get_ontology_state("O", "s2")
+
+
+def test_states_written_by_a_transaction_are_counted(make_memento, tmp_path):
+    m = make_memento(max_resident_triples=10 ** 6, spill_dir=str(tmp_path),
+                     wal_path=str(tmp_path / "wal.log"))
+    build(m, 2)
+    tier = m.store.tier
+    assert m._state_graph_iri("O", "s2") in tier.resident
+    assert tier.total == resident_triples(m, tier)
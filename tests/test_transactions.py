@@ -0,0 +1,211 @@
+import threading
+
+import pytest
+from rdflib import BNode, Graph, Literal, Namespace, URIRef
+from rdflib.namespace import OWL, RDF, RDFS
+from rdflib.plugins.stores.memory import Memory
+
+from memento import DYNDIFF, MementoTransaction, TransactionStore, VirtuosoStoreWrapper, WriteAheadLog
+
+EX = Namespace("http://example.org/tx#")
+G = URIRef("http://example.org/tx/graph")
+
+
+class CountingMemory(Memory):
+    reads = 0
+
+    def triples(self, triple, context=None):
+        self.reads += 1
+        return super().triples(triple, context)
+
+
+def remote(base):
+    """A TransactionStore that treats `base` as a SPARQL store."""
+    tx = TransactionStore(base)
+    tx._probe_base = False
+    return tx
+
+
+@pytest.fixture
+def base():
+    store = CountingMemory()
+    ctx = Graph(store=store, identifier=G)
+    ctx.add((EX.a, RDF.type, OWL.Class))
+    ctx.add((EX.b, RDF.type, OWL.Class))
+    store.reads = 0
+    return store
+
+
+def test_add_does_not_read_a_remote_base(base):
+    tx = remote(base)
+    ctx = Graph(store=tx, identifier=G)
+    for i in range(100):
+        ctx.add((EX[f"c{i}"], RDF.type, OWL.Class))
+    assert base.reads == 0
+
+
+@pytest.mark.parametrize("make_tx", [TransactionStore, remote])
+def test_duplicates_are_read_once(base, make_tx):
+    tx = make_tx(base)
+    ctx = Graph(store=tx, identifier=G)
+    ctx.add((EX.a, RDF.type, OWL.Class))
+    ctx.add((EX.c, RDF.type, OWL.Class))
+
+    assert len(ctx) == 3
+    assert sorted(ctx.subjects(RDF.type, OWL.Class)) == [EX.a, EX.b, EX.c]
+
+
+@pytest.mark.parametrize("make_tx", [TransactionStore, remote])
+def test_remove_covers_base_and_pending(base, make_tx):
+    tx = make_tx(base)
+    ctx = Graph(store=tx, identifier=G)
+    ctx.add((EX.a, RDF.type, OWL.Class))
+    ctx.remove((EX.a, None, None))
+    assert (EX.a, RDF.type, OWL.Class) not in ctx
+
+    cleared, removals, additions = tx.changes()
+    assert removals == [(G, (EX.a, RDF.type, OWL.Class))]
+    assert additions == []
+
+
+@pytest.mark.parametrize("make_tx", [TransactionStore, remote])
+def test_remove_then_add_restores(base, make_tx):
+    tx = make_tx(base)
+    ctx = Graph(store=tx, identifier=G)
+    ctx.remove((EX.a, RDF.type, OWL.Class))
+    ctx.add((EX.a, RDF.type, OWL.Class))
+    assert tx.changes() == ([], [], [])
+
+
+def ontology():
+    g = Graph()
+    g.add((URIRef("http://example.org/tx"), RDF.type, OWL.Ontology))
+    g.add((EX.A, RDF.type, OWL.Class))
+    g.add((EX.A, RDFS.label, Literal("A")))
+    return g
+
+
+def test_transaction_commits_in_one_batch(make_memento, tmp_path):
+    m = make_memento(wal_path=str(tmp_path / "wal"))
+    with m.transaction():
+        m.create_ontology("O", ontology(), "s0", "alice")
+        m.create_ontology_state("O", [((EX.B, RDF.type, OWL.Class), DYNDIFF.addC)],
+                                state_name="s1", author="alice")
+        assert m._tx is not None
+    assert m._tx is None
+    assert sorted(m.get_ontology_states("O")) == ["s0", "s1"]
+    assert (EX.B, RDF.type, OWL.Class) in m.get_ontology_state("O", "s1")
+    assert (tmp_path / "wal").read_text() == ""
+
+
+def test_rollback_writes_nothing(make_memento):
+    m = make_memento()
+    m.create_ontology("O", ontology(), "s0", "alice")
+    with pytest.raises(RuntimeError):
+        with m.transaction():
+            m.create_ontology_state("O", [((EX.B, RDF.type, OWL.Class), DYNDIFF.addC)],
+                                    state_name="s1", author="alice")
+            raise RuntimeError("abort")
+    assert m.get_ontology_states("O") == ["s0"]
+    assert len(m.store.get_context(m._state_graph_iri("O", "s1"))) == 0
+
+
+def test_wal_recovery(make_memento, tmp_path):
+    path = str(tmp_path / "wal")
+    triple = (EX.X, RDF.type, OWL.Class)
+    wal = WriteAheadLog(path)
+    wal.log("committed", [], [], [(G, triple)])
+    # a batch cut short by a crash, before its commit record
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"tx": "torn", "op": "add", "g": "%s", "t": ["U%s", "U%s", "U%s"]}\n'
+                % (G, EX.Y, RDF.type, OWL.Class))
+
+    m = make_memento(wal_path=path)
+
+    g = m.store.get_context(G)
+    assert triple in g
+    assert (EX.Y, RDF.type, OWL.Class) not in g
+    assert list(WriteAheadLog(path).pending()) == []
+
+
+def test_transactions_are_per_thread(make_memento):
+    m = make_memento()
+    wrapper = m.store
+    opened, release = threading.Event(), threading.Event()
+    seen = {}
+
+    def writer():
+        with m.transaction():
+            opened.set()
+            release.wait(5)
+
+    t = threading.Thread(target=writer)
+    t.start()
+    opened.wait(5)
+    seen["tx"], seen["store"] = m._tx, m.store
+    release.set()
+    t.join()
+
+    assert seen["tx"] is None
+    assert seen["store"] is wrapper
+
+
+@pytest.mark.parametrize("probe", [True, False])
+def test_copy_reads_the_source_once(probe):
+    wrapper = VirtuosoStoreWrapper()
+    wrapper.store = base = CountingMemory()
+    src = Graph(store=base, identifier=URIRef("http://example.org/tx/src"))
+    for i in range(200):
+        src.add((EX[f"c{i}"], RDF.type, OWL.Class))
+        ax = EX[f"ax{i}"]
+        src.add((ax, RDF.type, OWL.Axiom))
+        src.add((ax, OWL.annotatedSource, EX[f"c{i}"]))
+        src.add((ax, OWL.annotatedProperty, RDF.type))
+        src.add((ax, OWL.annotatedTarget, OWL.Class))
+    src.add((EX.broken, RDF.type, OWL.Axiom))
+    base.reads = 0
+
+    tx = MementoTransaction(wrapper)
+    tx.store._probe_base = probe
+    n = tx.copy_context(src.identifier, URIRef("http://example.org/tx/dst"))
+
+    assert base.reads == 1
+    assert n == len(src) - 1
+    _, _, additions = tx.store.changes()
+    assert len(additions) == n
+    assert (EX.broken, RDF.type, OWL.Axiom) not in {t for _, t in additions}
+
+
+def test_length_of_all_contexts_includes_pending_changes(base):
+    tx = TransactionStore(base)
+    ctx = Graph(store=tx, identifier=G)
+    ctx.add((EX.c, RDF.type, OWL.Class))
+    ctx.remove((EX.a, RDF.type, OWL.Class))
+    Graph(store=tx, identifier=URIRef("http://example.org/tx/other")).add((EX.d, RDF.type, OWL.Class))
+    assert tx.__len__() == 3
+
+
+def test_blank_node_removals_reach_a_sparql_endpoint(sparql_server):
+    server = sparql_server()
+    g = server.dataset.get_context(G)
+    for cls in (EX.A, EX.B):
+        ax = BNode()
+        g.add((ax, RDF.type, OWL.Axiom))
+        g.add((ax, OWL.annotatedSource, cls))
+        g.add((ax, OWL.annotatedTarget, OWL.Thing))
+    g.add((EX.A, RDF.type, OWL.Class))
+
+    wrapper = VirtuosoStoreWrapper(query_endpoint=server.query_endpoint,
+                                   update_endpoint=server.update_endpoint, pool_size=1)
+    tx = MementoTransaction(wrapper)
+    ctx = tx.get_context(G)
+    ax = ctx.value(predicate=OWL.annotatedSource, object=EX.A)
+    ctx.remove((ax, None, None))
+    ctx.remove((EX.A, RDF.type, OWL.Class))
+    assert len(ctx) == 3
+    tx.commit()
+
+    assert set(g.subjects(OWL.annotatedSource)) == set(g.subjects(RDF.type, OWL.Axiom))
+    assert set(g.objects(None, OWL.annotatedSource)) == {EX.B}
+    assert len(g) == 3
+    wrapper.store.close()
@@ -0,0 +1,61 @@
+from rdflib import Graph, Literal, Namespace, URIRef
+from rdflib.namespace import OWL, RDF, RDFS
+
+from memento import DYNDIFF, MEMENTO
+
+EX = Namespace("http://example.org/validate#")
+
+
+def base_graph():
+    g = Graph()
+    g.add((URIRef("http://example.org/validate"), RDF.type, OWL.Ontology))
+    g.add((EX.A, RDF.type, OWL.Class))
+    g.add((EX.B, RDFS.subClassOf, EX.A))
+    g.add((EX.i, RDF.type, EX.A))
+    g.add((EX.i, EX.P, Literal("x")))
+    return g
+
+
+def test_changes_are_classified(make_memento):
+    m = make_memento()
+    m.create_ontology("O", base_graph(), "s0", "alice")
+
+    noop = [
+        ((EX.B, RDFS.subClassOf, EX.A), DYNDIFF.addI),
+        ((EX.B, RDFS.subClassOf, EX.C), DYNDIFF.delI),
+        ((EX.Z, RDF.type, OWL.Class), DYNDIFF.delC),
+        ((EX.i, RDF.type, EX.A), MEMENTO.AddChangeAction),
+    ]
+    effective = [
+        ((EX.C, RDF.type, OWL.Class), DYNDIFF.addC),
+        ((EX.i, EX.P, Literal("x")), DYNDIFF.delI),
+        ((EX.A, RDF.type, OWL.Class), DYNDIFF.delC),
+    ]
+    conflicting = [
+        ((EX.D, RDFS.subClassOf, EX.A), DYNDIFF.addI),
+        ((EX.D, RDFS.subClassOf, EX.A), DYNDIFF.delI),
+        # i is an individual, which a delC would strip
+        ((EX.i, RDF.type, OWL.Class), DYNDIFF.delC),
+    ]
+    changes = [noop[0], effective[0], conflicting[0], noop[1], effective[1], conflicting[1],
+               noop[2], conflicting[2], effective[2], noop[3]]
+
+    result = m.validate_changes("O", changes)
+    assert result == {"noop": noop, "effective": effective, "conflicting": conflicting}
+    assert m.validate_changes("O", changes, against_state="s0") == result
+
+
+def test_noops_are_dropped(make_memento):
+    m = make_memento()
+    m.create_ontology("O", base_graph(), "s0", "alice")
+    m.create_ontology_state("O", [
+        ((EX.Z, RDF.type, OWL.Class), DYNDIFF.delC),
+        ((EX.B, RDFS.subClassOf, EX.A), DYNDIFF.addI),
+        ((EX.C, RDF.type, OWL.Class), DYNDIFF.addC),
+    ], previous_state="s0", state_name="s1", author="bob", drop_noops=True)
+
+    assert m._content_set("O", "s1") == m._content_set("O", "s0") | {(EX.C, RDF.type, OWL.Class)}
+    ocg = m.store.get_context(m._ocg_iri("O"))
+    sources = set(ocg.objects(None, OWL.annotatedSource))
+    assert EX.C in sources
+    assert EX.Z not in sources
@@ -0,0 +1,92 @@
+import pytest
+from rdflib import Graph, Namespace, URIRef
+from rdflib.namespace import OWL, RDF
+
+from memento import DYNDIFF, VersionIndex
+
+EX = Namespace("http://example.org/versions#")
+
+# in precedence order
+VERSIONS = ["0.9", "1.0.0-alpha", "1.0.0-alpha.1", "1.0.0-alpha.beta", "1.0.0-beta.2",
+            "1.0.0-beta.11", "1.0.0-rc.1", "1.0.0", "1.2", "1.10.0", "2.0.0"]
+
+
+def index_of(versions):
+    index = VersionIndex()
+    for k, v in enumerate(versions):
+        index.add(v, f"s{k}")
+    return index
+
+
+def test_pre_releases_sort_before_their_release():
+    index = index_of(reversed(VERSIONS))
+    assert [v for v, _ in index.entries] == VERSIONS
+
+
+def test_equal_versions_keep_creation_order():
+    index = index_of(["1.0", "1.0.0", "0.1", "1.0"])
+    assert index.entries == [("0.1", "s2"), ("1.0", "s0"), ("1.0.0", "s1"), ("1.0", "s3")]
+
+
+def test_ranges_are_half_open():
+    index = index_of(VERSIONS)
+    assert [v for v, _ in index.range("1.0.0-alpha.1", "1.0.0")] == VERSIONS[2:7]
+    assert [v for v, _ in index.range("1.0.0")] == VERSIONS[7:]
+    assert [v for v, _ in index.range(high="1.0.0-alpha")] == ["0.9"]
+    assert index.range("3.0") == []
+
+
+def test_latest_within_a_release_line():
+    index = index_of(VERSIONS)
+    assert index.latest() == ("2.0.0", "s10")
+    assert index.latest(major=1) == ("1.10.0", "s9")
+    assert index.latest(major=1, minor=0) == ("1.0.0", "s7")
+    assert index.latest(major=1, minor=5) is None
+    assert index.latest(major=3) is None
+    assert VersionIndex().latest() is None
+
+
+def test_remove():
+    index = index_of(["1.0", "1.0", "1.0", "2.0"])
+    index.remove("s1")
+    index.remove("s1")
+    index.remove("missing")
+    assert index.entries == [("1.0", "s0"), ("1.0", "s2"), ("2.0", "s3")]
+    assert len(index) == len(index.keys) == 3
+
+    # a state added again replaces its earlier entry
+    index.add("0.5", "s3")
+    assert index.entries == [("0.5", "s3"), ("1.0", "s0"), ("1.0", "s2")]
+
+
+@pytest.fixture
+def versioned(make_memento):
+    g = Graph()
+    g.add((URIRef("http://example.org/versions"), RDF.type, OWL.Ontology))
+    m = make_memento()
+    m.create_ontology("O", g, "s0", "alice", version="1.0.0-rc.1")
+    for k, version in enumerate(["1.0.0", "1.1.0", "2.0.0-beta"], start=1):
+        m.create_ontology_state("O", [((EX[f"C{k}"], RDF.type, OWL.Class), DYNDIFF.addC)],
+                                previous_state=f"s{k - 1}", state_name=f"s{k}",
+                                author="alice", version=version,
+                                timestamp=f"2030-01-01T00:00:0{k}Z")
+    return m
+
+
+def test_states_by_version(versioned):
+    m = versioned
+    assert m.states_by_version("O", "1.0.0", "2.0.0") == [("1.0.0", "s1"), ("1.1.0", "s2"),
+                                                         ("2.0.0-beta", "s3")]
+    assert m.latest_version("O") == ("2.0.0-beta", "s3")
+    assert m.latest_version("O", major=1) == ("1.1.0", "s2")
+
+    m.remove_ontology_state("O", "s2")
+    assert m.latest_version("O", major=1) == ("1.0.0", "s1")
+    assert [s for _, s in m.states_by_version("O")] == ["s0", "s1", "s3"]
+
+
+def test_rebuilt_index_matches(versioned):
+    m = versioned
+    built = m.states_by_version("O")
+    m.version_index.clear()
+    assert m.states_by_version("O") == built